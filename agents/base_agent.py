@@ -0,0 +1,534 @@
+from agents.move_parser import IncrementalMoveParser, TUPLE_PATTERN
+from llm.backends import LLMBackendError, LLMResponse, OllamaBackend
+from llm.response_cache import CachedResponse, CacheMissError
+from llm.tokens import estimate_tokens
+from prompts.registry import PROMPTS
+from collections import Counter
+import json
+import random
+import time
+
+# Appended to the prompt in "json" output mode; Ollama's format schema enforces the shape
+JSON_INSTRUCTION = 'Respond only with JSON of the form {"move": [a, b]} using one of the legal moves.'
+
+# Temperatures of the first and last self-consistency sample; the others are spread evenly in between
+SAMPLE_TEMPERATURES = (0.6, 1.0)
+
+class BaseAgent:
+    """
+    Shared plumbing for the game agents: the LLM backend, the optional response cache and the counters
+    run_game reports. Subclasses set `game` (the prompt registry's game name) and provide
+    _parse_response and extract_move.
+
+    Attributes:
+        name (str): The name of the agent.
+        llm (LLMBackend): The backend serving the model; defaults to an OllamaBackend for `model`.
+        model (str): The name of the LLM model to use.
+        options (dict): Sampling parameters sent with every call (temperature, seed, ...).
+        cache (ResponseCache): Optional response cache, shared between agents.
+        illegal_moves (int): Count of illegal moves proposed.
+        fallbacks_used (int): Count of times fallback was triggered.
+        cache_hits (int): LLM calls answered from the cache.
+        cache_misses (int): LLM calls the cache could not answer.
+        prompt_tokens_saved (int): Estimated prompt tokens saved by compact prompt encodings.
+        move_quality (dict): Accepted moves by oracle rating ("optimal", "neutral", "blunder"), filled in by run_game.
+        distance_delta (int): Summed change in distance to goal over the agent's accepted moves.
+        rng (random.Random): Private RNG, seeded so a game can be replayed.
+        stream (bool): Consume the answer token by token and cancel the generation once a move is parsed.
+        move_timings (list): (time_to_first_token_s, time_to_move_s) per warm LLM call; the first is None when not streaming.
+        cold_starts (list): Durations of calls made before the model was loaded, kept out of move_timings.
+        early_stops (int): Streamed generations cancelled because a complete move had already arrived.
+        output_format (str): "text" for free-text answers, "json" for schema-constrained output whose enum
+            is the current legal moves (streaming is not used in this mode).
+        num_predict (int): Hard cap on generated tokens per call (defaults to JSON_NUM_PREDICT in "json" mode).
+        schema_retries (int): Extra calls allowed when a constrained answer still fails the schema.
+        llm_calls (int): Calls sent to the backend (cache hits excluded, retries included).
+        completion_tokens (int): Tokens generated over those calls.
+        schema_failures (int): Constrained answers that did not decode to a legal move.
+        schema_retry_calls (int): Calls repeated because a constrained answer failed the schema.
+        prompt_tokens (int): Estimated tokens of the prompts rendered by this agent.
+        prompt_eval_tokens (int): Prompt tokens the server reported evaluating.
+        telemetry (MoveTelemetry): The game's move instrumentation, or None when disabled.
+        last_response (str): Raw text of the answer the last proposed move was parsed from, for move traces.
+        samples (int): Self-consistency samples per move: above 1, that many answers are requested concurrently
+            with varied temperature and seed, unparsable or illegal ones are dropped and the move is voted.
+        quorum (int): Votes for one move that settle it without waiting for the other samples (default: a majority).
+        deadline (float): Seconds after which a move is voted from the samples received so far, or None.
+        rejected_samples (int): Samples dropped from a vote as unparsable or illegal.
+        cancelled_samples (int): Samples cancelled once their move was settled.
+        deadline_votes (int): Moves voted at the deadline.
+        resilience (ResiliencePolicy): Deadlines, retries, hedging and circuit breaking around every call, or None
+            to call the backend directly. With a policy, a move whose call fails for good is skipped (None).
+        game_deadline (float): perf_counter() time the current game must end by, set by run_game, or None.
+        timeouts (int): Call attempts abandoned at their deadline.
+        retries (int): Call attempts repeated after a failure or timeout.
+        hedged_calls (int): Duplicate requests sent because an attempt outlasted the endpoint's p95 latency.
+        hedge_wins (int): Hedged calls answered by the duplicate first.
+        circuit_rejections (int): Calls refused because the model's endpoint was marked unhealthy.
+        failed_calls (int): Moves skipped because no attempt got an answer.
+    """
+    JSON_NUM_PREDICT = 24
+    MOVE_PATTERN = TUPLE_PATTERN  # what a streamed answer is cut at; extract_move must accept it
+    game = None
+
+    def __init__(self, name, model="llama3.2:latest", seed=None, cache=None, options=None, llm=None, stream=False,
+                 output_format="text", num_predict=None, schema_retries=1, samples=1, quorum=None, deadline=None,
+                 resilience=None):
+        self.name = name
+        self.llm = llm if llm is not None else OllamaBackend(model, **(options or {}))
+        self.model = self.llm.model
+        self.options = self.llm.options
+        self.cache = cache
+        self.stream = stream
+        if output_format not in ("text", "json"):
+            raise ValueError(f"Unknown output format: {output_format}")
+        self.output_format = output_format
+        self.num_predict = num_predict if num_predict is not None else (
+            self.JSON_NUM_PREDICT if output_format == "json" else None)
+        self.schema_retries = schema_retries
+        self.samples = samples
+        self.quorum = quorum or samples // 2 + 1
+        self.deadline = deadline
+        self.resilience = resilience
+        self.reset(seed)
+
+    """
+    Clear the per-game counters and reseed the RNG, so one agent (and its LLM client) can play many games.
+
+    Args:
+        seed (int): Seed for the next game's RNG.
+    """
+    def reset(self, seed=None):
+        self.illegal_moves = 0
+        self.fallbacks_used = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.prompt_tokens_saved = 0
+        self.move_quality = {"optimal": 0, "neutral": 0, "blunder": 0}
+        self.distance_delta = 0
+        self.rng = random.Random(seed)
+        self.move_timings = []
+        self.cold_starts = []
+        self.early_stops = 0
+        self.llm_calls = 0
+        self.completion_tokens = 0
+        self.schema_failures = 0
+        self.schema_retry_calls = 0
+        self.prompt_tokens = 0
+        self.prompt_eval_tokens = 0
+        self.telemetry = None
+        self.last_response = None
+        self.rejected_samples = 0
+        self.cancelled_samples = 0
+        self.deadline_votes = 0
+        self.game_deadline = None
+        self.timeouts = 0
+        self.retries = 0
+        self.hedged_calls = 0
+        self.hedge_wins = 0
+        self.circuit_rejections = 0
+        self.failed_calls = 0
+
+    """
+    Propose the next move using the language model.
+
+    Args:
+        state: The current game state.
+        memory (list): A list of recent moves.
+        output (bool): Whether to print debug information.
+        prompt (str): The type of prompt to use
+
+    Returns:
+        tuple or None: A legal move, or None if the agent could not produce one.
+    """
+    def propose_move(self, state, memory, output=False, prompt="baseline"):
+        self.last_response = None
+        legal_moves = state.get_legal_moves()
+        if not legal_moves:
+            return None
+
+        text = self._build_prompt(state, memory, legal_moves, prompt)
+        start = time.perf_counter()
+        try:
+            if self.samples > 1:
+                from llm.pool import sync_loop
+                response = sync_loop().run_until_complete(self._avote(text, prompt, legal_moves))
+            else:
+                response = self._invoke(text, prompt, legal_moves)
+        except LLMBackendError as e:
+            return self._give_up(output, e)
+        self.last_response = response.content
+        if self.telemetry is None:
+            return self._parse_response(response, legal_moves, output)
+        return self._timed_parse(response, legal_moves, output, start)
+
+    """
+    Async version of propose_move, awaiting the backend's async invoke path
+    so several games can share one event loop while their requests are in flight.
+
+    Args:
+        state: The current game state.
+        memory (list): A list of recent moves.
+        output (bool): Whether to print debug information.
+        prompt (str): The type of prompt to use
+        speculator (Speculator): The game's speculative calls; one sent with this exact prompt is used
+            instead of a new call.
+
+    Returns:
+        tuple or None: A legal move, or None if the agent could not produce one.
+    """
+    async def apropose_move(self, state, memory, output=False, prompt="baseline", speculator=None):
+        self.last_response = None
+        legal_moves = state.get_legal_moves()
+        if not legal_moves:
+            return None
+
+        text = self._build_prompt(state, memory, legal_moves, prompt)
+        start = time.perf_counter()
+        speculative = speculator.claim(self, text) if speculator is not None else None
+        try:
+            response = await (speculative if speculative is not None else self._aanswer(text, prompt, legal_moves))
+        except LLMBackendError as e:
+            return self._give_up(output, e)
+        self.last_response = response.content
+        if self.telemetry is None:
+            return self._parse_response(response, legal_moves, output)
+        return self._timed_parse(response, legal_moves, output, start)
+
+    # A call that failed for good under the resilience policy skips the move; without a policy the error propagates
+    def _give_up(self, output, error):
+        if self.resilience is None:
+            raise error
+        self.failed_calls += 1
+        if output:
+            print(f"⚠️ {self.name} got no answer from {self.model}.")
+        return None
+
+    # The answer apropose_move parses: one call, or the vote of several samples
+    async def _aanswer(self, text, prompt_type, legal_moves):
+        if self.samples > 1:
+            return await self._avote(text, prompt_type, legal_moves)
+        return await self._ainvoke(text, prompt_type, legal_moves)
+
+    """
+    Self-consistency vote: request `samples` answers concurrently, each with its own temperature and seed,
+    and return as soon as one legal move has `quorum` votes or the deadline has passed with at least one
+    answer in. Samples still running are cancelled.
+
+    Args:
+        text (str): The rendered prompt.
+        prompt_type (str): The prompt type it was rendered from.
+        legal_moves (list): The legal moves.
+
+    Returns:
+        LLMResponse: An answer for the most voted move (the earliest on a tie), or the first answer received
+            when none was usable, so it is parsed and counted like a single bad answer.
+    """
+    async def _avote(self, text, prompt_type, legal_moves):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline if self.deadline is not None else None
+        pending = [asyncio.ensure_future(self._ainvoke(text, prompt_type, legal_moves, self._sample_options(i)))
+                   for i in range(self.samples)]
+        votes, answers = Counter(), {}
+        first = error = None
+        try:
+            while pending:
+                timeout = None
+                if deadline is not None and first is not None:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        self.deadline_votes += 1
+                        break
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    response = task.result()
+                    first = first or response
+                    move = self._sample_move(response, legal_moves)
+                    if move is None:
+                        self.rejected_samples += 1
+                        continue
+                    votes[move] += 1
+                    answers.setdefault(move, response)
+                if votes and max(votes.values()) >= self.quorum:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            self.cancelled_samples += len(pending)
+        if votes:
+            return answers[votes.most_common(1)[0][0]]
+        if first is not None:
+            return first
+        raise error
+
+    # Sampling overrides of one vote sample; seeds come from the agent's RNG so seeded games replay
+    def _sample_options(self, index):
+        low, high = SAMPLE_TEMPERATURES
+        return {"temperature": round(low + (high - low) * index / (self.samples - 1), 3),
+                "seed": self.rng.randrange(2 ** 31)}
+
+    # The legal move a sample proposes, or None, without touching the agent's counters
+    def _sample_move(self, response, legal_moves):
+        try:
+            move = self.extract_move(response.content.strip())
+        except ValueError:
+            return None
+        return move if move in legal_moves else None
+
+    # Instrumented tail of propose_move: records the LLM round trip (cache and retries included) and the parse
+    def _timed_parse(self, response, legal_moves, output, start):
+        parse_start = time.perf_counter()
+        move = self._parse_response(response, legal_moves, output)
+        end = time.perf_counter()
+        self.telemetry.time("llm", parse_start - start)
+        self.telemetry.time("extract_move", end - parse_start)
+        return move
+
+    """
+    Render the prompt text from the registry's template for the given prompt type.
+
+    Args:
+        state: The current game state.
+        memory (list): A list of recent moves.
+        legal_moves: The legal moves, or their compact description.
+        prompt (str): The type of prompt to use
+
+    Returns:
+        str: The prompt to send to the LLM.
+    """
+    def _build_prompt(self, state, memory, legal_moves, prompt):
+        text = self._render_prompt(state, memory, legal_moves, prompt)
+        self.prompt_tokens += estimate_tokens(text)
+        return text
+
+    def _render_prompt(self, state, memory, legal_moves, prompt):
+        return PROMPTS.render(self.game, prompt, state, memory, legal_moves)
+
+    """
+    Render the prompt for a position the agent may face next, without counting it, so the answer
+    can be requested before its turn.
+
+    Args:
+        state: The game state.
+        memory (list): The recent moves as of that state.
+        prompt (str): The type of prompt to use
+
+    Returns:
+        tuple: (prompt text, legal moves), or None if there is no legal move.
+    """
+    def prepare_prompt(self, state, memory, prompt):
+        legal_moves = state.get_legal_moves()
+        if not legal_moves:
+            return None
+        return self._render_prompt(state, memory, legal_moves, prompt), legal_moves
+
+    """
+    Send a prompt to the LLM, going through the response cache when one is configured.
+    In "json" mode the answer is constrained to the legal moves, re-requested only if it still fails
+    the schema, and returned as "(a, b)" text so _parse_response handles both modes alike.
+
+    Args:
+        text (str): The rendered prompt.
+        prompt_type (str): The prompt type it was rendered from (part of the cache key).
+        legal_moves (list): The legal moves, used for the "json" mode schema.
+        sample (dict): Sampling overrides of a self-consistency sample (part of the cache key); such calls
+            are not streamed, as the backends' stream takes no per-call options.
+
+    Returns:
+        LLMResponse: The backend's answer, or a CachedResponse on a cache hit.
+
+    Raises:
+        CacheMissError: In "replay-only" mode when the prompt was never cached.
+    """
+    def _invoke(self, text, prompt_type, legal_moves=None, sample=None):
+        text, format = self._constrain(text, legal_moves)
+        key, cached = self._cache_lookup(text, prompt_type, format, sample)
+        if cached is not None:
+            return self._as_move_text(cached, legal_moves, format)
+        response = self._call(text, format, sample)
+        for _ in range(self.schema_retries if format is not None else 0):
+            if self._json_move(response.content, legal_moves) is not None:
+                break
+            self.schema_retry_calls += 1
+            response = self._call(text, format, sample)
+        self._cache_store(key, response, prompt_type)
+        return self._as_move_text(response, legal_moves, format)
+
+    async def _ainvoke(self, text, prompt_type, legal_moves=None, sample=None):
+        text, format = self._constrain(text, legal_moves)
+        key, cached = self._cache_lookup(text, prompt_type, format, sample)
+        if cached is not None:
+            return self._as_move_text(cached, legal_moves, format)
+        response = await self._acall(text, format, sample)
+        for _ in range(self.schema_retries if format is not None else 0):
+            if self._json_move(response.content, legal_moves) is not None:
+                break
+            self.schema_retry_calls += 1
+            response = await self._acall(text, format, sample)
+        self._cache_store(key, response, prompt_type)
+        return self._as_move_text(response, legal_moves, format)
+
+    # One backend call, timed and counted
+    def _call(self, text, format=None, sample=None):
+        cold = not self.llm.warm
+        start = time.perf_counter()
+
+        def send():
+            if self.stream and format is None and sample is None:
+                return self._stream_move(self.llm.stream(text), start)
+            return self.llm.invoke(text, format=format, options=self._call_options(sample)), None
+
+        response, first_token = send() if self.resilience is None else self.resilience.call(self, send)
+        self._record_timing(cold, first_token, time.perf_counter() - start)
+        self._count_call(response)
+        return response
+
+    async def _acall(self, text, format=None, sample=None):
+        cold = not self.llm.warm
+        start = time.perf_counter()
+
+        async def send():
+            if self.stream and format is None and sample is None:
+                return await self._astream_move(self.llm.astream(text), start)
+            return await self.llm.ainvoke(text, format=format, options=self._call_options(sample)), None
+
+        response, first_token = await (send() if self.resilience is None else self.resilience.acall(self, send))
+        self._record_timing(cold, first_token, time.perf_counter() - start)
+        self._count_call(response)
+        return response
+
+    # Calls that paid for loading the model are reported as cold starts, not as move latency
+    def _record_timing(self, cold, first_token, elapsed):
+        if cold:
+            self.cold_starts.append(elapsed)
+            if not self.llm.warm:
+                self.llm.cold_start = elapsed
+                self.llm.warm = True
+        else:
+            self.move_timings.append((first_token, elapsed))
+
+    def _call_options(self, sample=None):
+        options = {"num_predict": self.num_predict} if self.num_predict is not None else {}
+        options.update(sample or {})
+        return options or None
+
+    def _count_call(self, response):
+        self.llm_calls += 1
+        self.prompt_eval_tokens += response.prompt_tokens or 0
+        tokens = response.completion_tokens
+        self.completion_tokens += tokens if tokens is not None else estimate_tokens(response.content)
+
+    """
+    JSON schema allowing exactly the legal moves, as {"move": [a, b]}.
+
+    Args:
+        legal_moves (list): The legal moves.
+
+    Returns:
+        dict: The schema passed as Ollama's `format`.
+    """
+    @staticmethod
+    def move_schema(legal_moves):
+        return {
+            "type": "object",
+            "properties": {"move": {"type": "array", "enum": [list(move) for move in legal_moves]}},
+            "required": ["move"],
+        }
+
+    def _constrain(self, text, legal_moves):
+        if self.output_format != "json" or legal_moves is None:
+            return text, None
+        return f"{text.rstrip()}\n{JSON_INSTRUCTION}", self.move_schema(legal_moves)
+
+    """
+    Decode a constrained answer.
+
+    Args:
+        content (str): The raw JSON answer.
+        legal_moves (list): The legal moves.
+
+    Returns:
+        tuple or None: The move if the answer matches the schema, otherwise None.
+    """
+    def _json_move(self, content, legal_moves):
+        try:
+            move = tuple(json.loads(content)["move"])
+        except (ValueError, KeyError, TypeError):
+            return None
+        return move if move in legal_moves else None
+
+    def _as_move_text(self, response, legal_moves, format):
+        if format is None:
+            return response
+        move = self._json_move(response.content, legal_moves)
+        if move is None:
+            self.schema_failures += 1
+            return response
+        return LLMResponse(f"({move[0]}, {move[1]})", getattr(response, "prompt_tokens", None),
+                           getattr(response, "completion_tokens", None), getattr(response, "metadata", None))
+
+    """
+    Consume a streamed answer until a complete move (MOVE_PATTERN) appears, then close the stream so the
+    server stops generating. Answers without one are read to the end and parsed as usual.
+
+    Args:
+        chunks (generator): The backend's stream of text chunks.
+        start (float): perf_counter() when the request was sent.
+
+    Returns:
+        tuple: (LLMResponse with the text consumed up to and including the move, time to first token in seconds)
+    """
+    def _stream_move(self, chunks, start):
+        parser = IncrementalMoveParser(self.MOVE_PATTERN)
+        first_token = None
+        try:
+            for chunk in chunks:
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                if parser.feed(chunk) is not None:
+                    self.early_stops += 1
+                    break
+        finally:
+            chunks.close()
+        return LLMResponse(parser.text, completion_tokens=parser.chunks), first_token
+
+    async def _astream_move(self, chunks, start):
+        parser = IncrementalMoveParser(self.MOVE_PATTERN)
+        first_token = None
+        try:
+            async for chunk in chunks:
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                if parser.feed(chunk) is not None:
+                    self.early_stops += 1
+                    break
+        finally:
+            await chunks.aclose()
+        return LLMResponse(parser.text, completion_tokens=parser.chunks), first_token
+
+    def _cache_lookup(self, text, prompt_type, format=None, sample=None):
+        if self.cache is None:
+            return None, None
+        params = dict(self.options, format=format, num_predict=self.num_predict) if format is not None else self.options
+        if sample is not None:
+            params = dict(params, **sample)
+        key = self.cache.key(self.model, prompt_type, text, params)
+        if self.cache.mode == "bypass":
+            return key, None
+
+        content = self.cache.get(key)
+        if content is not None:
+            self.cache_hits += 1
+            return key, CachedResponse(content)
+        self.cache_misses += 1
+        if self.cache.mode == "replay-only":
+            raise CacheMissError(f"No cached response for {self.model} / {prompt_type}")
+        return key, None
+
+    def _cache_store(self, key, response, prompt_type):
+        if key is not None:
+            self.cache.put(key, response.content, model=self.model, prompt_type=prompt_type)
@@ -1,8 +1,8 @@
-from langchain_ollama import ChatOllama
-from langchain.schema import HumanMessage
-import re
+from agents.base_agent import BaseAgent
+from agents.move_parser import TUPLE_PATTERN
 
-class HanoiAgent:
+class HanoiAgent(BaseAgent):
+    game = "hanoi"
 
     """
     Initialize the HanoiAgent with a name and a language model.
@@ -10,12 +10,11 @@ class HanoiAgent:
     Args:
         name (str): The name of the agent.
         model (str): The name of the LLM model to use.
+        **kwargs: Passed to BaseAgent (seed, cache, options, llm, stream, output_format, ...).
     """
-    def __init__(self, name, model="llama3.2:latest"):
-        self.name = name
-        self.llm = ChatOllama(model=model)
-        self.illegal_moves = 0  # Track number of illegal moves
-        self.fallbacks_used = 0  # Track number of fallbacks used (not used in this agent)
+    def __init__(self, name, model="llama3.2:latest", **kwargs):
+        super().__init__(name, model=model, **kwargs)
+        # fallbacks_used is tracked for parity with NimAgent but never incremented here
 
     """
     Extract a move from the LLM's raw text response.
@@ -31,94 +30,23 @@ class HanoiAgent:
     """
     @staticmethod
     def extract_move(text):
-        match = re.search(r"\((\d+),\s*(\d+)\)", text)
+        match = TUPLE_PATTERN.search(text)
         if match:
             return int(match.group(1)), int(match.group(2))
         raise ValueError(f"Invalid move format: {text}")
 
     """
-    Propose the next move in the Tower of Hanoi puzzle using the language model.
+    Turn the LLM's response into a move, counting illegal or unparsable answers.
 
     Args:
-        state: The current state of the Hanoi puzzle.
-        memory (list): A list of recent moves to avoid repetition.
+        response (LLMResponse): The answer returned by the LLM.
+        legal_moves (list): The legal moves from the current state.
         output (bool): Whether to print debug information.
-        prompt (str): The type of prompt to use
 
     Returns:
         tuple or None: A legal move (from_peg, to_peg), or None if the response is invalid or illegal.
     """
-    def propose_move(self, state, memory, output=False, prompt="baseline"):
-        legal_moves = state.get_legal_moves()
-
-        match prompt:
-            case "baseline":
-                prompt = f"""
-                You are solving the Tower of Hanoi puzzle.
-
-                Your goal is to move all disks from peg 0 to peg 2, following these rules:
-                    - Only one disk can be moved at a time.
-                    - A larger disk may never be placed on top of a smaller disk.
-
-                Current state: {state}
-                Recent moves: {memory}
-                Legal moves: {legal_moves}
-
-                Choose the best next move from the list of legal moves that brings you closer to solving the puzzle.
-                Avoid repeating previous states or undoing recent moves.
-                Only respond with a Python tuple like (from_peg, to_peg). Do not explain.
-                """
-
-            case "recursive_genius":
-                prompt = f"""
-                You are a recursive problem-solving expert, known for solving Tower of Hanoi puzzles with perfect efficiency.
-
-                Your goal is to move all disks from peg 0 to peg 2, following these rules:
-                - Only one disk can be moved at a time.
-                - A larger disk may never be placed on top of a smaller disk.
-
-                Current state: {state}
-                Recent moves: {memory}
-                Legal moves: {legal_moves}
-
-                Use your recursive reasoning to choose the best next move from the list of legal moves.
-                Only respond with a Python tuple like (from_peg, to_peg). Do not explain.
-                """
-
-            case "math_genius":
-                prompt = f"""
-                You are a mathematical genius, known for solving Tower of Hanoi puzzles with perfect efficiency.
-
-                Your goal is to move all disks from peg 0 to peg 2, following these rules:
-                - Only one disk can be moved at a time.
-                - A larger disk may never be placed on top of a smaller disk.
-
-                Current state: {state}
-                Recent moves: {memory}
-                Legal moves: {legal_moves}
-
-                Use your mathematical insight to choose the best next move from the list of legal moves.
-                Only respond with a Python tuple like (from_peg, to_peg). Do not explain.
-                """
-
-            case "recursive_strat":
-                prompt = f"""
-                You are solving the Tower of Hanoi puzzle with 3 disks.
-
-                Your objective is to move all disks from peg 0 to peg 2 using peg 1 as auxiliary.
-                Follow the classic recursive strategy:
-                - Move the top n-1 disks to the auxiliary peg.
-                - Move the largest disk to the target peg.
-                - Move the n-1 disks from the auxiliary peg to the target peg.
-
-                Current state: {state}
-                Recent moves: {memory}
-                Legal moves: {legal_moves}
-
-                Choose the next move that follows this recursive plan. Only respond with a Python tuple like (from_peg, to_peg).
-                """
-
-        response = self.llm.invoke([HumanMessage(content=prompt)])
+    def _parse_response(self, response, legal_moves, output):
         raw = response.content.strip()
 
         if output:
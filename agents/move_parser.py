@@ -0,0 +1,56 @@
+import re
+
+# "(a, b)", the only form HanoiAgent.extract_move accepts
+TUPLE_PATTERN = re.compile(r"\((\d+),\s*(\d+)\)")
+# "a, b" with or without parentheses, as NimAgent.extract_move accepts; the lookahead waits for the second
+# number to end, so "1, 2" is not taken from a stream that goes on with "1, 23"
+PAIR_PATTERN = re.compile(r"(\d+),\s*(\d+)(?=\D)")
+# The end of the text that may still grow into a move: "(", "(1", "1,", "(1, 2", ...
+_PARTIAL = re.compile(r"\(?\d*(?:,\s*\d*)?\Z")
+
+class IncrementalMoveParser:
+    """
+    Finds the first complete move in text that arrives in chunks, so a streamed generation
+    can be cancelled as soon as the move is known.
+
+    Only the end of the text that may still grow into a move is rescanned on each chunk (the move
+    patterns contain only digits, commas, whitespace and parentheses), keeping the total work linear
+    in the response length.
+
+    Args:
+        pattern (re.Pattern): The move pattern, with the two numbers as groups; the agent's extract_move
+            must accept everything it matches.
+
+    Attributes:
+        text (str): Everything fed so far.
+        chunks (int): Number of chunks fed.
+        move (tuple): The parsed move, once found.
+    """
+    def __init__(self, pattern=TUPLE_PATTERN):
+        self.pattern = pattern
+        self.text = ""
+        self.chunks = 0
+        self.move = None
+        self._scan_from = 0
+
+    """
+    Add a chunk of generated text.
+
+    Args:
+        chunk (str): The next piece of the response.
+
+    Returns:
+        tuple or None: The move once a complete one has been seen, otherwise None.
+    """
+    def feed(self, chunk):
+        if self.move is not None:
+            return self.move
+        self.text += chunk
+        self.chunks += 1
+        match = self.pattern.search(self.text, self._scan_from)
+        if match:
+            self.move = (int(match.group(1)), int(match.group(2)))
+            self.text = self.text[:match.end()]
+            return self.move
+        self._scan_from = _PARTIAL.search(self.text, self._scan_from).start()
+        return None
@@ -1,9 +1,12 @@
-from langchain_ollama import ChatOllama
-from langchain.schema import HumanMessage
+from agents.base_agent import BaseAgent
+from agents.move_parser import PAIR_PATTERN
+from llm.tokens import estimate_tokens, estimate_tuple_list_tokens
 import re
-import random
 
-class NimAgent:
+class NimAgent(BaseAgent):
+    MOVE_PATTERN = PAIR_PATTERN
+    game = "nim"
+
     """
     Initialize the Nim agent with a name and a language model.
 
@@ -12,12 +15,12 @@ class NimAgent:
         model (str): The name of the LLM model to use.
         illegal_moves (int): Count of illegal moves proposed.
         fallbacks_used (int): Count of times fallback was triggered.
+        compact_moves (bool): Describe legal moves as ranges ("(i, 1) .. (i, k)") instead of listing every tuple.
+        **kwargs: Passed to BaseAgent (seed, cache, options, llm, stream, output_format, ...).
     """
-    def __init__(self, name, model="llama3.2:latest"):
-        self.name = name
-        self.llm = ChatOllama(model=model)
-        self.illegal_moves = 0
-        self.fallbacks_used = 0
+    def __init__(self, name, model="llama3.2:latest", compact_moves=False, **kwargs):
+        super().__init__(name, model=model, **kwargs)
+        self.compact_moves = compact_moves
 
     """
     Extract a move from the LLM's raw text response.
@@ -42,79 +45,54 @@ class NimAgent:
         raise ValueError(f"Invalid move format: {text}")
 
     """
-    Propose a move based on the current Nim state and shared memory.
+    Build the prompt text for the given prompt type, counting the tokens the compact encoding saves.
 
     Args:
         state (NimState): The current state of the Nim game.
         memory (list): A list of recent moves.
-        output (bool): Whether to print debug output.
+        legal_moves (NimLegalMoves): The legal moves from the current state.
         prompt (str): The type of prompt to use
 
     Returns:
-        tuple or None: A legal move (heap_index, num_removed), or None if invalid.
+        str: The prompt to send to the LLM.
+    """
+    def _build_prompt(self, state, memory, legal_moves, prompt):
+        # The compact encoding keeps prompt size proportional to the number of heaps
+        if self.compact_moves and hasattr(legal_moves, "describe"):
+            full_tokens = estimate_tuple_list_tokens(len(legal_moves))
+            self.prompt_tokens_saved += full_tokens - estimate_tokens(legal_moves.describe())
+
+        return super()._build_prompt(state, memory, legal_moves, prompt)
+
+    """
+    Render the prompt text, with the legal moves replaced by their compact description if enabled.
+
+    Args:
+        state (NimState): The current state of the Nim game.
+        memory (list): A list of recent moves.
+        legal_moves (NimLegalMoves): The legal moves from the current state.
+        prompt (str): The type of prompt to use
+
+    Returns:
+        str: The prompt to send to the LLM.
+    """
+    def _render_prompt(self, state, memory, legal_moves, prompt):
+        if self.compact_moves and hasattr(legal_moves, "describe"):
+            legal_moves = legal_moves.describe()
+        return super()._render_prompt(state, memory, legal_moves, prompt)
+
+    """
+    Turn the LLM's response into a move, falling back to a random legal move if it is unusable.
+
+    Args:
+        response (LLMResponse): The answer returned by the LLM.
+        legal_moves (NimLegalMoves): The legal moves from the current state.
+        output (bool): Whether to print debug output.
+
+    Returns:
+        tuple: A legal move (heap_index, num_removed).
     """
-    def propose_move(self, state, memory, output=False, prompt="baseline"):
-        legal_moves = state.get_legal_moves()
-        if not legal_moves:
-            return None
-
-        match prompt:
-            case "baseline":
-                prompt = f"""
-                You are playing the game of Nim.
-                Current heaps: {state}
-                Recent moves: {memory}
-                Legal moves: {legal_moves}
-
-                Choose the best next move from the list of legal moves.
-                Only respond with a Python tuple from the list above, like (heap_index, num_removed).
-                Do not invent new moves. Do not explain.
-                """
-
-            case "game_theorist":
-                prompt = f"""
-                You are a world-class game theorist specializing in combinatorial games like Nim.
-
-                Current heaps: {state}
-                Recent moves: {memory}
-                Legal moves: {legal_moves}
-
-                Use your deep understanding of game theory to choose the best next move from the list of legal moves.
-                Only respond with a Python tuple from the list above, like (heap_index, num_removed). Do not explain.
-                """
-
-            case "math_genius":
-                prompt = f"""
-                You are a mathematical genius specializing in combinatorial games like Nim.
-
-                Current heaps: {state}
-                Recent moves: {memory}
-                Legal moves: {legal_moves}
-
-                Use your mathematical insight to choose the best next move from the list of legal moves.
-                Only respond with a Python tuple from the list above, like (heap_index, num_removed). Do not explain.
-                """
-
-            case "XOR_strat":
-                prompt = f"""
-                You are playing the game of Nim.
-
-                Your objective is to win by removing objects from the heaps so that your opponent is left in a losing position.
-
-                Follow this rule-based strategy:
-                - Compute the Nim sum (bitwise XOR of all heap sizes).
-                - If the Nim sum is 0, you are in a losing position. Choose any legal move.
-                - If the Nim sum is not 0, choose a move that changes one heap so that the new Nim sum becomes 0.
-
-                Current heaps: {state}
-                Recent moves: {memory}
-                Legal moves: {legal_moves}
-
-                Choose the next move that follows this rule-based strategy. Only respond with a Python tuple from the list above, like (heap_index, num_removed).
-                Do not invent new moves. Do not explain.
-                """
-   
-        response = self.llm.invoke([HumanMessage(content=prompt)])
+    def _parse_response(self, response, legal_moves, output):
         raw = response.content.strip()
 
         try:
@@ -134,4 +112,4 @@ class NimAgent:
         if output:
             print(f"🔁 {self.name} falling back to random legal move.")
         self.fallbacks_used += 1
-        return random.choice(legal_moves)
\ No newline at end of file
+        return self.rng.choice(legal_moves)
\ No newline at end of file
@@ -0,0 +1,61 @@
+import os
+import threading
+
+class AgentPool:
+    """
+    Reuses agents across games. Concurrent games each check out their own agent, so counters never mix;
+    a released agent is reset and handed to the next game with the same model and settings.
+
+    Attributes:
+        idle (dict): Agent key -> list of released agents.
+    """
+    def __init__(self):
+        self.idle = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(agent_class, name, llm, settings):
+        return agent_class, name, id(llm), tuple(sorted((k, id(v) if k == "cache" else v) for k, v in settings.items()))
+
+    """
+    Check out an agent for one game, building it if none is idle.
+
+    Args:
+        agent_class (type): HanoiAgent or NimAgent.
+        name (str): The agent's display name.
+        llm (LLMBackend): The (pooled) backend the agent talks to.
+        seed (int): The game's seed for the agent's RNG.
+        **settings: Other constructor arguments (cache, stream, output_format, compact_moves, ...).
+
+    Returns:
+        BaseAgent: An agent with fresh per-game counters.
+    """
+    def acquire(self, agent_class, name, llm, seed=None, **settings):
+        key = self._key(agent_class, name, llm, settings)
+        with self._lock:
+            idle = self.idle.get(key)
+            agent = idle.pop() if idle else None
+        if agent is None:
+            agent = agent_class(name, llm=llm, seed=seed, **settings)
+            agent._pool_key = key
+        else:
+            agent.reset(seed)
+        return agent
+
+    """
+    Return agents at the end of a game.
+
+    Args:
+        *agents (BaseAgent): Agents checked out with acquire.
+    """
+    def release(self, *agents):
+        with self._lock:
+            for agent in agents:
+                self.idle.setdefault(agent._pool_key, []).append(agent)
+
+# Process-wide pool used by main.setup_game
+AGENT_POOL = AgentPool()
+
+# Agents hold their parent's backends, so a forked worker starts with an empty pool
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=AGENT_POOL.idle.clear)
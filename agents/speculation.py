@@ -0,0 +1,150 @@
+import asyncio
+import copy
+import time
+from collections import Counter
+from puzzles.oracle import hanoi_distance, nim_winning_moves
+
+# Moves shown to the agents each turn: run_game passes memory.get_recent() with its default of 5
+RECENT_MOVES = 5
+
+"""
+Likely moves from a position, most likely first: the oracle's ranking (Hanoi moves by distance to the
+goal afterwards, winning Nim moves first), ties broken by how often the move was played recently.
+
+Args:
+    state: The current game state.
+    history (iterable): Recent moves of the game.
+    k (int): Moves wanted.
+
+Returns:
+    list: Up to k legal moves.
+"""
+def rank_moves(state, history, k):
+    legal_moves = state.get_legal_moves()
+    played = Counter(history)
+    if hasattr(state, "heaps"):
+        # Nim legal moves grow with the heap sizes, so only winning and recently played moves are ranked
+        ranked = nim_winning_moves(state.heaps)
+        ranked += sorted((move for move in played if move in legal_moves and move not in ranked),
+                         key=lambda move: -played[move])
+        for move in legal_moves:
+            if len(ranked) >= k:
+                break
+            if move not in ranked:
+                ranked.append(move)
+    else:
+        ranked = sorted(legal_moves, key=lambda move: (hanoi_distance(successor(state, move)), -played[move]))
+    return ranked[:k]
+
+# Copy of the state with a move applied
+def successor(state, move):
+    state = copy.deepcopy(state)
+    state.move(*move)
+    return state
+
+def is_finished(state):
+    return state.is_game_over() if hasattr(state, "heaps") else state.is_solved()
+
+class Speculator:
+    """
+    Speculative opponent queries for one game. While an agent decides, the opponent's prompts for the
+    top-k positions the move most likely leads to are already sent; when the opponent's turn comes, an
+    answer whose prompt is exactly the one it would send is used and every other one is cancelled.
+
+    Speculative calls go through the agent's normal call path, so completed ones count in its llm_calls,
+    timings and cache statistics like any other call, wasted ones included.
+
+    Attributes:
+        top_k (int): Positions speculated on per turn.
+        pending (dict): Agent -> {prompt text -> entry} of the calls in flight for it.
+        calls (int): Speculative calls started.
+        hits (int): Turns answered by a speculative call.
+        wasted (int): Speculative calls cancelled or left unused.
+        saved_s (float): Seconds the hits had already been in flight when their turn came.
+    """
+    def __init__(self, top_k=2):
+        self.top_k = top_k
+        self.pending = {}
+        self.calls = 0
+        self.hits = 0
+        self.wasted = 0
+        self.saved_s = 0.0
+
+    """
+    Start the opponent's calls for the likely results of the move being decided. Must be called from
+    a running event loop; the calls proceed while the current agent's own call is awaited.
+
+    Args:
+        agent: The opponent, who moves next.
+        state: The state before the move being decided.
+        memory (SharedMemory): The game's shared memory.
+        prompt (str): The prompt type.
+    """
+    def start(self, agent, state, memory, prompt):
+        pending = self.pending.setdefault(agent, {})
+        for move in rank_moves(state, memory.moves, self.top_k):
+            next_state = successor(state, move)
+            if is_finished(next_state):
+                continue  # the game ends there and the opponent never moves
+            # what memory.get_recent() returns once the move is made
+            recent = (memory.get_recent(RECENT_MOVES) + [move])[-RECENT_MOVES:]
+            prepared = agent.prepare_prompt(next_state, recent, prompt)
+            if prepared is None or prepared[0] in pending:
+                continue
+            text, legal_moves = prepared
+            entry = {"started": time.perf_counter(), "finished": None}
+            entry["task"] = asyncio.ensure_future(self._run(agent, text, prompt, legal_moves, entry))
+            pending[text] = entry
+            self.calls += 1
+
+    async def _run(self, agent, text, prompt, legal_moves, entry):
+        try:
+            return await agent._aanswer(text, prompt, legal_moves)
+        finally:
+            entry["finished"] = time.perf_counter()
+
+    """
+    Take the speculative call matching an agent's actual prompt, cancelling the agent's other ones.
+
+    Args:
+        agent: The agent whose turn it is.
+        text (str): The prompt it is about to send.
+
+    Returns:
+        asyncio.Task: The speculative call to await, or None on a miss.
+    """
+    def claim(self, agent, text):
+        pending = self.pending.pop(agent, {})
+        entry = pending.pop(text, None)
+        self._discard(pending.values())
+        if entry is None:
+            return None
+        self.hits += 1
+        claimed = time.perf_counter()
+        self.saved_s += min(claimed, entry["finished"] or claimed) - entry["started"]
+        return entry["task"]
+
+    # Cancel every call still pending, at the end of the game
+    def cancel(self):
+        for pending in self.pending.values():
+            self._discard(pending.values())
+        self.pending = {}
+
+    def _discard(self, entries):
+        for entry in entries:
+            task = entry["task"]
+            self.wasted += 1
+            if task.done():
+                if not task.cancelled():
+                    task.exception()  # retrieve it so a failed unused call is not reported as unhandled
+            else:
+                task.cancel()
+
+    # Counters for the game's result dict
+    def summary(self):
+        return {
+            "speculative_calls": self.calls,
+            "speculative_hits": self.hits,
+            "speculative_wasted": self.wasted,
+            "speculation_saved_s": round(self.saved_s, 3),
+        }
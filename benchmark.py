@@ -1,69 +1,470 @@
 import os
-import csv
+import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-from main import run_game
+from main import run_game, arun_game, derive_seed, DEFAULT_MODELS
 from main import prompt_types_hanoi, prompt_types_nim
+from llm.response_cache import ResponseCache, CacheMissError, DEFAULT_CACHE_PATH
+from prompts.registry import PROMPTS
+from llm.pool import warm_up, mark_warm
+from llm.endpoints import print_endpoint_stats, split_endpoints, endpoint_counters, merge_counters
+from telemetry.recorder import PHASES, percentile
+from results.store import ResultStore, DEFAULT_STORE_PATH
+from results.stopping import StoppingRule
+from traces.recorder import TraceWriter
 
 # game config
-game_input = ""
 NUM_GAMES = 10
-results = []
-
-# Ensure benchmarks directory exists
-os.makedirs("benchmarks", exist_ok=True)
-
-# get input for game type
-game_input = input("Select Towers of Hanoi or Nim Game (H/N):").strip().lower()
-if game_input == "h":
-    game_input = "hanoi"
-elif game_input == "n":
-    game_input = "nim"
-else:
-    print("Invalid selection! Defaulting to Nim.")
-    game_input = "nim"
-
-# print possible prompt types and get inputs
-if game_input == "hanoi":
-    print("Available prompt types for Towers of Hanoi:")
-    for i, prompt in enumerate(prompt_types_hanoi, start=1):
-        print(f"{i}. {prompt}")
-    selected_prompts = input("Select prompt types by number (comma-separated, e.g. 1,2): ").strip()
-    selected_prompts = [prompt_types_hanoi[int(i) - 1] for i in selected_prompts.split(",") if i.isdigit()]
-
-elif game_input == "nim":
-    print("Available prompt types for Nim:")
-    for i, prompt in enumerate(prompt_types_nim, start=1):
-        print(f"{i}. {prompt}")
-    selected_prompts = input("Select prompt types by number (comma-separated, e.g. 1,2): ").strip()
-    selected_prompts = [prompt_types_nim[int(i) - 1] for i in selected_prompts.split(",") if i.isdigit()]
-
-
-
-# for all selected prompts,
-for prompt in selected_prompts:
-    
-    print(f"\nRunning benchmark for {game_input} with prompt type: {prompt}")
-    results = []  # reset results for each prompt
-
-    # run games, appending results
-    for i in range(NUM_GAMES):
-        result = run_game(selected_game=game_input, output=False, prompt=prompt)
+RUNNER = "async"  # "async" keeps CONCURRENCY games in flight, "process" spreads games over WORKERS processes
+CONCURRENCY = 4  # games kept in flight at once; match the Ollama server's OLLAMA_NUM_PARALLEL
+WORKERS = os.cpu_count()  # worker processes for the "process" runner
+BASE_SEED = 0  # every game's seed is derived from this, its game, prompt and game number
+CACHE_MODE = None  # None (no cache), "readwrite", "replay-only" (offline rerun) or "bypass" (fresh samples, still recorded)
+CACHE_PATH = DEFAULT_CACHE_PATH
+CACHE_MAX_ENTRIES = 100_000
+BACKEND = "ollama"  # "ollama" (ChatOllama) or "http" (plain HTTP client, e.g. against llm/stub_server.py)
+BASE_URL = None  # LLM server URL, None for the local Ollama default
+# Several servers: a list of "URL=N" specs (N requests at once per server) or {"url", "concurrency", "models"}
+# dicts; calls go to the least busy server, preferring those the model is loaded on (see llm/endpoints.py)
+WARM_UP = True  # load the models before timing starts, so cold starts do not pollute move latency
+GAME_OPTIONS = {  # extra setup_game options, e.g. num_disks, heaps, compact_hanoi
+    "stream": False,  # stream answers and cancel generation once a move tuple arrives
+    "output_format": "text",  # "json" constrains answers to a schema of the legal moves
+    "models": DEFAULT_MODELS,  # agent A's and agent B's models
+    "compact_moves": False,  # describe Nim legal moves as tuple ranges instead of listing every move
+    "keep_alive": "30m",  # how long Ollama keeps the models loaded between calls
+    "cycle_limit": None,  # end a game once a position is reached this many times (e.g. 3), None plays to the turn cap
+    "speculate": 0,  # opponent prompts sent ahead for the k likeliest next positions (e.g. 2), 0 disables it
+    "samples": 1,  # self-consistency: answers voted per move (e.g. 5), requested concurrently
+    "quorum": None,  # votes for one move that settle it early, None for a majority of the samples
+    "deadline": None,  # seconds after which a move is voted from the samples in, None waits for the quorum
+    # Resilience (llm/resilience.py): with any of these set, a stuck or failing call skips the move instead of
+    # hanging or crashing the benchmark
+    "call_timeout": None,  # seconds per LLM call attempt, e.g. 60
+    "retries": 0,  # extra attempts, with jittered exponential backoff
+    "hedge": False,  # duplicate a call once it outlasts the model's p95 latency, first answer wins
+    "game_timeout": None,  # seconds per game
+}
+# Per-move instrumentation: None disables it; a list of sinks (possibly empty) adds p50/p95/p99 per move phase
+# to the stored results, e.g. [JsonlSink("benchmarks/moves.jsonl"), PrometheusSink("benchmarks/metrics.prom")] after
+# "from telemetry.sinks import JsonlSink, PrometheusSink"
+TELEMETRY_SINKS = []
+STORE_PATH = DEFAULT_STORE_PATH  # append-only Parquet result store, partitioned by game/model/prompt/date
+TRACE_DIR = None  # directory for binary move traces of every game (replayable without an LLM), e.g. "benchmarks/traces"
+# Adaptive game count: None plays NUM_GAMES per prompt; a dict of StoppingRule settings stops each prompt once the
+# Nim win rate / Hanoi solve rate is known precisely enough or an SPRT is decisive, with NUM_GAMES as the cap,
+# e.g. {"min_games": 10, "half_width": 0.1, "p0": 0.3, "p1": 0.7}
+ADAPTIVE = None
+ADAPTIVE_MAX_GAMES = 100  # cap per prompt of "bench --adaptive" when --games is not given
+
+"""
+Seed for one game of a benchmark. Pass it to run_game to re-run that game on its own.
+
+Args:
+    game (str): "hanoi" or "nim".
+    prompt (str): The prompt type.
+    game_number (int): 1-based game number within the prompt's benchmark.
+    base_seed (int): The benchmark's base seed.
+
+Returns:
+    int: The game's seed.
+"""
+def game_seed(game, prompt, game_number, base_seed=BASE_SEED):
+    return derive_seed(base_seed, game, prompt, game_number)
+
+"""
+Run a batch of games concurrently, keeping at most `concurrency` of them in flight.
+
+Args:
+    game (str): "hanoi" or "nim".
+    prompt (str): The prompt type both agents use.
+    num_games (int): Number of games to play.
+    concurrency (int): Maximum number of games in flight at once.
+    base_seed (int): Base seed the per-game seeds are derived from.
+    cache (ResponseCache): Optional response cache shared by every game.
+    backend (str): LLM backend kind.
+    base_url (str): LLM server URL.
+    stopping (StoppingRule): Optional adaptive rule, fed in game order; once it is decided, games not yet started
+        are skipped and those finished past the deciding game are dropped.
+    **setup_options: Extra run_game options (see GAME_OPTIONS and TELEMETRY_SINKS).
+
+Returns:
+    list: One result dict per game played, in game order. A game that needs a response a "replay-only" cache
+        does not have is reported and left out.
+"""
+async def run_games_async(game, prompt, num_games=NUM_GAMES, concurrency=CONCURRENCY, base_seed=BASE_SEED, cache=None,
+                          backend=BACKEND, base_url=BASE_URL, stopping=None, **setup_options):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def play(i):
+        async with semaphore:
+            if stopping is not None and stopping.decided:
+                return None
+            try:
+                result = await arun_game(selected_game=game, output=False, prompt=prompt,
+                                         seed=game_seed(game, prompt, i + 1, base_seed), cache=cache,
+                                         backend=backend, base_url=base_url, **setup_options)
+            except CacheMissError as e:
+                print(f"Game {i+1}: skipped, {e}")
+                if stopping is not None:
+                    stopping.skip(i + 1)
+                return None
         result["game_number"] = i + 1
-        results.append(result)
         print(f"Game {i+1}: Winner = {result['winner']}, Turns = {result['turns']}")
+        if stopping is not None:
+            stopping.offer(result)
+        return result
+
+    # gather keeps results in game order regardless of completion order
+    results = await asyncio.gather(*(play(i) for i in range(num_games)))
+    return [result for result in results if result is not None and (stopping is None or stopping.keeps(result))]
+
+# Worker entry point for the process pool; must live at module level so it can be pickled
+def _play_game_task(task):
+    game, prompt, game_number, seed, cache, backend, base_url, setup_options = task
+    try:
+        result = run_game(selected_game=game, output=False, prompt=prompt, seed=seed, cache=cache,
+                          backend=backend, base_url=base_url, **setup_options)
+    except CacheMissError as e:
+        result = {"skipped": str(e)}
+    result["game_number"] = game_number
+    # the worker's endpoint pool is its own, so its counters travel back with each game
+    counters = endpoint_counters(base_url)
+    if counters is not None:
+        result["endpoint_counters"] = counters
+    return result
+
+"""
+Run the games of several prompts across a pool of worker processes.
+
+Args:
+    game (str): "hanoi" or "nim".
+    prompts (list): Prompt types to benchmark.
+    num_games (int): Number of games per prompt.
+    workers (int): Number of worker processes (defaults to all cores).
+    base_seed (int): Base seed the per-game seeds are derived from.
+    cache (ResponseCache): Optional response cache; each worker opens its own connection to it.
+    backend (str): LLM backend kind.
+    base_url (str): LLM server URL, or endpoint specs; their limits are divided among the workers (see
+        llm.endpoints.split_endpoints), which may lower the number of workers, and their statistics are printed.
+    warmed (bool): Whether the models were already loaded by warm_up_models; workers then treat them as warm.
+    stopping (dict): Optional prompt type -> StoppingRule, fed in game order; once a prompt's rule is decided,
+        its queued games are cancelled and those finished past the deciding game are dropped.
+    **setup_options: Extra run_game options (see GAME_OPTIONS and TELEMETRY_SINKS).
+
+Returns:
+    dict: Prompt type -> list of result dicts, in game order. Games missing from a "replay-only" cache are
+        reported and left out.
+"""
+def run_games_parallel(game, prompts, num_games=NUM_GAMES, workers=WORKERS, base_seed=BASE_SEED, cache=None,
+                       backend=BACKEND, base_url=BASE_URL, warmed=False, stopping=None, **setup_options):
+    workers = workers or os.cpu_count()
+    base_url, pooled_workers = split_endpoints(base_url, workers)
+    if pooled_workers < workers:
+        print(f"Using {pooled_workers} worker processes, so every worker keeps a slot of each endpoint within its limit")
+        workers = pooled_workers
+    tasks = [(game, prompt, i + 1, game_seed(game, prompt, i + 1, base_seed), cache, backend, base_url, setup_options)
+             for prompt in prompts for i in range(num_games)]
+    results = {prompt: [] for prompt in prompts}
+    endpoint_totals = {}
+    start = time.perf_counter()
+
+    # Returns whether the game produced a result
+    def record(prompt, result):
+        merge_counters(endpoint_totals, result.pop("endpoint_counters", []))
+        if "skipped" in result:
+            print(f"[{prompt}] Game {result['game_number']}: skipped, {result['skipped']}")
+            return False
+        results[prompt].append(result)
+        print(f"[{prompt}] Game {result['game_number']}: Winner = {result['winner']}, Turns = {result['turns']}")
+        return True
+
+    # map yields in submission order, so results merge back in prompt/game order
+    chunksize = max(1, len(tasks) // ((workers or 1) * 4))
+    warm_args = (setup_options.get("models", DEFAULT_MODELS), backend, base_url, setup_options.get("keep_alive"))
+    with ProcessPoolExecutor(max_workers=workers, initializer=mark_warm if warmed else None,
+                             initargs=warm_args if warmed else ()) as executor:
+        if stopping is None:
+            for (_, prompt, *_), result in zip(tasks, executor.map(_play_game_task, tasks, chunksize=chunksize)):
+                record(prompt, result)
+        else:
+            # adaptive: games are submitted one by one so a decided prompt's queued games can be cancelled
+            futures = {executor.submit(_play_game_task, task): task[1] for task in tasks}
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                prompt, result = futures[future], future.result()
+                rule = stopping[prompt]
+                decided = rule.decided
+                if record(prompt, result):
+                    rule.offer(result)
+                else:
+                    rule.skip(result["game_number"])
+                if rule.decided and not decided:
+                    for pending, pending_prompt in futures.items():
+                        if pending_prompt == prompt:
+                            pending.cancel()
+    print_endpoint_stats(base_url, (list(endpoint_totals.values()), time.perf_counter() - start))
+    if stopping is None:
+        return results
+    return {prompt: sorted((result for result in prompt_results if stopping[prompt].keeps(result)),
+                           key=lambda result: result["game_number"])
+            for prompt, prompt_results in results.items()}
+
+"""
+Load the benchmark's models into the server before any game is timed, printing each model's cold start.
+
+Args:
+    backend (str): LLM backend kind.
+    base_url (str): LLM server URL.
+    models (list): Model names.
+    keep_alive (str or int): How long the server keeps the models loaded.
+"""
+def warm_up_models(backend=BACKEND, base_url=BASE_URL, models=DEFAULT_MODELS, keep_alive=None):
+    for model, seconds in warm_up(models, backend, base_url, keep_alive).items():
+        print(f"Cold start {model}: {seconds:.2f}s")
+
+"""
+Print per-prompt averages that are not visible from individual game lines.
+
+Args:
+    results (list): Result dicts from run_game.
+"""
+def print_summary(results):
+    def mean(key):
+        values = [r[key] for r in results if r.get(key) is not None]
+        return sum(values) / len(values) if values else None
+
+    calls = sum(r["llm_calls_agent_a"] + r["llm_calls_agent_b"] for r in results)
+    accepted = sum(r["accepted_moves_agent_a"] + r["accepted_moves_agent_b"] for r in results)
+    tokens = sum(r["completion_tokens_agent_a"] + r["completion_tokens_agent_b"] for r in results)
+    if accepted:
+        print(f"Efficiency: {calls / accepted:.2f} LLM calls and {tokens / accepted:.1f} output tokens per accepted move")
+
+    turns = sum(r["turns"] for r in results)
+    if turns:
+        print(f"Prompt size: {sum(r['prompt_tokens'] for r in results) / turns:.0f} tokens per turn")
+    if accepted:
+        optimal = sum(r["optimal_moves_agent_a"] + r["optimal_moves_agent_b"] for r in results)
+        illegal = sum(r["illegal_moves_agent_a"] + r["illegal_moves_agent_b"] for r in results)
+        print(f"Accuracy: {optimal / accepted:.0%} of accepted moves optimal, {illegal / turns:.0%} of turns illegal, "
+              f"{sum(r['duration_s'] for r in results) / turns * 1000:.0f} ms per turn")
+    rejected = sum(r.get("rejected_samples") or 0 for r in results)
+    cancelled = sum(r.get("cancelled_samples") or 0 for r in results)
+    if rejected or cancelled:
+        print(f"Self-consistency: {rejected} samples dropped as unusable, {cancelled} cancelled once their move "
+              f"was settled, {sum(r.get('deadline_votes') or 0 for r in results)} moves voted at the deadline")
+
+    ttft, ttm = mean("mean_ttft_ms"), mean("mean_time_to_move_ms")
+    if ttm is not None:
+        ttft_text = f"{ttft:.0f} ms" if ttft is not None else "n/a"
+        print(f"Latency: time to move {ttm:.0f} ms, time to first token {ttft_text}, "
+              f"{sum(r['early_stops'] for r in results)} generations stopped early")
+    phases = []
+    for phase in PHASES:
+        p95 = [r[f"{phase}_p95_ms"] for r in results if r.get(f"{phase}_p95_ms") is not None]
+        if p95:
+            phases.append(f"{phase} {percentile(p95, 50):.2f} ms")
+    if phases:
+        print(f"Move phases (median per-game p95): {', '.join(phases)}")
+
+    cycled = [r for r in results if r.get("cycle_stop")]
+    if cycled:
+        print(f"Cycle stops: {len(cycled)} game(s) ended on a repeated position, "
+              f"{sum(20 - r['turns'] for r in cycled)} turns of LLM calls saved")
+
+    speculated = [r for r in results if r.get("speculative_calls") is not None]
+    if speculated:
+        calls = sum(r["speculative_calls"] for r in speculated)
+        hits = sum(r["speculative_hits"] for r in speculated)
+        turns = sum(r["turns"] for r in speculated)
+        print(f"Speculation: {hits}/{turns} turns answered ahead ({hits / max(turns, 1):.0%}), "
+              f"{sum(r['speculative_wasted'] for r in speculated)} of {calls} speculative calls wasted, "
+              f"{sum(r['speculation_saved_s'] for r in speculated) / len(speculated):.2f} s saved per game")
+
+    counters = {key: sum(r.get(key) or 0 for r in results)
+                for key in ["timeouts", "retries", "hedged_calls", "hedge_wins", "failed_calls", "circuit_rejections"]}
+    if any(counters.values()):
+        from llm.resilience import unhealthy
+        print(f"Resilience: {counters['timeouts']} timeouts, {counters['retries']} retries, "
+              f"{counters['hedged_calls']} hedged calls ({counters['hedge_wins']} won by the duplicate), "
+              f"{counters['failed_calls']} moves without an answer, {counters['circuit_rejections']} calls refused by "
+              f"an open circuit, {sum(bool(r.get('deadline_stop')) for r in results)} games cut at their deadline")
+        for name in unhealthy():
+            print(f"⚠️ Unhealthy: {name}")
+
+    cold = [r["cold_start_ms"] for r in results if r.get("cold_start_ms") is not None]
+    if cold:
+        print(f"Cold start: {max(cold):.0f} ms in {len(cold)} game(s), excluded from time to move")
+
+"""
+Print where an adaptive cell stopped and the LLM calls it saved against playing every game up to the cap.
+
+Args:
+    rule (StoppingRule): The cell's rule.
+    results (list): Result dicts of the games played.
+
+Returns:
+    int: Estimated LLM calls saved (games skipped x mean calls per game played).
+"""
+def print_stopping(rule, results):
+    calls = sum(r["llm_calls_agent_a"] + r["llm_calls_agent_b"] for r in results)
+    skipped = rule.max_games - rule.played - rule.missing
+    saved = round(skipped * calls / len(results)) if results else 0
+    low, high = rule.interval
+    rate = "solve rate" if rule.game == "hanoi" else "agent A win rate"
+    dropped = f", {rule.played - len(results)} finished past the decision dropped" if rule.played > len(results) else ""
+    if rule.missing:
+        dropped += f", {rule.missing} without a result"
+    print(f"Stopped after {len(results)}/{rule.max_games} games ({rule.reason or 'not decided'}): "
+          f"{rate} {rule.successes / max(rule.games, 1):.2f} [{low:.2f}, {high:.2f}], "
+          f"{skipped} games and ~{saved} LLM calls saved{dropped}")
+    return saved
+
+"""
+Print the estimated token counts of the selected prompt templates: the static prefix the server can
+reuse between turns, and the fixed text of the per-turn suffix.
+
+Args:
+    game (str): "hanoi" or "nim".
+    prompts (list): Prompt types to report.
+"""
+def print_prompt_tokens(game, prompts):
+    counts = PROMPTS.token_counts(game)
+    for prompt in prompts:
+        print(f"Template {prompt}: {counts[prompt]['prefix']} static prefix tokens + "
+              f"{counts[prompt]['suffix']} fixed suffix tokens")
+
+# Interactive entry point: asks for the game and prompt types, everything else comes from the config above
+def main():
+    # get input for game type
+    game_input = input("Select Towers of Hanoi or Nim Game (H/N):").strip().lower()
+    if game_input == "h":
+        game_input = "hanoi"
+    elif game_input == "n":
+        game_input = "nim"
+    else:
+        print("Invalid selection! Defaulting to Nim.")
+        game_input = "nim"
+
+    # print possible prompt types and get inputs
+    if game_input == "hanoi":
+        print("Available prompt types for Towers of Hanoi:")
+        for i, prompt in enumerate(prompt_types_hanoi, start=1):
+            print(f"{i}. {prompt}")
+        selected_prompts = input("Select prompt types by number (comma-separated, e.g. 1,2): ").strip()
+        selected_prompts = [prompt_types_hanoi[int(i) - 1] for i in selected_prompts.split(",") if i.isdigit()]
+
+    elif game_input == "nim":
+        print("Available prompt types for Nim:")
+        for i, prompt in enumerate(prompt_types_nim, start=1):
+            print(f"{i}. {prompt}")
+        selected_prompts = input("Select prompt types by number (comma-separated, e.g. 1,2): ").strip()
+        selected_prompts = [prompt_types_nim[int(i) - 1] for i in selected_prompts.split(",") if i.isdigit()]
+
+    run_benchmark(game_input, selected_prompts)
+
+"""
+Run a benchmark and append its results to the result store. Defaults come from the config constants above.
+
+Args:
+    game (str): "hanoi" or "nim".
+    prompts (list): Prompt types to benchmark.
+    num_games (int): Number of games per prompt.
+    runner (str): "async" or "process".
+    concurrency (int): Games in flight for the "async" runner.
+    workers (int): Worker processes for the "process" runner.
+    base_seed (int): Base seed the per-game seeds are derived from.
+    cache_mode (str): Response cache mode, or None for no cache.
+    backend (str): LLM backend kind.
+    base_url (str): LLM server URL.
+    warm (bool): Load the models before timing starts; skipped in "replay-only" cache mode.
+    sinks (list): Telemetry sinks, or None to disable instrumentation.
+    store_path (str): Result store directory.
+    game_options (dict): Extra setup_game options, defaults to GAME_OPTIONS.
+    adaptive (dict): StoppingRule settings to stop each prompt early, or None to play num_games per prompt.
+    trace_dir (str): Directory to append move traces to, or None for no traces.
+
+Returns:
+    dict: Prompt type -> list of result dicts.
+"""
+def run_benchmark(game, prompts, num_games=NUM_GAMES, runner=RUNNER, concurrency=CONCURRENCY, workers=WORKERS,
+                  base_seed=BASE_SEED, cache_mode=CACHE_MODE, backend=BACKEND, base_url=BASE_URL, warm=WARM_UP,
+                  sinks=TELEMETRY_SINKS, store_path=STORE_PATH, game_options=None, adaptive=ADAPTIVE,
+                  trace_dir=TRACE_DIR):
+    game_options = dict(GAME_OPTIONS if game_options is None else game_options)
+    store = ResultStore(store_path)
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    models = game_options.get("models", DEFAULT_MODELS)
+    print(f"\nBase seed: {base_seed}")
+    print_prompt_tokens(game, prompts)
+    # an offline replay-only rerun never reaches the server, so there is nothing to load
+    warm = warm and cache_mode != "replay-only"
+    if warm:
+        warm_up_models(backend, base_url, models, game_options.get("keep_alive"))
+    cache = ResponseCache(CACHE_PATH, CACHE_MAX_ENTRIES, cache_mode) if cache_mode else None
+    # one stopping rule per prompt; num_games becomes the cap
+    stopping = {prompt: StoppingRule(game, **{"max_games": num_games, **adaptive}) for prompt in prompts} if adaptive else None
+    if stopping:
+        num_games = stopping[prompts[0]].max_games
+    saved = 0
+    traces = TraceWriter(trace_dir, run_id) if trace_dir else None
+
+    if runner == "process":
+        # all prompts share one pool so workers stay busy across prompt boundaries
+        print(f"\nRunning benchmark for {game} with prompt types: {', '.join(prompts)} ({workers} worker processes)")
+        start = time.perf_counter()
+        results_by_prompt = run_games_parallel(game, prompts, num_games, workers, base_seed, cache,
+                                               backend, base_url, warm, stopping, sinks=sinks, traces=traces, **game_options)
+        elapsed = time.perf_counter() - start
+        total = sum(len(results) for results in results_by_prompt.values())
+        print(f"{total} games in {elapsed:.1f}s ({total / elapsed * 60:.1f} games/min)")
+        for prompt, results in results_by_prompt.items():
+            print(f"[{prompt}]", end=" ")
+            print_summary(results)
+            if stopping:
+                saved += print_stopping(stopping[prompt], results)
+            store.append(results, game, prompt, models, run_id)
+
+    else:
+        results_by_prompt = {}
+        # for all selected prompts,
+        for prompt in prompts:
+
+            print(f"\nRunning benchmark for {game} with prompt type: {prompt} ({concurrency} games in flight)")
+
+            # run games concurrently, results come back in game order
+            start = time.perf_counter()
+            results = asyncio.run(run_games_async(game, prompt, num_games, concurrency, base_seed, cache, backend,
+                                                  base_url, stopping and stopping[prompt], sinks=sinks, traces=traces, **game_options))
+            elapsed = time.perf_counter() - start
+            print(f"{len(results)} games in {elapsed:.1f}s ({len(results) / elapsed * 60:.1f} games/min)")
+            print_summary(results)
+            print_endpoint_stats(base_url)
+            if stopping:
+                saved += print_stopping(stopping[prompt], results)
+
+            # Append results to the result store
+            store.append(results, game, prompt, models, run_id)
+            results_by_prompt[prompt] = results
+
+    if cache is not None:
+        cache.close()
+    if traces is not None:
+        traces.close()
+    for sink in sinks or []:
+        sink.close()
+
+    if stopping:
+        print(f"\nAdaptive stopping saved ~{saved} LLM calls in total")
+    print(f"\n✅ Benchmarking completed. Results have been appended to {store_path}.\n")
+    return results_by_prompt
 
-    # create timestamped filename in benchmarks dir
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = os.path.join("benchmarks", f"{game_input}_benchmark_{prompt}_{timestamp}.csv")
-
-    # Save results to CSV
-    with open(filename, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=[
-            "game_number", "winner", "turns", "solved",
-            "illegal_moves_agent_a", "illegal_moves_agent_b",
-            "fallbacks_agent_a", "fallbacks_agent_b"
-        ])
-        writer.writeheader()
-        writer.writerows(results)
-
-print(f"\n✅ Benchmarking completed. Results have been saved to benchmarks directory.\n")
\ No newline at end of file
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        # flags given: run non-interactively, e.g. python benchmark.py --game nim --prompts baseline
+        from cli import run
+        sys.exit(run(["bench", *sys.argv[1:]]))
+    main()
@@ -0,0 +1,250 @@
+import argparse
+import json
+import sys
+
+# Command line interface for scripted runs: python main.py <play|bench|matrix|baseline|replay|plot> [flags]
+# Only argparse is imported up front; each subcommand imports what it needs when it runs,
+# so `--help` and argument errors return in tens of milliseconds.
+
+GAMES = ["nim", "hanoi"]
+DEFAULT_MODELS = ["llama3.2:latest", "gemma3:latest"]  # same as main.DEFAULT_MODELS
+
+"""
+Split comma-separated and repeated flag values into one list.
+
+Args:
+    values (list): Raw flag values, e.g. ["baseline,math_genius", "XOR_strat"].
+
+Returns:
+    list: The individual values.
+"""
+def split_list(values):
+    return [item.strip() for value in values or [] for item in value.split(",") if item.strip()]
+
+# Flags shared by play and bench
+def add_game_arguments(parser):
+    parser.add_argument("--game", choices=GAMES, default="nim")
+    parser.add_argument("--models", nargs=2, metavar=("MODEL_A", "MODEL_B"), default=DEFAULT_MODELS,
+                        help="agent A's and agent B's models")
+    parser.add_argument("--backend", choices=["ollama", "http"], default="ollama")
+    parser.add_argument("--base-url", nargs="+", default=None, metavar="URL[=N]",
+                        help="LLM server URL (default: local Ollama); several URLs balance the calls over them, "
+                             "each taking N requests at once (default 1)")
+    parser.add_argument("--keep-alive", default=None, help="how long the server keeps the models loaded, e.g. 30m")
+    parser.add_argument("--stream", action="store_true", help="stop each generation once a move has been streamed")
+    parser.add_argument("--output-format", choices=["text", "json"], default="text")
+    parser.add_argument("--num-disks", type=int, default=3, help="Hanoi disks")
+    parser.add_argument("--compact-hanoi", action="store_true", help="use the integer-encoded Hanoi state")
+    parser.add_argument("--heaps", type=int, nargs="+", default=[3, 4, 5], help="Nim starting heaps")
+    parser.add_argument("--compact-moves", action="store_true",
+                        help="describe Nim legal moves as tuple ranges instead of listing every move")
+    parser.add_argument("--cycle-limit", type=int, default=None,
+                        help="end a game once a position has been reached this many times")
+    parser.add_argument("--speculate", type=int, default=0, metavar="K",
+                        help="send the opponent's prompts for the K likeliest next positions while an agent decides")
+    parser.add_argument("--samples", type=int, default=1, help="answers voted per move (self-consistency)")
+    parser.add_argument("--quorum", type=int, default=None, help="votes that settle a move (default: a majority)")
+    parser.add_argument("--deadline", type=float, default=None, help="seconds after which a move is voted anyway")
+    parser.add_argument("--call-timeout", type=float, default=None, help="seconds an LLM call may take before a retry")
+    parser.add_argument("--retries", type=int, default=0, help="extra attempts for a failed or timed-out LLM call")
+    parser.add_argument("--hedge", action="store_true",
+                        help="send a duplicate request when a call outlasts the model's p95 latency")
+    parser.add_argument("--game-timeout", type=float, default=None, help="seconds a whole game may take")
+
+# One server URL as before, or the endpoint specs of a pool
+def server(args):
+    if args.base_url is None or len(args.base_url) > 1:
+        return args.base_url
+    return args.base_url[0]
+
+def game_options(args):
+    return {
+        "models": tuple(args.models),
+        "keep_alive": args.keep_alive,
+        "stream": args.stream,
+        "output_format": args.output_format,
+        "num_disks": args.num_disks,
+        "compact_hanoi": args.compact_hanoi,
+        "compact_moves": args.compact_moves,
+        "heaps": tuple(args.heaps),
+        "cycle_limit": args.cycle_limit,
+        "speculate": args.speculate,
+        "samples": args.samples,
+        "quorum": args.quorum,
+        "deadline": args.deadline,
+        "call_timeout": args.call_timeout,
+        "retries": args.retries,
+        "hedge": args.hedge,
+        "game_timeout": args.game_timeout,
+    }
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="Duel LLM agents in Towers of Hanoi and Nim.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    play = commands.add_parser("play", help="play one game")
+    add_game_arguments(play)
+    play.add_argument("--prompt", default="baseline")
+    play.add_argument("--seed", type=int, default=None)
+    play.add_argument("--quiet", action="store_true", help="do not print the moves")
+    play.add_argument("--output", default=None, help="write the result as JSON to this file ('-' for stdout)")
+    play.add_argument("--trace", default=None, help="append the game's move trace to this directory")
+    play.set_defaults(handler=play_command)
+
+    bench = commands.add_parser("bench", help="benchmark prompt types and append the results to the result store")
+    add_game_arguments(bench)
+    bench.add_argument("--prompts", action="append", help="prompt types, comma-separated or repeated (default: all)")
+    bench.add_argument("--games", type=int, default=None,
+                       help="games per prompt (default: 10), or their cap with --adaptive (default: 100)")
+    bench.add_argument("--adaptive", action="store_true",
+                       help="stop each prompt once its win/solve rate is known to --precision or an SPRT is decisive")
+    bench.add_argument("--min-games", type=int, default=10, help="games always played with --adaptive")
+    bench.add_argument("--precision", type=float, default=0.1, help="target confidence interval half-width")
+    bench.add_argument("--runner", choices=["async", "process"], default="async")
+    bench.add_argument("--concurrency", type=int, default=4, help="games in flight for the async runner")
+    bench.add_argument("--workers", type=int, default=None, help="worker processes for the process runner")
+    bench.add_argument("--seed", type=int, default=0, help="base seed")
+    bench.add_argument("--cache-mode", choices=["readwrite", "replay-only", "bypass"], default=None)
+    bench.add_argument("--no-warm-up", dest="warm_up", action="store_false", help="skip loading the models first")
+    bench.add_argument("--telemetry", default=None, help="also write per-move records to this JSONL file")
+    bench.add_argument("--output", default=None, help="result store directory (default: benchmarks/store)")
+    bench.add_argument("--trace", default=None, help="append a move trace of every game to this directory")
+    bench.set_defaults(handler=bench_command)
+
+    matrix = commands.add_parser("matrix", help="run or resume a benchmark matrix described by a config file")
+    matrix.add_argument("config", help="matrix config (.toml or .json), see configs/matrix.example.toml")
+    matrix.add_argument("--fresh", action="store_true", help="discard the journal and replay every game")
+    matrix.set_defaults(handler=matrix_command)
+
+    baseline = commands.add_parser("baseline", help="simulate random, XOR-optimal and solver players for the plots")
+    baseline.add_argument("--games", type=int, default=1_000_000, help="games per pairing and configuration")
+    baseline.add_argument("--heaps", action="append", help="Nim starting heaps, e.g. 3,4,5; repeat for more (default: 3,4,5)")
+    baseline.add_argument("--num-disks", type=int, nargs="+", default=[3], help="Hanoi disk counts")
+    baseline.add_argument("--seed", type=int, default=0)
+    baseline.add_argument("--output", default=None, help="baselines file (default: benchmarks/baselines.json)")
+    baseline.set_defaults(handler=baseline_command)
+
+    replay = commands.add_parser("replay", help="replay move traces without an LLM")
+    replay.add_argument("traces", help="trace directory")
+    replay.add_argument("--game-id", default=None, help="print one game's turns instead of checking every game")
+    replay.set_defaults(handler=replay_command)
+
+    plot = commands.add_parser("plot", help="render the plots from the result store")
+    plot.add_argument("--store", default=None, help="result store directory (default: benchmarks/store)")
+    plot.add_argument("--output", default="plots", help="plot directory")
+    plot.add_argument("--force", action="store_true", help="re-render every plot")
+    plot.set_defaults(handler=plot_command)
+    return parser
+
+def play_command(args):
+    from main import run_game
+    traces = None
+    if args.trace:
+        from traces.recorder import TraceWriter
+        traces = TraceWriter(args.trace)
+    result = run_game(selected_game=args.game, output=not args.quiet, prompt=args.prompt, seed=args.seed,
+                      backend=args.backend, base_url=server(args), traces=traces, **game_options(args))
+    if traces is not None:
+        traces.close()
+    if args.output:
+        text = json.dumps(result, indent=2)
+        if args.output == "-":
+            print(text)
+        else:
+            with open(args.output, "w") as f:
+                f.write(text + "\n")
+    return 0
+
+def bench_command(args):
+    import benchmark
+    from main import prompt_types_hanoi, prompt_types_nim
+    available = prompt_types_hanoi if args.game == "hanoi" else prompt_types_nim
+    prompts = split_list(args.prompts) or available
+    unknown = [prompt for prompt in prompts if prompt not in available]
+    if unknown:
+        print(f"Unknown {args.game} prompt types: {', '.join(unknown)} (available: {', '.join(available)})", file=sys.stderr)
+        return 2
+
+    num_games = args.games if args.games is not None else benchmark.ADAPTIVE_MAX_GAMES if args.adaptive else 10
+    if args.adaptive and num_games <= args.min_games:
+        print(f"--adaptive cannot stop early: --games {num_games} is not above --min-games {args.min_games}",
+              file=sys.stderr)
+
+    sinks = []
+    if args.telemetry:
+        from telemetry.sinks import JsonlSink
+        sinks.append(JsonlSink(args.telemetry))
+    benchmark.run_benchmark(
+        args.game, prompts, num_games=num_games, runner=args.runner, concurrency=args.concurrency,
+        workers=args.workers or benchmark.WORKERS, base_seed=args.seed, cache_mode=args.cache_mode,
+        backend=args.backend, base_url=server(args), warm=args.warm_up, sinks=sinks,
+        store_path=args.output or benchmark.STORE_PATH, game_options=game_options(args),
+        adaptive={"min_games": args.min_games, "half_width": args.precision} if args.adaptive else None,
+        trace_dir=args.trace)
+    return 0
+
+def matrix_command(args):
+    from matrix import load_config, arun_matrix
+    import asyncio
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError) as e:
+        print(f"Invalid matrix config {args.config}: {e}", file=sys.stderr)
+        return 2
+    asyncio.run(arun_matrix(config, args.fresh))
+    return 0
+
+def baseline_command(args):
+    from puzzles.simulator import simulate_baselines, save_baselines, BASELINES_PATH
+    heaps = [tuple(int(count) for count in value.split(",")) for value in args.heaps or ["3,4,5"]]
+    baselines = simulate_baselines(args.games, heaps, args.num_disks, args.seed)
+    save_baselines(baselines, args.output or BASELINES_PATH)
+    return 0
+
+def replay_command(args):
+    import time
+    from traces.recorder import TraceReader
+    from traces.replay import iter_replay, verify
+    reader = TraceReader(args.traces)
+    if args.game_id is not None:
+        if args.game_id not in reader:
+            print(f"No trace for game {args.game_id} in {args.traces}", file=sys.stderr)
+            return 2
+        trace = reader.get(args.game_id)
+        print(json.dumps(trace.metadata))
+        for number, turn, state, _ in iter_replay(trace):
+            status = "accepted" if turn.accepted else "rejected"
+            print(f"Turn {number} agent {'AB'[turn.agent]}: {turn.move} {status} after {turn.time_to_move_us / 1000:.1f} ms "
+                  f"-> {state} | {turn.response!r}")
+        return 0
+    start = time.perf_counter()
+    summary = verify(reader)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {summary['games']} games ({summary['turns']} turns) in {elapsed:.3f}s; "
+          f"{len(summary['mismatches'])} outcome mismatches")
+    if reader.duplicates:
+        print(f"{reader.duplicates} games share an id with an earlier one and are listed as <id>#2, <id>#3, ...")
+    for game_id in summary["mismatches"]:
+        print(f"  {game_id}")
+    return 1 if summary["mismatches"] else 0
+
+def plot_command(args):
+    import visualization
+    visualization.main(args.force, args.store or visualization.STORE_PATH, args.output)
+    return 0
+
+"""
+Parse the arguments and run the chosen subcommand.
+
+Args:
+    argv (list): Arguments without the program name, defaults to sys.argv[1:].
+
+Returns:
+    int: The exit status.
+"""
+def run(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,375 @@
+import http.client
+import json
+import threading
+import time
+import urllib.parse
+
+DEFAULT_BASE_URL = "http://localhost:11434"
+
+class LLMBackendError(RuntimeError):
+    """
+    Raised when a backend cannot get an answer from its server.
+    """
+
+class LLMResponse:
+    """
+    A backend's answer to one prompt.
+
+    Attributes:
+        content (str): The generated text.
+        prompt_tokens (int): Prompt tokens evaluated, if the server reported them.
+        completion_tokens (int): Tokens generated, if the server reported them.
+        metadata (dict): The raw response metadata (durations, done_reason, ...).
+    """
+    def __init__(self, content, prompt_tokens=None, completion_tokens=None, metadata=None):
+        self.content = content
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.metadata = metadata or {}
+
+class LLMBackend:
+    """
+    Interface the agents talk to. A backend serves one model and turns a prompt into an LLMResponse.
+    Backends are meant to be long-lived and shared between games (see llm.pool).
+
+    Attributes:
+        model (str): The model name.
+        options (dict): Sampling parameters sent with every call (temperature, seed, ...).
+        keep_alive (str or int): How long the server keeps the model loaded after each call ("30m", -1, ...),
+            or None for the server default.
+        warm (bool): Whether the model is known to be loaded, so calls no longer include the load time.
+        cold_start (float): Seconds the warm-up (or the first call) took, or None.
+    """
+    def __init__(self, model, keep_alive=None, **options):
+        self.model = model
+        self.options = options
+        self.keep_alive = keep_alive
+        self.warm = False
+        self.cold_start = None
+
+    """
+    Send a single-message chat prompt and wait for the full answer.
+
+    Args:
+        prompt (str): The rendered prompt.
+        format (str or dict): Ollama output format: "json" or a JSON schema the answer must follow.
+        options (dict): Per-call sampling overrides (e.g. num_predict), merged over the backend's options.
+
+    Returns:
+        LLMResponse: The answer.
+    """
+    def invoke(self, prompt, format=None, options=None):
+        raise NotImplementedError
+
+    # Backends without a native async client run the blocking call in a worker thread
+    # (asyncio is imported where used: it is already loaded whenever a coroutine runs, and sync-only runs skip it)
+    async def ainvoke(self, prompt, format=None, options=None):
+        import asyncio
+        return await asyncio.to_thread(self.invoke, prompt, format, options)
+
+    def _merged_options(self, options):
+        return {**self.options, **options} if options else self.options
+
+    """
+    Load the model into the server's memory before any timed call and mark the backend warm.
+
+    Returns:
+        float: Seconds the load took.
+    """
+    def warm_up(self):
+        start = time.perf_counter()
+        self._preload()
+        self.cold_start = time.perf_counter() - start
+        self.warm = True
+        return self.cold_start
+
+    # Backends without a dedicated preload request pay for a one-token answer
+    def _preload(self):
+        self.invoke("Hi", options={"num_predict": 1})
+
+    # Ask the server to drop the model from memory now; the next call pays the load again
+    def unload(self):
+        self._unload()
+        self.warm = False
+
+    # Backends that cannot unload leave it to the server's own eviction
+    def _unload(self):
+        pass
+
+    """
+    Stream the answer as it is generated. Closing the generator early cancels the generation.
+
+    Args:
+        prompt (str): The rendered prompt.
+
+    Yields:
+        str: Chunks of generated text.
+    """
+    def stream(self, prompt):
+        yield self.invoke(prompt).content
+
+    # Async streaming defaults to pulling the sync stream chunk by chunk from a worker thread
+    async def astream(self, prompt):
+        import asyncio
+        chunks = self.stream(prompt)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            await asyncio.to_thread(chunks.close)
+
+class OllamaBackend(LLMBackend):
+    """
+    Backend using langchain's ChatOllama, the client the agents have always used.
+
+    Attributes:
+        base_url (str): Ollama server URL, or None for ChatOllama's default.
+    """
+    def __init__(self, model, base_url=None, keep_alive=None, **options):
+        super().__init__(model, keep_alive, **options)
+        self.base_url = base_url
+        self._chat = None
+        self._async_client = None
+        self._loop = None
+
+    # ChatOllama is imported and built on first use so constructing agents stays cheap; its HTTP
+    # clients keep their connections open, so one instance is reused for every game
+    @property
+    def chat(self):
+        if self._chat is None:
+            from langchain_ollama import ChatOllama
+            kwargs = {"base_url": self.base_url} if self.base_url else {}
+            if self.keep_alive is not None:
+                kwargs["keep_alive"] = self.keep_alive
+            self._chat = ChatOllama(model=self.model, **kwargs, **self.options)
+        return self._chat
+
+    # Async connections belong to the event loop that opened them; a backend reused under a new
+    # loop (e.g. one asyncio.run per benchmark prompt) rebuilds its clients
+    def _check_loop(self):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._chat = None
+            self._async_client = None
+
+    # An empty chat request makes Ollama load the model and hold it for keep_alive
+    def _preload(self):
+        from ollama import Client
+        kwargs = {"keep_alive": self.keep_alive} if self.keep_alive is not None else {}
+        Client(host=self.base_url).chat(model=self.model, messages=[], **kwargs)
+
+    # keep_alive=0 makes Ollama unload the model right away
+    def _unload(self):
+        from ollama import Client
+        Client(host=self.base_url).chat(model=self.model, messages=[], keep_alive=0)
+
+    @staticmethod
+    def _messages(prompt):
+        from langchain.schema import HumanMessage
+        return [HumanMessage(content=prompt)]
+
+    @staticmethod
+    def _to_response(message):
+        usage = getattr(message, "usage_metadata", None) or {}
+        return LLMResponse(message.content, usage.get("input_tokens"), usage.get("output_tokens"),
+                           dict(message.response_metadata))
+
+    def _call_kwargs(self, format, options):
+        kwargs = {}
+        if format is not None:
+            kwargs["format"] = format
+        if options:
+            kwargs["options"] = self._merged_options(options)
+        return kwargs
+
+    def invoke(self, prompt, format=None, options=None):
+        return self._to_response(self.chat.invoke(self._messages(prompt), **self._call_kwargs(format, options)))
+
+    async def ainvoke(self, prompt, format=None, options=None):
+        self._check_loop()
+        return self._to_response(await self.chat.ainvoke(self._messages(prompt), **self._call_kwargs(format, options)))
+
+    def stream(self, prompt):
+        chunks = self.chat.stream(self._messages(prompt))
+        try:
+            for chunk in chunks:
+                yield chunk.content
+        finally:
+            chunks.close()
+
+    # ChatOllama.astream does not close the underlying HTTP stream when abandoned early, so async
+    # streaming talks to Ollama through its own AsyncClient, which ChatOllama is built on
+    async def astream(self, prompt):
+        self._check_loop()
+        if self._async_client is None:
+            from ollama import AsyncClient
+            self._async_client = AsyncClient(host=self.base_url)
+        chunks = await self._async_client.chat(model=self.model, messages=[{"role": "user", "content": prompt}],
+                                               stream=True, options=self.options or None, keep_alive=self.keep_alive)
+        try:
+            async for chunk in chunks:
+                yield chunk.message.content
+        finally:
+            await chunks.aclose()
+
+class HttpBackend(LLMBackend):
+    """
+    Dependency-free client for the Ollama chat API (POST /api/chat). Works against a real Ollama
+    server or the stub in llm/stub_server.py, and keeps langchain out of harness measurements.
+
+    Attributes:
+        base_url (str): Server URL.
+        timeout (float): Socket timeout in seconds.
+    """
+    def __init__(self, model, base_url=None, timeout=120, keep_alive=None, **options):
+        super().__init__(model, keep_alive, **options)
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        url = urllib.parse.urlsplit(self.base_url)
+        self._connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        self._netloc = url.netloc
+        self._path_prefix = url.path
+        self._idle = []
+        self._idle_lock = threading.Lock()
+
+    def _payload(self, prompt, format=None, options=None, **extra):
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": False,
+            "options": self._merged_options(options),
+        }
+        if format is not None:
+            payload["format"] = format
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        payload.update(extra)
+        return payload
+
+    # Persistent HTTP/1.1 connections are kept in an idle list and reused across calls, threads and games
+    def _checkout(self):
+        with self._idle_lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._connection_class(self._netloc, timeout=self.timeout), False
+
+    def _checkin(self, connection):
+        with self._idle_lock:
+            self._idle.append(connection)
+
+    def _fail(self, connection, path, error):
+        connection.close()
+        return LLMBackendError(f"{self.base_url}{path} failed for {self.model}: {error}")
+
+    """
+    Send a POST request on a pooled connection.
+
+    Args:
+        path (str): API path, e.g. "/api/chat".
+        payload (dict): JSON body.
+
+    Returns:
+        tuple: (connection, response); hand the connection back with _checkin once the response is fully read.
+
+    Raises:
+        LLMBackendError: If the request fails or the server answers with an error status.
+    """
+    def _open(self, path, payload):
+        body = json.dumps(payload).encode()
+        while True:
+            connection, reused = self._checkout()
+            try:
+                connection.request("POST", self._path_prefix + path, body, {"Content-Type": "application/json"})
+                response = connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                # the server closed an idle kept-alive connection; retry on another one
+                if reused:
+                    connection.close()
+                    continue
+                raise self._fail(connection, path, e) from e
+            except (http.client.HTTPException, OSError) as e:
+                raise self._fail(connection, path, e) from e
+            if response.status >= 400:
+                raise self._fail(connection, path, f"HTTP {response.status}: {response.read()[:200]!r}")
+            return connection, response
+
+    def _post(self, path, payload):
+        connection, response = self._open(path, payload)
+        try:
+            body = json.loads(response.read())
+        except (http.client.HTTPException, OSError) as e:
+            raise self._fail(connection, path, e) from e
+        self._checkin(connection)
+        return body
+
+    @staticmethod
+    def _to_response(body):
+        return LLMResponse(body.get("message", {}).get("content", ""), body.get("prompt_eval_count"),
+                           body.get("eval_count"), body)
+
+    def invoke(self, prompt, format=None, options=None):
+        return self._to_response(self._post("/api/chat", self._payload(prompt, format, options)))
+
+    # Ollama streams newline-delimited JSON; abandoning the stream drops the connection, which stops the generation
+    def stream(self, prompt):
+        connection, response = self._open("/api/chat", self._payload(prompt, stream=True))
+        finished = False
+        try:
+            for line in response:
+                if not line.strip():
+                    continue
+                body = json.loads(line)
+                if body.get("error"):
+                    raise LLMBackendError(f"{self.base_url} failed for {self.model}: {body['error']}")
+                content = body.get("message", {}).get("content", "")
+                if content:
+                    yield content
+                if body.get("done"):
+                    response.read()  # consume the end of the chunked body so the connection can be reused
+                    finished = True
+                    break
+        finally:
+            if finished:
+                self._checkin(connection)
+            else:
+                connection.close()
+
+    # An empty chat request makes Ollama load the model and hold it for keep_alive
+    def _preload(self):
+        payload = {"model": self.model, "messages": []}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        self._post("/api/chat", payload)
+
+    # keep_alive=0 makes Ollama unload the model right away
+    def _unload(self):
+        self._post("/api/chat", {"model": self.model, "messages": [], "keep_alive": 0})
+
+# Backend kinds selectable by name, e.g. from run_game or the benchmark config
+BACKENDS = {
+    "ollama": OllamaBackend,
+    "http": HttpBackend,
+}
+
+"""
+Build a backend by kind name.
+
+Args:
+    model (str): The model name.
+    kind (str): A key of BACKENDS.
+    base_url (str): Server URL, or None for the default.
+    keep_alive (str or int): How long the server keeps the model loaded, or None for its default.
+    **options: Sampling parameters.
+
+Returns:
+    LLMBackend: The backend.
+"""
+def make_backend(model, kind="ollama", base_url=None, keep_alive=None, **options):
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {kind}")
+    return BACKENDS[kind](model, base_url=base_url, keep_alive=keep_alive, **options)
@@ -0,0 +1,508 @@
+from collections import deque
+from functools import lru_cache
+from llm.backends import LLMBackend, LLMBackendError
+from llm.resilience import EndpointHealth
+import os
+import threading
+import time
+
+# Several LLM servers behind one backend. Every call is routed to the endpoint with the fewest outstanding
+# requests (in flight + queued), preferring endpoints the model is resident on, and waits in that endpoint's
+# queue while its concurrency limit is reached. Endpoints that keep failing are skipped for a cooldown.
+
+DEFAULT_CONCURRENCY = 1  # requests one endpoint serves at once unless its spec says otherwise
+AFFINITY_QUEUE = 2  # requests queued per slot on an endpoint with the model loaded before another one has to load it
+
+"""
+Normalize one endpoint spec.
+
+Args:
+    spec (str or dict): "URL", "URL=N" (N requests at once) or {"url": ..., "concurrency": N, "models": [...]},
+        where models are the models the server has (and keeps loaded); without them it serves any model.
+
+Returns:
+    tuple: (url, concurrency, models tuple or None)
+"""
+def parse_endpoint(spec):
+    if isinstance(spec, (tuple, list)) and len(spec) == 3 and isinstance(spec[1], int):
+        url, concurrency, models = spec
+    elif isinstance(spec, dict):
+        url, concurrency, models = spec["url"], spec.get("concurrency", DEFAULT_CONCURRENCY), spec.get("models")
+    else:
+        url, _, concurrency = str(spec).partition("=")
+        concurrency, models = int(concurrency) if concurrency else DEFAULT_CONCURRENCY, None
+    if concurrency < 1:
+        raise ValueError(f"Endpoint {url} needs a concurrency of at least 1")
+    return url.rstrip("/"), concurrency, tuple(models) if models is not None else None
+
+"""
+The endpoint specs a base_url stands for.
+
+Args:
+    base_url (str or list): One server URL, or a list of endpoint specs (see parse_endpoint).
+
+Returns:
+    tuple: Normalized specs, or None for a single plain server URL (or None).
+"""
+def endpoint_specs(base_url):
+    if base_url is None or isinstance(base_url, str) and "=" not in base_url:
+        return None
+    return tuple(parse_endpoint(spec) for spec in ([base_url] if isinstance(base_url, str) else base_url))
+
+class Waiter:
+    """
+    A request queued for a slot on an endpoint: a threading.Event for sync callers, or a future of the
+    caller's event loop for async ones, so a slot freed by any thread wakes it.
+    """
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.queued_at = time.perf_counter()
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def notify(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(lambda: self.future.done() or self.future.set_result(None))
+
+class Endpoint:
+    """
+    One server of a pool, with its load and statistics.
+
+    Attributes:
+        url (str): Server URL.
+        concurrency (int): Requests sent to it at once; later ones queue.
+        models (frozenset): Models it serves, or None for any.
+        resident (set): Models known to be loaded on it: its configured models, then every model it answered.
+        active (int): Requests in flight.
+        queue (deque): Waiters for a slot.
+        health (EndpointHealth): Circuit breaker over its consecutive failures.
+        completed, errors, cancelled (int): Finished requests by outcome.
+        busy_s (float): Summed duration of its requests.
+        wait_s (float): Summed time requests spent queued for it.
+        max_queue (int): Deepest its queue has been.
+        queue_area (float): Queue length integrated over time, for the mean queue depth.
+    """
+    def __init__(self, url, concurrency=DEFAULT_CONCURRENCY, models=None):
+        self.url = url
+        self.concurrency = concurrency
+        self.models = frozenset(models) if models is not None else None
+        self.resident = set(models or ())
+        self.active = 0
+        self.queue = deque()
+        self.health = EndpointHealth(url)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.completed = self.errors = self.cancelled = 0
+        self.busy_s = self.wait_s = 0.0
+        self.max_queue = 0
+        self.queue_area = 0.0
+        self._changed = time.perf_counter()
+
+    @property
+    def outstanding(self):
+        return self.active + len(self.queue)
+
+    def serves(self, model):
+        return self.models is None or model in self.models
+
+    # An open circuit keeps the endpoint out of rotation until its cooldown has passed, then lets one trial through
+    def available(self):
+        return self.health.available()
+
+    # Account the queue length up to now; call before the queue changes
+    def tick(self):
+        now = time.perf_counter()
+        self.queue_area += len(self.queue) * (now - self._changed)
+        self._changed = now
+
+class EndpointPool:
+    """
+    Least-outstanding-requests scheduling with model affinity over a set of endpoints.
+
+    Attributes:
+        endpoints (list): The Endpoints.
+        since (float): perf_counter() of the last statistics reset.
+    """
+    def __init__(self, specs):
+        self.endpoints = [Endpoint(*spec) for spec in specs]
+        self.since = time.perf_counter()
+        self._lock = threading.Lock()
+
+    """
+    Pick the endpoint for a request, among those serving the model and not failing: a free one the model is
+    resident on; else the resident one with the shortest queue, while that queue is under AFFINITY_QUEUE
+    requests per slot, since waiting there is cheaper than a model load elsewhere; else any free one; else
+    the least loaded (relative to its limit) to queue on.
+
+    Args:
+        model (str): The model.
+
+    Returns:
+        Endpoint: The chosen endpoint.
+
+    Raises:
+        LLMBackendError: If no healthy endpoint serves the model.
+    """
+    def choose(self, model):
+        candidates = [e for e in self.endpoints if e.serves(model) and e.available()]
+        if not candidates:
+            raise LLMBackendError(f"No healthy endpoint serves {model}")
+        free = [e for e in candidates if e.active < e.concurrency]
+        free_resident = [e for e in free if model in e.resident]
+        if free_resident:
+            return min(free_resident, key=lambda e: e.outstanding)
+        resident = [e for e in candidates if model in e.resident]
+        if resident:
+            shortest = min(resident, key=lambda e: len(e.queue) / e.concurrency)
+            if len(shortest.queue) < AFFINITY_QUEUE * shortest.concurrency:
+                return shortest
+        if free:
+            return min(free, key=lambda e: e.outstanding)
+        return min(candidates, key=lambda e: ((e.outstanding + 1) / e.concurrency, model not in e.resident))
+
+    # Take a slot, or a place in the queue of the chosen endpoint
+    def _enter(self, model, loop=None):
+        with self._lock:
+            endpoint = self.choose(model)
+            if not endpoint.health.healthy:
+                endpoint.health.allow()  # this request is the trial
+            if endpoint.active < endpoint.concurrency:
+                endpoint.active += 1
+                return endpoint, None
+            endpoint.tick()
+            waiter = Waiter(loop)
+            endpoint.queue.append(waiter)
+            endpoint.max_queue = max(endpoint.max_queue, len(endpoint.queue))
+            return endpoint, waiter
+
+    def _granted(self, endpoint, waiter):
+        with self._lock:
+            endpoint.wait_s += time.perf_counter() - waiter.queued_at
+
+    """
+    Wait for a slot for one request.
+
+    Args:
+        model (str): The model the request is for.
+
+    Returns:
+        Endpoint: Where to send it; hand the slot back with release.
+    """
+    def acquire(self, model):
+        endpoint, waiter = self._enter(model)
+        if waiter is not None:
+            waiter.event.wait()
+            self._granted(endpoint, waiter)
+        return endpoint
+
+    async def aacquire(self, model):
+        import asyncio
+        endpoint, waiter = self._enter(model, asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                # a cancelled request gives up its place, or the slot it was just handed
+                with self._lock:
+                    queued = waiter in endpoint.queue
+                    if queued:
+                        endpoint.tick()
+                        endpoint.queue.remove(waiter)
+                if not queued:
+                    self.release(endpoint, None, 0.0, "cancelled")
+                raise
+            self._granted(endpoint, waiter)
+        return endpoint
+
+    """
+    Hand a request's slot back, passing it to the next queued request if there is one.
+
+    Args:
+        endpoint (Endpoint): The endpoint the request went to.
+        model (str): Its model, now resident there if it was answered; None if it never ran.
+        elapsed (float): Seconds the request took.
+        status (str): "ok", "error" or "cancelled".
+    """
+    def release(self, endpoint, model, elapsed, status):
+        with self._lock:
+            endpoint.busy_s += elapsed
+            if status == "ok":
+                endpoint.completed += 1
+                if model is not None:
+                    endpoint.resident.add(model)
+            elif status == "error":
+                endpoint.errors += 1
+            else:
+                endpoint.cancelled += 1
+            if endpoint.queue:
+                endpoint.tick()
+                waiter = endpoint.queue.popleft()
+            else:
+                endpoint.active -= 1
+                waiter = None
+        if status == "ok":
+            endpoint.health.record_success()
+        elif status == "error":
+            endpoint.health.record_failure()
+        if waiter is not None:
+            waiter.notify()
+
+    """
+    Raw per-endpoint counters since the last reset, which add up across processes (see merge_counters).
+
+    Args:
+        reset (bool): Start a new measurement window afterwards.
+
+    Returns:
+        list: One dict per endpoint: url, completed, errors, cancelled, busy_s, wait_s, queue (current depth),
+            queue_area, max_queue, resident, healthy.
+    """
+    def counters(self, reset=False):
+        with self._lock:
+            rows = []
+            for e in self.endpoints:
+                e.tick()
+                rows.append({
+                    "url": e.url,
+                    "completed": e.completed,
+                    "errors": e.errors,
+                    "cancelled": e.cancelled,
+                    "busy_s": e.busy_s,
+                    "wait_s": e.wait_s,
+                    "queue": len(e.queue),
+                    "queue_area": e.queue_area,
+                    "max_queue": e.max_queue,
+                    "resident": sorted(e.resident),
+                    "healthy": e.health.healthy,
+                })
+                if reset:
+                    e.reset_stats()
+            window = time.perf_counter() - self.since
+            if reset:
+                self.since = time.perf_counter()
+        return rows, window
+
+    """
+    Per-endpoint statistics since the last reset.
+
+    Args:
+        reset (bool): Start a new measurement window afterwards.
+
+    Returns:
+        list: The counters' rows (see summarize).
+    """
+    def stats(self, reset=False):
+        return summarize(*self.counters(reset))
+
+"""
+Turn raw endpoint counters into statistics over a measurement window.
+
+Args:
+    rows (list): Counter rows, from EndpointPool.counters or merged with merge_counters.
+    window (float): Seconds the counters cover.
+
+Returns:
+    list: One dict per endpoint: url, completed, errors, cancelled, throughput (requests/s), mean_busy_ms,
+        mean_wait_ms, queue (current depth), mean_queue, max_queue, resident, healthy.
+"""
+def summarize(rows, window):
+    window = max(window, 1e-9)
+    stats = []
+    for row in rows:
+        served = row["completed"] + row["errors"] + row["cancelled"]
+        stats.append({
+            "url": row["url"],
+            "completed": row["completed"],
+            "errors": row["errors"],
+            "cancelled": row["cancelled"],
+            "throughput": row["completed"] / window,
+            "mean_busy_ms": row["busy_s"] / served * 1000 if served else None,
+            "mean_wait_ms": row["wait_s"] / served * 1000 if served else None,
+            "queue": row["queue"],
+            "mean_queue": row["queue_area"] / window,
+            "max_queue": row["max_queue"],
+            "resident": row["resident"],
+            "healthy": row["healthy"],
+        })
+    return stats
+
+"""
+Add one process's endpoint counters into running totals, e.g. those the process runner's workers report.
+
+Args:
+    totals (dict): URL -> counter row, updated in place.
+    rows (list): Counter rows of one process.
+"""
+def merge_counters(totals, rows):
+    for row in rows:
+        total = totals.get(row["url"])
+        if total is None:
+            totals[row["url"]] = dict(row, resident=list(row["resident"]))
+            continue
+        for key in ("completed", "errors", "cancelled", "busy_s", "wait_s", "queue", "queue_area"):
+            total[key] += row[key]
+        total["max_queue"] = max(total["max_queue"], row["max_queue"])
+        total["resident"] = sorted(set(total["resident"]) | set(row["resident"]))
+        total["healthy"] = row["healthy"]  # the latest report
+
+# One pool per process for each set of specs, shared by the backends of every model
+@lru_cache(maxsize=None)
+def endpoint_pool(specs):
+    return EndpointPool(specs)
+
+# A forked worker schedules over its own pool (see split_endpoints for the limits this implies)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=endpoint_pool.cache_clear)
+
+"""
+Divide pooled endpoints' limits among worker processes. Each process schedules over its own EndpointPool,
+so every worker gets concurrency // workers slots of each endpoint; workers are capped at the smallest
+limit, so that the workers together never send an endpoint more than its limit.
+
+Args:
+    base_url (str or list): The benchmark's server URL or endpoint specs.
+    workers (int): Worker processes wanted.
+
+Returns:
+    tuple: (base_url for each worker, worker count); unchanged for a single plain server.
+"""
+def split_endpoints(base_url, workers):
+    specs = endpoint_specs(base_url)
+    if specs is None:
+        return base_url, workers
+    workers = max(1, min(workers, min(concurrency for _, concurrency, _ in specs)))
+    return [(url, concurrency // workers, models) for url, concurrency, models in specs], workers
+
+# This process's endpoint counters since the last call, for a worker to report with its game; None for one server
+def endpoint_counters(base_url):
+    specs = endpoint_specs(base_url)
+    return endpoint_pool(specs).counters(reset=True)[0] if specs is not None else None
+
+"""
+Print the throughput and queue depth of each endpoint of a pool and start a new window.
+
+Args:
+    base_url (str or list): The endpoint specs the benchmark ran with; nothing is printed for a single server.
+    counters (tuple): (counter rows, window seconds) gathered from worker processes, instead of this
+        process's pool.
+"""
+def print_endpoint_stats(base_url, counters=None):
+    specs = endpoint_specs(base_url)
+    if specs is None:
+        return
+    stats = summarize(*counters) if counters is not None else endpoint_pool(specs).stats(reset=True)
+    for row in stats:
+        busy = f"{row['mean_busy_ms']:.0f} ms per request" if row["mean_busy_ms"] is not None else "idle"
+        wait = f", waited {row['mean_wait_ms']:.0f} ms" if row["mean_wait_ms"] else ""
+        health = "" if row["healthy"] else " ⚠️ unhealthy"
+        print(f"Endpoint {row['url']}: {row['completed']} requests ({row['throughput']:.1f}/s), {busy}{wait}, "
+              f"queue depth {row['mean_queue']:.2f} mean / {row['max_queue']} max, "
+              f"{row['errors']} errors, {row['cancelled']} cancelled{health}")
+
+class PooledBackend(LLMBackend):
+    """
+    Backend spreading one model's calls over an EndpointPool. Each endpoint is served by the ordinary pooled
+    backend of its kind for that URL, so connections are still reused.
+
+    Attributes:
+        pool (EndpointPool): The endpoints.
+        kind (str): Backend kind of the endpoints (a key of llm.backends.BACKENDS).
+        base_url (str): The endpoint URLs, comma-separated, for display.
+    """
+    def __init__(self, model, pool, kind="ollama", keep_alive=None, **options):
+        super().__init__(model, keep_alive, **options)
+        self.pool = pool
+        self.kind = kind
+        self.base_url = ",".join(e.url for e in pool.endpoints)
+
+    def _delegate(self, endpoint):
+        from llm.pool import get_backend
+        return get_backend(self.model, self.kind, endpoint.url, self.keep_alive, **self.options)
+
+    def invoke(self, prompt, format=None, options=None):
+        return self._invoke_on(self.pool.acquire(self.model), prompt, format, options)
+
+    # One request on an endpoint whose slot is already held; the slot is released when the request ends
+    def _invoke_on(self, endpoint, prompt, format=None, options=None):
+        start, status = time.perf_counter(), "cancelled"
+        try:
+            response = self._delegate(endpoint).invoke(prompt, format, options)
+            status = "ok"
+            return response
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            self.pool.release(endpoint, self.model, time.perf_counter() - start, status)
+
+    async def ainvoke(self, prompt, format=None, options=None):
+        import asyncio
+        endpoint = await self.pool.aacquire(self.model)
+        if type(self._delegate(endpoint)).ainvoke is LLMBackend.ainvoke:
+            # the delegate would answer from a worker thread that a cancelled caller (a lost hedge, a settled
+            # sample) cannot stop: the request runs on, so the thread itself holds the slot until it ends
+            return await asyncio.to_thread(self._invoke_on, endpoint, prompt, format, options)
+        start, status = time.perf_counter(), "cancelled"
+        try:
+            response = await self._delegate(endpoint).ainvoke(prompt, format, options)
+            status = "ok"
+            return response
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            self.pool.release(endpoint, self.model, time.perf_counter() - start, status)
+
+    # A stream closed early (the agent already has its move) counts as answered
+    def stream(self, prompt):
+        endpoint = self.pool.acquire(self.model)
+        start, status = time.perf_counter(), "cancelled"
+        try:
+            yield from self._delegate(endpoint).stream(prompt)
+            status = "ok"
+        except GeneratorExit:
+            status = "ok"
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            self.pool.release(endpoint, self.model, time.perf_counter() - start, status)
+
+    async def astream(self, prompt):
+        endpoint = await self.pool.aacquire(self.model)
+        start, status = time.perf_counter(), "cancelled"
+        chunks = self._delegate(endpoint).astream(prompt)
+        try:
+            async for chunk in chunks:
+                yield chunk
+            status = "ok"
+        except GeneratorExit:
+            status = "ok"
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            try:
+                await chunks.aclose()
+            finally:
+                self.pool.release(endpoint, self.model, time.perf_counter() - start, status)
+
+    # Load the model on every endpoint serving it, so any of them can take its calls warm
+    def _preload(self):
+        for endpoint in self.pool.endpoints:
+            if endpoint.serves(self.model):
+                self._delegate(endpoint).warm_up()
+                endpoint.resident.add(self.model)
+
+    def _unload(self):
+        for endpoint in self.pool.endpoints:
+            if self.model in endpoint.resident:
+                self._delegate(endpoint).unload()
+                endpoint.resident.discard(self.model)
@@ -0,0 +1,94 @@
+from llm.backends import make_backend
+from llm.endpoints import endpoint_pool, endpoint_specs, PooledBackend
+import os
+import threading
+
+# Process-wide backends by (kind, model, base_url, keep_alive, options); every game in the process shares
+# them, and with them their open HTTP connections
+_backends = {}
+_lock = threading.Lock()
+_loops = threading.local()
+
+"""
+Get the shared backend for a model, building it on first use.
+
+Args:
+    model (str): The model name.
+    kind (str): A key of llm.backends.BACKENDS.
+    base_url (str or list): Server URL, or None for the default; several endpoint specs ("URL=N", see
+        llm.endpoints.parse_endpoint) give a PooledBackend balancing the calls over them.
+    keep_alive (str or int): How long the server keeps the model loaded, or None for its default.
+    **options: Sampling parameters.
+
+Returns:
+    LLMBackend: The pooled backend.
+"""
+def get_backend(model, kind="ollama", base_url=None, keep_alive=None, **options):
+    specs = endpoint_specs(base_url)
+    key = (kind, model, specs or base_url, keep_alive, tuple(sorted(options.items())))
+    with _lock:
+        backend = _backends.get(key)
+    if backend is None:
+        if specs is not None:
+            backend = PooledBackend(model, endpoint_pool(specs), kind, keep_alive, **options)
+        else:
+            backend = make_backend(model, kind, base_url, keep_alive, **options)
+        with _lock:
+            backend = _backends.setdefault(key, backend)
+    return backend
+
+"""
+Load each model into the server before timing starts.
+
+Args:
+    models (list): Model names.
+    kind (str): A key of llm.backends.BACKENDS.
+    base_url (str): Server URL, or None for the default.
+    keep_alive (str or int): How long the server keeps each model loaded afterwards.
+
+Returns:
+    dict: Model name -> seconds the load took (cold start).
+"""
+def warm_up(models, kind="ollama", base_url=None, keep_alive=None):
+    return {model: get_backend(model, kind, base_url, keep_alive).warm_up() for model in dict.fromkeys(models)}
+
+"""
+Mark the pooled backends of models that another process already loaded as warm, without calling the server.
+
+Args:
+    models (list): Model names.
+    kind (str): A key of llm.backends.BACKENDS.
+    base_url (str): Server URL, or None for the default.
+    keep_alive (str or int): The keep_alive the backends are used with.
+"""
+def mark_warm(models, kind="ollama", base_url=None, keep_alive=None):
+    for model in models:
+        get_backend(model, kind, base_url, keep_alive).warm = True
+
+"""
+The calling thread's event loop for sync code that drives async calls (self-consistency votes, games with
+speculation). It stays open across moves and games, so the backends bound to it keep their clients and
+connections, where a fresh asyncio.run loop each time would make them rebuild.
+
+Returns:
+    asyncio.AbstractEventLoop: The loop, to run coroutines on with run_until_complete.
+"""
+def sync_loop():
+    import asyncio
+    loop = getattr(_loops, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _loops.loop = asyncio.new_event_loop()
+    return loop
+
+# Drop every pooled backend, e.g. after the server was restarted
+def clear():
+    with _lock:
+        _backends.clear()
+
+# A forked worker must not share its parent's open connections, nor the event loop watching them
+def _after_fork():
+    clear()
+    _loops.loop = None
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
@@ -0,0 +1,348 @@
+from collections import deque
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+from functools import lru_cache
+from llm.backends import LLMBackendError
+import random
+import threading
+import time
+
+# Resilience around agent LLM calls: a deadline per call (capped by the game's deadline), bounded retries with
+# jittered exponential backoff, hedged duplicates after the endpoint's p95 latency, and a circuit breaker per
+# model and endpoint. Sync calls run in daemon threads so a stuck generation can be abandoned; async calls are
+# tasks, and the losing or late ones are cancelled.
+
+FAILURE_THRESHOLD = 5  # consecutive failures that open an endpoint's circuit
+COOLDOWN_S = 30.0  # how long an open circuit refuses calls before letting a trial call through
+LATENCY_WINDOW = 200  # recent call latencies kept per endpoint for the hedge delay
+MIN_HEDGE_SAMPLES = 20  # latencies needed before hedging starts
+
+class LLMTimeoutError(LLMBackendError):
+    """
+    Raised when an LLM call (or the game it belongs to) runs past its deadline.
+    """
+
+class CircuitOpenError(LLMBackendError):
+    """
+    Raised instead of calling a model whose endpoint's circuit is open.
+    """
+
+class EndpointHealth:
+    """
+    Health of one model on one server, shared by every agent of the process: a circuit breaker over
+    consecutive failures and a window of recent latencies.
+
+    The circuit opens after `threshold` consecutive failures and refuses calls for `cooldown` seconds;
+    then one trial call is let through, which closes it on success or opens it again on failure.
+
+    Attributes:
+        name (str): "<model> @ <server>".
+        failures (int): Consecutive failures.
+        opened_at (float): perf_counter() when the circuit opened, None while closed.
+        trips (int): Times the circuit opened.
+        latencies (deque): Recent successful call latencies in seconds.
+    """
+    def __init__(self, name, threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN_S):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def healthy(self):
+        return self.opened_at is None
+
+    # Whether allow() would let a call through, without claiming the trial call
+    def available(self):
+        with self._lock:
+            return self.opened_at is None or (not self._trial and time.perf_counter() - self.opened_at >= self.cooldown)
+
+    # Whether a call may go out now; while open, only one trial call per cooldown
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial or time.perf_counter() - self.opened_at < self.cooldown:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self, latency=None):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+            if latency is not None:
+                self.latencies.append(latency)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or (self.opened_at is None and self.failures >= self.threshold):
+                if self.opened_at is None:
+                    self.trips += 1
+                self.opened_at = time.perf_counter()
+            self._trial = False
+
+    """
+    Delay after which a call is duplicated: the latency quantile over the recent window.
+
+    Args:
+        quantile (float): e.g. 0.95.
+
+    Returns:
+        float: Seconds, or None while fewer than MIN_HEDGE_SAMPLES latencies are known.
+    """
+    def hedge_delay(self, quantile):
+        with self._lock:
+            if len(self.latencies) < MIN_HEDGE_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+_health = {}
+_health_lock = threading.Lock()
+
+# The process-wide health record of a backend's model and server
+def health_for(backend):
+    key = (type(backend).__name__, backend.model, getattr(backend, "base_url", None))
+    with _health_lock:
+        health = _health.get(key)
+        if health is None:
+            health = _health[key] = EndpointHealth(f"{backend.model} @ {key[2] or 'default'}")
+    return health
+
+# Endpoints whose circuit is open right now
+def unhealthy():
+    with _health_lock:
+        return [health.name for health in _health.values() if not health.healthy]
+
+"""
+Exceptions that mean the server or the connection failed, as opposed to a bug in the calling code: only these
+are retried and counted by the circuit breaker. Includes the Ollama client stack's errors when it is installed.
+
+Returns:
+    tuple: Exception classes.
+"""
+@lru_cache(maxsize=None)
+def backend_failures():
+    failures = [LLMBackendError, TimeoutError, OSError]
+    try:
+        import httpx
+        failures.append(httpx.HTTPError)
+    except ImportError:
+        pass
+    try:
+        import ollama
+        failures.append(ollama.ResponseError)
+    except ImportError:
+        pass
+    return tuple(failures)
+
+# Failures of any client library surface as LLMBackendError, which the agents handle
+def as_backend_error(error, health):
+    if isinstance(error, LLMBackendError):
+        return error
+    wrapped = LLMBackendError(f"{health.name} failed: {error}")
+    wrapped.__cause__ = error
+    return wrapped
+
+# Run fn() in a daemon thread, so the caller can stop waiting for it without blocking interpreter exit
+def in_thread(fn):
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+class ResiliencePolicy:
+    """
+    How an agent's LLM calls are protected. Stateless apart from the process-wide endpoint health, so one
+    policy is shared by every agent with the same settings (see resilience_policy).
+
+    The counters live on the agent and are reset with it: timeouts, retries, hedged_calls, hedge_wins,
+    circuit_rejections (calls refused by an open circuit).
+
+    Attributes:
+        call_timeout (float): Seconds one attempt may take, None for no limit.
+        retries (int): Extra attempts after a failed or timed-out one.
+        backoff (float): Base delay before a retry; attempt n waits a random time up to backoff * 2^(n-1).
+        hedge (bool): Send a duplicate request once an attempt outlasts the endpoint's hedge_quantile latency.
+        hedge_quantile (float): Latency quantile of the hedge delay.
+        game_timeout (float): Seconds a whole game may take, None for no limit; run_game sets each agent's
+            game_deadline from it and ends the game once it has passed.
+    """
+    def __init__(self, call_timeout=None, retries=0, backoff=0.5, hedge=False, hedge_quantile=0.95, game_timeout=None):
+        self.call_timeout = call_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.game_timeout = game_timeout
+
+    # Deadline of the next attempt: the call timeout, cut short by the game's deadline
+    def _timeout(self, agent):
+        timeout = self.call_timeout
+        if agent.game_deadline is not None:
+            remaining = agent.game_deadline - time.perf_counter()
+            if remaining <= 0:
+                raise LLMTimeoutError(f"Game deadline passed before calling {agent.model}")
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    def _backoff_delay(self, attempt):
+        return random.uniform(0, self.backoff * 2 ** (attempt - 1))
+
+    def _hedge_delay(self, health, timeout):
+        delay = health.hedge_delay(self.hedge_quantile) if self.hedge else None
+        return delay if delay is not None and (timeout is None or delay < timeout) else None
+
+    """
+    Make one LLM call under the policy.
+
+    Args:
+        agent (BaseAgent): The calling agent, whose counters are updated.
+        send (callable): Makes one request and returns its result; may be called several times.
+
+    Returns:
+        The result of the first successful request.
+
+    Raises:
+        LLMBackendError: Once every attempt failed or timed out (LLMTimeoutError), when the circuit is open
+            (CircuitOpenError) or when the game's deadline has passed. Any other exception from send() is
+            raised unchanged, without a retry.
+    """
+    def call(self, agent, send):
+        health = health_for(agent.llm)
+        failures = backend_failures()
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                agent.retries += 1
+                time.sleep(self._backoff_delay(attempt))
+            if not health.allow():
+                agent.circuit_rejections += 1
+                raise CircuitOpenError(f"{health.name} is unhealthy") from error
+            timeout = self._timeout(agent)
+            warm, start = agent.llm.warm, time.perf_counter()
+            try:
+                result = self._hedged(agent, send, health, timeout)
+            except failures as e:
+                health.record_failure()
+                error = e
+                continue
+            health.record_success(time.perf_counter() - start if warm else None)
+            return result
+        raise as_backend_error(error, health)
+
+    # One attempt: the request, and a duplicate after the hedge delay; the first success wins
+    def _hedged(self, agent, send, health, timeout):
+        deadline = time.perf_counter() + timeout if timeout is not None else None
+        futures = [in_thread(send)]
+        delay = self._hedge_delay(health, timeout)
+        if delay is not None and not wait(futures, delay).done:
+            agent.hedged_calls += 1
+            futures.append(in_thread(send))
+        pending, error = set(futures), None
+        while pending:
+            remaining = deadline - time.perf_counter() if deadline is not None else None
+            done, pending = wait(pending, max(0, remaining) if remaining is not None else None, FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        agent.hedge_wins += 1
+                    return future.result()
+                if not isinstance(future.exception(), backend_failures()):
+                    raise future.exception()
+                error = error or future.exception()
+        if pending:
+            agent.timeouts += 1
+            raise LLMTimeoutError(f"{health.name} did not answer within {timeout:.1f} s")
+        raise error
+
+    # Async version of call: send() returns a coroutine, and abandoned requests are cancelled
+    async def acall(self, agent, send):
+        import asyncio
+        health = health_for(agent.llm)
+        failures = backend_failures()
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                agent.retries += 1
+                await asyncio.sleep(self._backoff_delay(attempt))
+            if not health.allow():
+                agent.circuit_rejections += 1
+                raise CircuitOpenError(f"{health.name} is unhealthy") from error
+            timeout = self._timeout(agent)
+            warm, start = agent.llm.warm, time.perf_counter()
+            try:
+                result = await self._ahedged(agent, send, health, timeout)
+            except failures as e:
+                health.record_failure()
+                error = e
+                continue
+            health.record_success(time.perf_counter() - start if warm else None)
+            return result
+        raise as_backend_error(error, health)
+
+    async def _ahedged(self, agent, send, health, timeout):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        tasks = [asyncio.ensure_future(send())]
+        pending, error = set(tasks), None
+        try:
+            delay = self._hedge_delay(health, timeout)
+            if delay is not None and not (await asyncio.wait(tasks, timeout=delay))[0]:
+                agent.hedged_calls += 1
+                tasks.append(asyncio.ensure_future(send()))
+                pending.add(tasks[1])
+            while pending:
+                remaining = max(0, deadline - loop.time()) if deadline is not None else None
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            agent.hedge_wins += 1
+                        return task.result()
+                    if not isinstance(task.exception(), backend_failures()):
+                        raise task.exception()
+                    error = error or task.exception()
+            if pending:
+                agent.timeouts += 1
+                raise LLMTimeoutError(f"{health.name} did not answer within {timeout:.1f} s")
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+"""
+The shared policy for a set of settings, so pooled agents with the same settings keep sharing one object.
+
+Args:
+    call_timeout (float): Seconds per attempt, or None.
+    retries (int): Extra attempts.
+    hedge (bool): Hedge slow calls.
+    game_timeout (float): Seconds per game, or None.
+
+Returns:
+    ResiliencePolicy: The policy, or None when every protection is off.
+"""
+@lru_cache(maxsize=None)
+def resilience_policy(call_timeout=None, retries=0, hedge=False, game_timeout=None):
+    if call_timeout is None and not retries and not hedge and game_timeout is None:
+        return None
+    return ResiliencePolicy(call_timeout, retries, hedge=hedge, game_timeout=game_timeout)
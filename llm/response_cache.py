@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join("cache", "responses.sqlite")
+
+class CacheMissError(LookupError):
+    """
+    Raised in "replay-only" mode when a prompt has no cached response.
+    """
+
+class CachedResponse:
+    """
+    Stand-in for an LLM message when the answer comes from the cache.
+
+    Attributes:
+        content (str): The cached response text.
+    """
+    def __init__(self, content):
+        self.content = content
+        self.cached = True
+
+class ResponseCache:
+    """
+    Persistent LLM response cache backed by SQLite, with size-bounded LRU eviction.
+
+    Modes:
+        "readwrite":   serve hits from the cache, call the LLM and store the answer on a miss.
+        "replay-only": never call the LLM; a miss raises CacheMissError. Lets a benchmark rerun offline.
+        "bypass":      always call the LLM (keeps sampling diversity) but still record the answers.
+
+    Attributes:
+        path (str): Location of the SQLite database.
+        max_entries (int): Number of responses kept; storing one more evicts the least recently used.
+        mode (str): One of MODES.
+        hits (int): Lookups answered from the cache by this process.
+        misses (int): Lookups that found nothing.
+    """
+    MODES = ("readwrite", "replay-only", "bypass")
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=100_000, mode="readwrite"):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.path = path
+        self.max_entries = max_entries
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    # The connection and lock are per process; workers reconnect lazily after unpickling
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, prompt_type TEXT,"
+                " response TEXT NOT NULL, last_used INTEGER NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self._conn.commit()
+        return self._conn
+
+    """
+    Build the cache key for one LLM call.
+
+    Args:
+        model (str): The model name.
+        prompt_type (str): The prompt type the prompt was rendered from.
+        prompt (str): The fully rendered prompt.
+        params (dict): Sampling parameters sent with the call.
+
+    Returns:
+        str: A hex digest identifying the call.
+    """
+    @staticmethod
+    def key(model, prompt_type, prompt, params=None):
+        payload = json.dumps([model, prompt_type, prompt, params or {}], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    """
+    Look up a cached response, marking it as recently used.
+
+    Args:
+        key (str): Key from ResponseCache.key.
+
+    Returns:
+        str or None: The cached response text, or None on a miss.
+    """
+    def get(self, key):
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time_ns(), key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    """
+    Store a response, evicting the least recently used entries beyond max_entries in the same transaction,
+    so the bound holds even with several processes writing.
+
+    Args:
+        key (str): Key from ResponseCache.key.
+        response (str): The response text.
+        model (str): The model name, kept for inspection.
+        prompt_type (str): The prompt type, kept for inspection.
+    """
+    def put(self, key, response, model=None, prompt_type=None):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, prompt_type, response, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model, prompt_type, response, time.time_ns()),
+            )
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_used LIMIT max(0, (SELECT COUNT(*) FROM responses) - ?))",
+                (self.max_entries,),
+            )
+            conn.commit()
+
+    """
+    Number of responses currently stored.
+
+    Returns:
+        int: Row count of the cache table.
+    """
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,247 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class StubOllamaServer:
+    """
+    Local stand-in for an Ollama server, speaking enough of its HTTP API (/api/chat, /api/tags)
+    for ChatOllama and HttpBackend. Lets the harness be load-tested with no models installed.
+
+    Answers are scripted (cycled in order) or, by default, a random move picked from the
+    "Legal moves" line of the prompt, so games progress like they would with a cooperative model.
+
+    Attributes:
+        host (str): Interface to bind.
+        port (int): Port to bind (0 picks a free port).
+        latency (float): Seconds to wait before answering.
+        jitter (float): Extra uniform random delay in seconds, added to latency.
+        token_latency (float): Seconds between streamed chunks.
+        error_rate (float): Probability of answering with HTTP 500.
+        answers (list): Scripted answers, or None for random legal tuples.
+        load_time (float): Seconds the first request for each model waits, simulating the model load.
+        requests (int): Number of chat requests served.
+        loaded_models (set): Models "loaded" so far, by a preload (empty messages) or a first chat, and not
+            unloaded since (empty messages with keep_alive 0).
+    """
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, token_latency=0.0,
+                 error_rate=0.0, answers=None, seed=None, load_time=0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.token_latency = token_latency
+        self.error_rate = error_rate
+        self.answers = list(answers) if answers else None
+        self.load_time = load_time
+        self.requests = 0
+        self.loaded_models = set()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    """
+    Decide the outcome of one chat request.
+
+    Args:
+        prompt (str): The last user message.
+        format (str or dict): The request's output format, if any.
+
+    Returns:
+        tuple: (answer text or None for an injected error, delay in seconds)
+    """
+    def next_answer(self, prompt, format=None):
+        with self._lock:
+            index = self.requests
+            self.requests += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            if self._rng.random() < self.error_rate:
+                return None, delay
+            if self.answers:
+                return self.answers[index % len(self.answers)], delay
+            # Constrained output: answer with a move from the schema's enum, as Ollama's grammar would force
+            if isinstance(format, dict):
+                allowed = format.get("properties", {}).get("move", {}).get("enum")
+                if allowed:
+                    return json.dumps({"move": self._rng.choice(allowed)}), delay
+            legal_line = re.search(r"Legal moves:(.*)", prompt)
+            moves = self._legal_moves(legal_line.group(1)) if legal_line else []
+            if moves:
+                return self._rng.choice(moves), delay
+            return f"({self._rng.randint(0, 2)}, {self._rng.randint(0, 2)})", delay
+
+    # Moves listed on a "Legal moves:" line, with compact Nim ranges "(i, 1) .. (i, k)" expanded
+    @staticmethod
+    def _legal_moves(line):
+        moves = []
+        for heap, most in re.findall(r"\((\d+),\s*1\)\s*\.\.\s*\(\1,\s*(\d+)\)", line):
+            moves.extend(f"({heap}, {count})" for count in range(1, int(most) + 1))
+        line = re.sub(r"\(\d+,\s*1\)\s*\.\.\s*\(\d+,\s*\d+\)", "", line)
+        return moves + re.findall(r"\(\d+,\s*\d+\)", line)
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle(self):
+                try:
+                    super().handle()
+                except ConnectionResetError:
+                    pass  # the client dropped a kept-alive connection, e.g. after cancelling a stream
+
+            def _send_json(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json(200, {"models": []})
+                else:
+                    self._send_json(200, {"status": "Ollama stub is running"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if self.path != "/api/chat":
+                    self._send_json(404, {"error": f"unsupported path {self.path}"})
+                    return
+                server._handle_chat(self, request)
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # Seconds of simulated model load owed by a request for `model`
+    def _load_delay(self, model):
+        with self._lock:
+            if model in self.loaded_models:
+                return 0.0
+            self.loaded_models.add(model)
+            return self.load_time
+
+    def _handle_chat(self, handler, request):
+        started = time.perf_counter_ns()
+        model = request.get("model", "stub")
+        if not request.get("messages") and request.get("keep_alive") == 0:
+            # Ollama unloads a model on an empty chat with keep_alive 0
+            with self._lock:
+                self.loaded_models.discard(model)
+            handler._send_json(200, {"model": model, "created_at": datetime.now(timezone.utc).isoformat(),
+                                     "message": {"role": "assistant", "content": ""},
+                                     "done": True, "done_reason": "unload"})
+            return
+        load_delay = self._load_delay(model)
+        time.sleep(load_delay)
+        messages = request.get("messages") or []
+        if not messages:
+            # Ollama treats an empty chat as a preload request
+            handler._send_json(200, {"model": model, "created_at": datetime.now(timezone.utc).isoformat(),
+                                     "message": {"role": "assistant", "content": ""},
+                                     "done": True, "done_reason": "load"})
+            return
+        prompt = messages[-1].get("content", "") if messages else ""
+        answer, delay = self.next_answer(prompt, request.get("format"))
+        time.sleep(delay)
+        if answer is None:
+            handler._send_json(500, {"error": "stub: injected error"})
+            return
+
+        chunks = re.findall(r"\S+\s*|\s+", answer) or [""]
+        final = {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "done": True,
+            "done_reason": "stop",
+            "load_duration": int(load_delay * 1e9),
+            "prompt_eval_count": len(prompt.split()),
+            "prompt_eval_duration": 0,
+            "eval_count": len(chunks),
+        }
+
+        if not request.get("stream", True):
+            time.sleep(self.token_latency * len(chunks))
+            final["message"] = {"role": "assistant", "content": answer}
+            final["total_duration"] = final["eval_duration"] = time.perf_counter_ns() - started
+            handler._send_json(200, final)
+            return
+
+        # Streamed answers are newline-delimited JSON, one chunk per word, like Ollama's
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/x-ndjson")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        try:
+            for chunk in chunks:
+                time.sleep(self.token_latency)
+                self._write_chunk(handler, {
+                    "model": model,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "message": {"role": "assistant", "content": chunk},
+                    "done": False,
+                })
+            final["message"] = {"role": "assistant", "content": ""}
+            final["total_duration"] = final["eval_duration"] = time.perf_counter_ns() - started
+            self._write_chunk(handler, final)
+            handler.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client stopped reading, which cancels the generation
+
+    @staticmethod
+    def _write_chunk(handler, body):
+        data = json.dumps(body).encode() + b"\n"
+        handler.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        handler.wfile.flush()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a stub Ollama server for load-testing the duel harness.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each answer")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform random delay in seconds")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of an HTTP 500")
+    parser.add_argument("--answer", action="append", dest="answers", help="scripted answer (repeatable, cycled)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--load-time", type=float, default=0.0, help="seconds of simulated load per model")
+    args = parser.parse_args()
+
+    stub = StubOllamaServer(args.host, args.port, args.latency, args.jitter, args.token_latency,
+                            args.error_rate, args.answers, args.seed, args.load_time).start()
+    print(f"Stub Ollama server listening on {stub.base_url} (Ctrl+C to stop)")
+    try:
+        stub._thread.join()
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,30 @@
+import re
+
+# Rough token count: words/numbers and individual punctuation marks. Model tokenizers differ, but this
+# tracks them closely enough to compare prompt encodings without loading a tokenizer.
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+"""
+Estimate the number of tokens in a text.
+
+Args:
+    text (str): The text.
+
+Returns:
+    int: Estimated token count.
+"""
+def estimate_tokens(text):
+    return len(_TOKEN_PATTERN.findall(text))
+
+"""
+Estimate the tokens of a printed list of n two-element tuples, e.g. "[(0, 1), (0, 2)]",
+without building the string: 5 tokens per tuple, n - 1 separating commas and 2 brackets.
+
+Args:
+    n (int): Number of tuples.
+
+Returns:
+    int: Estimated token count.
+"""
+def estimate_tuple_list_tokens(n):
+    return 6 * n + 1 if n else 2
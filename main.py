@@ -1,20 +1,67 @@
 from memory.shared_memory import SharedMemory
+from llm.pool import get_backend
+from agents.pool import AGENT_POOL
+from llm.resilience import resilience_policy
+from puzzles.oracle import make_scorer
+from telemetry.recorder import MoveTelemetry
+import hashlib # to derive per-game seeds
 import os # to clear console
+import time # to time games and moves
 
-# prompt types
+# prompt types, one template each in prompts/<game>/<prompt_type>.txt
 prompt_types_hanoi = ["baseline", "recursive_genius", "math_genius", "recursive_strat"]
 prompt_types_nim = [ "baseline", "game_theorist", "math_genius", "XOR_strat" ]
 
-# Game selection: "hanoi" or "nim"
-def run_game(selected_game="nim", output=True, prompt="baseline"):
+# models of agent A and agent B
+DEFAULT_MODELS = ("llama3.2:latest", "gemma3:latest")
+
+# Display name for a model's agent, e.g. "llama3.2:latest" -> "Llama3.2 Agent", "qwen3:4b" -> "Qwen3:4b Agent"
+# Only the default tag is dropped, so two tags of one model family keep distinct names
+def agent_name(model):
+    family, _, tag = model.partition(":")
+    return f"{family.capitalize()}{':' + tag if tag and tag != 'latest' else ''} Agent"
+
+# Derive a stable 32-bit seed from a base seed and any identifying parts (game, prompt, game number, ...)
+def derive_seed(*parts):
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).digest()
+    return int.from_bytes(digest[:4], "big")
+
+# Build the agents, initial state and completion check for the selected game
+# backend/base_url pick the LLM backend kind (see llm.backends.BACKENDS) and server, e.g. a stub server
+# num_disks sets the Hanoi size; compact_hanoi uses the integer-encoded CompactHanoiState for large instances
+# heaps sets the Nim starting heaps; compact_moves describes Nim legal moves as ranges in the prompt (opt-in, since
+# it changes the prompts and so the results' comparability with earlier benchmarks)
+# stream makes the agents stop each generation as soon as a move tuple has been streamed
+# output_format "json" constrains answers to a JSON schema of the legal moves
+# models are agent A's and agent B's models; keep_alive is how long the server keeps them loaded between calls
+# samples > 1 votes each move over that many concurrent answers, settled at quorum votes or after deadline seconds
+# call_timeout, retries, hedge and game_timeout put every LLM call under a llm.resilience policy: per-call and
+# per-game deadlines, retries with jittered backoff, hedged duplicates of slow calls and a circuit breaker
+# Backends and agents come from process-wide pools, so clients and their connections are reused across
+# games; release the agents with release_agents once the game is over
+def setup_game(selected_game="nim", seed=None, cache=None, backend="ollama", base_url=None,
+               num_disks=3, compact_hanoi=False, heaps=(3, 4, 5), compact_moves=False, stream=False,
+               output_format="text", models=DEFAULT_MODELS, keep_alive=None, samples=1, quorum=None, deadline=None,
+               call_timeout=None, retries=0, hedge=False, game_timeout=None):
+    # each agent gets its own RNG stream so fallbacks are reproducible from the game seed
+    seed_a = derive_seed(seed, "agent_a") if seed is not None else None
+    seed_b = derive_seed(seed, "agent_b") if seed is not None else None
+    model_a, model_b = models
+    llm_a = get_backend(model_a, backend, base_url, keep_alive)
+    llm_b = get_backend(model_b, backend, base_url, keep_alive)
+    agent_options = {"cache": cache, "stream": stream, "output_format": output_format, "samples": samples,
+                     "quorum": quorum, "deadline": deadline,
+                     "resilience": resilience_policy(call_timeout, retries, hedge, game_timeout)}
+
     # Importing necessary modules based on selected game
     if selected_game == "hanoi":
         from agents.hanoi_agent import HanoiAgent
         from puzzles.hanoi import HanoiState
+        from puzzles.hanoi_compact import CompactHanoiState
 
-        agent1 = HanoiAgent("Llama3.2 Agent", model="llama3.2:latest")
-        agent2 = HanoiAgent("Gemma3 Agent", model="gemma3:latest")
-        state = HanoiState(num_disks=3)
+        agent1 = AGENT_POOL.acquire(HanoiAgent, agent_name(model_a), llm_a, seed_a, **agent_options)
+        agent2 = AGENT_POOL.acquire(HanoiAgent, agent_name(model_b), llm_b, seed_b, **agent_options)
+        state = CompactHanoiState(num_disks) if compact_hanoi else HanoiState(num_disks=num_disks)
 
         def is_done():
             return state.is_solved()
@@ -23,9 +70,9 @@ def run_game(selected_game="nim", output=True, prompt="baseline"):
         from agents.nim_agent import NimAgent
         from puzzles.nim import NimState
 
-        agent1 = NimAgent("Llama3.2 Agent", model="llama3.2:latest")
-        agent2 = NimAgent("Gemma3 Agent", model="gemma3:latest")
-        state = NimState([3, 4, 5])
+        agent1 = AGENT_POOL.acquire(NimAgent, agent_name(model_a), llm_a, seed_a, compact_moves=compact_moves, **agent_options)
+        agent2 = AGENT_POOL.acquire(NimAgent, agent_name(model_b), llm_b, seed_b, compact_moves=compact_moves, **agent_options)
+        state = NimState(list(heaps))
 
         def is_done():
             return state.is_game_over()
@@ -33,35 +80,71 @@ def run_game(selected_game="nim", output=True, prompt="baseline"):
     else:
         raise ValueError("Unsupported game selected.")
 
-    # Shared memory for agents to use
-    memory = SharedMemory()
-    agents = [agent1, agent2]
-    turn = 0
+    return agent1, agent2, state, is_done
 
-    # Main game loop
-    while not is_done() and turn < 20:
-        agent = agents[turn % 2]
-        move = agent.propose_move(state, memory.get_recent(), output=output, prompt=prompt)
+# Hand a finished game's agents back to the pool
+def release_agents(agent1, agent2):
+    AGENT_POOL.release(agent1, agent2)
 
-        if output:
-            print(f"{agent.name} proposes move: {move}")
+# Call fn(*args), adding its wall time to the move's telemetry when instrumentation is enabled
+def timed(telemetry, phase, fn, *args):
+    if telemetry is None:
+        return fn(*args)
+    start = time.perf_counter()
+    result = fn(*args)
+    telemetry.time(phase, time.perf_counter() - start)
+    return result
 
-        if move is None:
-            if output:
-                print("⚠️ No valid move proposed. Skipping turn.")
-        elif state.move(*move):
-            memory.update(move, state)
-        else:
-            if output:
-                print("Illegal move. Skipping.")
+# Apply a proposed move to the state and shared memory, scoring accepted moves against the oracle
+def apply_move(agent, move, state, memory, output, scorer=None, telemetry=None):
+    if output:
+        print(f"{agent.name} proposes move: {move}")
 
+    accepted = False
+    if move is None:
+        if output:
+            print("⚠️ No valid move proposed. Skipping turn.")
+    elif timed(telemetry, "state_move", state.move, *move):
+        accepted = True
+        timed(telemetry, "memory_update", memory.update, move, state)
+        if scorer is not None:
+            quality, delta = scorer.record(move, state)
+            agent.move_quality[quality] += 1
+            agent.distance_delta += delta
+            if output:
+                print(f"Move quality: {quality} (distance {delta:+d})")
+    else:
         if output:
-            state.display()
+            print("Illegal move. Skipping.")
+
+    if telemetry is not None:
+        telemetry.end_move(agent, move, accepted)
+
+    if output:
+        state.display()
+    return accepted
+
+# Mean of the non-empty values in milliseconds, or None if there are none
+def mean_ms(values):
+    values = [v for v in values if v is not None]
+    return round(sum(values) / len(values) * 1000, 2) if values else None
+
+# Start the game clock of the agents' resilience policy, so their calls are cut short at the game's deadline
+def start_deadline(agents, started):
+    policy = agents[0].resilience
+    if policy is not None and policy.game_timeout is not None:
+        for agent in agents:
+            agent.game_deadline = started + policy.game_timeout
 
-        turn += 1
+def past_deadline(agent):
+    return agent.game_deadline is not None and time.perf_counter() >= agent.game_deadline
 
-    # Game result
-    winner = agents[(turn - 1) % 2].name if is_done() else None
+# Build the result dict once the game loop has finished
+def game_result(agent1, agent2, turn, is_done, output, seed=None, scorer=None, duration=None, telemetry=None,
+                memory=None, cycle_limit=None, speculator=None):
+    agents = [agent1, agent2]
+    winner_seat = (turn - 1) % 2 if is_done() else None
+    winner = agents[winner_seat].name if winner_seat is not None else None
 
     if output:
         if winner:
@@ -72,15 +155,209 @@ def run_game(selected_game="nim", output=True, prompt="baseline"):
     # Return result for logging or analysis
     return {
         "winner": winner,
+        # the seat ("a" or "b") and model that won, unambiguous even when both agents play the same model
+        "winner_seat": "ab"[winner_seat] if winner_seat is not None else None,
+        "winner_model": agents[winner_seat].model if winner_seat is not None else None,
         "turns": turn,
         "solved": is_done(),
+        "cycle_stop": cycle_limit is not None and not is_done() and memory.is_cycling(cycle_limit),
+        "deadline_stop": past_deadline(agent1) and not is_done() and turn < 20,
+        "repeated_positions": memory.repeats if memory is not None else None,
         "illegal_moves_agent_a": agent1.illegal_moves,
         "illegal_moves_agent_b": agent2.illegal_moves,
+        "timeouts": agent1.timeouts + agent2.timeouts,
+        "retries": agent1.retries + agent2.retries,
+        "hedged_calls": agent1.hedged_calls + agent2.hedged_calls,
+        "hedge_wins": agent1.hedge_wins + agent2.hedge_wins,
+        "circuit_rejections": agent1.circuit_rejections + agent2.circuit_rejections,
+        "failed_calls": agent1.failed_calls + agent2.failed_calls,
         "fallbacks_agent_a": agent1.fallbacks_used,
-        "fallbacks_agent_b": agent2.fallbacks_used
+        "fallbacks_agent_b": agent2.fallbacks_used,
+        "cache_hits": agent1.cache_hits + agent2.cache_hits,
+        "cache_misses": agent1.cache_misses + agent2.cache_misses,
+        "prompt_tokens_saved": agent1.prompt_tokens_saved + agent2.prompt_tokens_saved,
+        "optimal_moves_agent_a": agent1.move_quality["optimal"],
+        "optimal_moves_agent_b": agent2.move_quality["optimal"],
+        "neutral_moves_agent_a": agent1.move_quality["neutral"],
+        "neutral_moves_agent_b": agent2.move_quality["neutral"],
+        "blunders_agent_a": agent1.move_quality["blunder"],
+        "blunders_agent_b": agent2.move_quality["blunder"],
+        "distance_delta_agent_a": agent1.distance_delta,
+        "distance_delta_agent_b": agent2.distance_delta,
+        "final_distance": scorer.distance if scorer is not None else None,
+        "mean_ttft_ms": mean_ms([ttft for ttft, _ in agent1.move_timings + agent2.move_timings]),
+        "mean_time_to_move_ms": mean_ms([ttm for _, ttm in agent1.move_timings + agent2.move_timings]),
+        "early_stops": agent1.early_stops + agent2.early_stops,
+        "cold_start_ms": mean_ms(agent1.cold_starts + agent2.cold_starts),
+        "llm_calls_agent_a": agent1.llm_calls,
+        "llm_calls_agent_b": agent2.llm_calls,
+        "accepted_moves_agent_a": sum(agent1.move_quality.values()),
+        "accepted_moves_agent_b": sum(agent2.move_quality.values()),
+        "completion_tokens_agent_a": agent1.completion_tokens,
+        "completion_tokens_agent_b": agent2.completion_tokens,
+        "schema_failures": agent1.schema_failures + agent2.schema_failures,
+        "rejected_samples": agent1.rejected_samples + agent2.rejected_samples,
+        "cancelled_samples": agent1.cancelled_samples + agent2.cancelled_samples,
+        "deadline_votes": agent1.deadline_votes + agent2.deadline_votes,
+        "prompt_tokens": agent1.prompt_tokens + agent2.prompt_tokens,
+        "prompt_eval_tokens": agent1.prompt_eval_tokens + agent2.prompt_eval_tokens,
+        "duration_s": round(duration, 3) if duration is not None else None,
+        # speculative opponent calls, only when speculation is enabled
+        **(speculator.summary() if speculator is not None else {}),
+        # p50/p95/p99 per move phase, only when instrumentation is enabled
+        **(telemetry.summary() if telemetry is not None else {}),
+        "seed": seed
     }
 
+# Start a game's move trace when a TraceWriter is given; None otherwise
+def start_trace(traces, state, agents, selected_game, prompt, seed):
+    if traces is None:
+        return None
+    from traces.recorder import GameTrace
+    models = [agent.model for agent in agents]
+    return GameTrace.start(traces.game_id(selected_game, prompt, models, seed), selected_game, state, prompt=prompt,
+                           models=models, seed=seed)
+
+# Record the result with the trace and append it
+def finish_trace(traces, trace, result):
+    if trace is not None:
+        trace.metadata.update(winner=result["winner"], turns=result["turns"], solved=result["solved"])
+        traces.write(trace)
+
+# Per-game move instrumentation for the given sinks, attached to both agents; None when disabled
+def start_telemetry(sinks, agents, selected_game, prompt, seed):
+    if sinks is None:
+        return None
+    telemetry = MoveTelemetry(sinks, game=selected_game, prompt=prompt, seed=seed)
+    for agent in agents:
+        agent.telemetry = telemetry
+    return telemetry
+
+# Game selection: "hanoi" or "nim"
+# Passing the same seed replays the same fallback decisions for a given sequence of LLM answers
+# An optional ResponseCache is shared by both agents
+# sinks enables per-move instrumentation: None disables it, a list (possibly empty) of telemetry.sinks receives
+# every move record and the result gains p50/p95/p99 per phase
+# traces (a traces.recorder.TraceWriter) appends a binary move trace of the game for LLM-free replay
+# cycle_limit ends the game once a position has been reached that many times (agents looping in Hanoi),
+# instead of spending the remaining turns of the cap on LLM calls; None plays on to the cap
+# speculate > 0 sends the opponent's prompts for that many likely positions while an agent decides (see
+# agents.speculation); overlapping calls need an event loop, so the game is played by arun_game
+# Extra keyword arguments (num_disks, heaps, compact_moves, stream, output_format, models, keep_alive, ...) are passed on to setup_game
+def run_game(selected_game="nim", output=True, prompt="baseline", seed=None, cache=None, backend="ollama", base_url=None,
+             sinks=None, traces=None, cycle_limit=None, speculate=0, **setup_options):
+    if speculate:
+        from llm.pool import sync_loop
+        return sync_loop().run_until_complete(arun_game(selected_game, output, prompt, seed, cache, backend, base_url,
+                                                        sinks, traces, cycle_limit, speculate, **setup_options))
+
+    agent1, agent2, state, is_done = setup_game(selected_game, seed, cache, backend, base_url, **setup_options)
+
+    # Shared memory for agents to use, and the oracle scoring every accepted move
+    memory = SharedMemory()
+    scorer = make_scorer(state)
+    agents = [agent1, agent2]
+    turn = 0
+    telemetry = start_telemetry(sinks, agents, selected_game, prompt, seed)
+    trace = start_trace(traces, state, agents, selected_game, prompt, seed)
+    started = time.perf_counter()
+    start_deadline(agents, started)
+
+    try:
+        # Main game loop
+        while not is_done() and turn < 20:
+            if past_deadline(agent1):
+                if output:
+                    print("⏱️ Game deadline reached, ending the game.")
+                break
+            agent = agents[turn % 2]
+            if telemetry is not None:
+                telemetry.begin_move(turn, agent)
+            move_started = time.perf_counter()
+            move = agent.propose_move(state, memory.get_recent(), output=output, prompt=prompt)
+            move_time = time.perf_counter() - move_started
+            if telemetry is not None:
+                telemetry.time("propose_move", move_time)
+            accepted = apply_move(agent, move, state, memory, output, scorer, telemetry)
+            if trace is not None:
+                trace.add_turn(turn % 2, agent.last_response, move, accepted, move_time)
+            turn += 1
+            if cycle_limit is not None and memory.is_cycling(cycle_limit):
+                if output:
+                    print(f"🔁 Position repeated {cycle_limit} times, ending the game.")
+                break
+
+        result = game_result(agent1, agent2, turn, is_done, output, seed, scorer, time.perf_counter() - started,
+                             telemetry, memory, cycle_limit)
+        finish_trace(traces, trace, result)
+        return result
+    finally:
+        release_agents(agent1, agent2)
+
+# Async version of run_game: awaits each LLM call so many games can be in flight on one event loop
+async def arun_game(selected_game="nim", output=False, prompt="baseline", seed=None, cache=None, backend="ollama", base_url=None,
+                    sinks=None, traces=None, cycle_limit=None, speculate=0, **setup_options):
+    agent1, agent2, state, is_done = setup_game(selected_game, seed, cache, backend, base_url, **setup_options)
+
+    # Shared memory for agents to use, and the oracle scoring every accepted move
+    memory = SharedMemory()
+    scorer = make_scorer(state)
+    agents = [agent1, agent2]
+    turn = 0
+    telemetry = start_telemetry(sinks, agents, selected_game, prompt, seed)
+    trace = start_trace(traces, state, agents, selected_game, prompt, seed)
+    speculator = None
+    if speculate:
+        from agents.speculation import Speculator
+        speculator = Speculator(speculate)
+    started = time.perf_counter()
+    start_deadline(agents, started)
+
+    try:
+        # Main game loop
+        while not is_done() and turn < 20:
+            if past_deadline(agent1):
+                if output:
+                    print("⏱️ Game deadline reached, ending the game.")
+                break
+            agent = agents[turn % 2]
+            if telemetry is not None:
+                telemetry.begin_move(turn, agent)
+            if speculator is not None and turn + 1 < 20:
+                speculator.start(agents[(turn + 1) % 2], state, memory, prompt)
+            move_started = time.perf_counter()
+            move = await agent.apropose_move(state, memory.get_recent(), output=output, prompt=prompt,
+                                             speculator=speculator)
+            move_time = time.perf_counter() - move_started
+            if telemetry is not None:
+                telemetry.time("propose_move", move_time)
+            accepted = apply_move(agent, move, state, memory, output, scorer, telemetry)
+            if trace is not None:
+                trace.add_turn(turn % 2, agent.last_response, move, accepted, move_time)
+            turn += 1
+            if cycle_limit is not None and memory.is_cycling(cycle_limit):
+                if output:
+                    print(f"🔁 Position repeated {cycle_limit} times, ending the game.")
+                break
+
+        if speculator is not None:
+            speculator.cancel()  # calls for a turn that never came count as wasted
+        result = game_result(agent1, agent2, turn, is_done, output, seed, scorer, time.perf_counter() - started,
+                             telemetry, memory, cycle_limit, speculator)
+        finish_trace(traces, trace, result)
+        return result
+    finally:
+        if speculator is not None:
+            speculator.cancel()
+        release_agents(agent1, agent2)
+
 if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        # subcommand given (play, bench, plot): run non-interactively, see python main.py --help
+        from cli import run
+        sys.exit(run(sys.argv[1:]))
+
     # select game
     game_input = input("Select Towers of Hanoi or Nim Game (H/N):").strip().lower()
 
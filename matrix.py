@@ -0,0 +1,330 @@
+import asyncio
+import json
+import os
+import time
+from main import arun_game, derive_seed, DEFAULT_MODELS, prompt_types_hanoi, prompt_types_nim
+
+# Defaults for keys a matrix config leaves out
+MATRIX_DEFAULTS = {
+    "games": ["nim"],
+    "prompts": "all",  # "all", a list for every game, or {"nim": [...], "hanoi": [...]}
+    "models": [list(DEFAULT_MODELS)],  # model pairs [model_a, model_b], or model names for a tournament of every pair
+    "memory_budget_gb": None,  # GB of models kept loaded at once (tournaments default to the largest pair)
+    "model_sizes_gb": {},  # resident size per model, tournament.DEFAULT_MODEL_SIZE_GB if missing
+    "seeds": [0],  # base seeds
+    "repetitions": 10,  # games per (game, prompt, model pair, base seed)
+    "concurrency": 4,
+    "backend": "ollama",
+    "base_url": None,  # a server URL, or a list of endpoint specs ("URL=N" or tables) to balance calls over
+    "cache_mode": None,
+    "options": {},  # extra setup_game options (stream, output_format, keep_alive, num_disks, heaps, ...)
+    "store": os.path.join("benchmarks", "store"),
+    "journal": None,  # defaults to benchmarks/journal/<name>.jsonl
+    "traces": None,  # directory for binary move traces of every game, None for none
+}
+
+"""
+Load a matrix config from a TOML or JSON file and fill in the defaults.
+
+Args:
+    path (str): The config file (.toml or .json).
+
+Returns:
+    dict: The config, with "name" defaulting to the file name.
+
+Raises:
+    ValueError: If the config names an unknown game or prompt type.
+"""
+def load_config(path):
+    if path.endswith(".toml"):
+        import tomllib
+        with open(path, "rb") as f:
+            config = tomllib.load(f)
+    else:
+        with open(path) as f:
+            config = json.load(f)
+
+    config = {**MATRIX_DEFAULTS, **config}
+    config.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    if config["journal"] is None:
+        config["journal"] = os.path.join("benchmarks", "journal", f"{config['name']}.jsonl")
+    for game in config["games"]:
+        available = {"nim": prompt_types_nim, "hanoi": prompt_types_hanoi}.get(game)
+        if available is None:
+            raise ValueError(f"Unknown game in matrix: {game}")
+        unknown = [prompt for prompt in prompts_for(config, game) if prompt not in available]
+        if unknown:
+            raise ValueError(f"Unknown {game} prompt types in matrix: {', '.join(unknown)}")
+    return config
+
+# A tournament lists model names instead of pairs: every pair plays, in both seatings
+def is_tournament(config):
+    return all(isinstance(models, str) for models in config["models"])
+
+# Budget the run keeps the loaded models under, or None to leave loading to the server
+def memory_budget(config):
+    from tournament import default_budget
+    if config["memory_budget_gb"] is not None:
+        return config["memory_budget_gb"]
+    if is_tournament(config):
+        return default_budget(config["models"], config["model_sizes_gb"])
+    return None
+
+# Model pairs in the order they play: a tournament is scheduled to keep model loads down
+def model_pairs(config):
+    if is_tournament(config):
+        from tournament import schedule_pairs
+        return schedule_pairs(config["models"], config["model_sizes_gb"], memory_budget(config))
+    return [tuple(models) for models in config["models"]]
+
+# Prompt types of one game in the matrix
+def prompts_for(config, game):
+    prompts = config["prompts"]
+    if isinstance(prompts, dict):
+        prompts = prompts.get(game, "all")
+    if prompts == "all":
+        return prompt_types_hanoi if game == "hanoi" else prompt_types_nim
+    return prompts
+
+class Cell:
+    """
+    One game of the matrix.
+
+    Attributes:
+        game (str): "hanoi" or "nim".
+        prompt (str): The prompt type.
+        models (tuple): Agent A's and agent B's models.
+        base_seed (int): The base seed.
+        repetition (int): 1-based repetition number, the game number within its group.
+        key (str): Stable identifier used by the journal.
+    """
+    def __init__(self, game, prompt, models, base_seed, repetition):
+        self.game = game
+        self.prompt = prompt
+        self.models = tuple(models)
+        self.base_seed = base_seed
+        self.repetition = repetition
+        self.key = "|".join([game, prompt, *self.models, str(base_seed), str(repetition)])
+
+    # Cells of a group are stored together: one result store append per (game, prompt, model pair)
+    @property
+    def group(self):
+        return self.game, self.prompt, self.models
+
+    # The seed benchmark.game_seed gives game number `repetition`, so matrix and benchmark games line up
+    @property
+    def seed(self):
+        return derive_seed(self.base_seed, self.game, self.prompt, self.repetition)
+
+"""
+Expand a config into its cells: model pairs x games x prompt types x seeds x repetitions.
+
+Args:
+    config (dict): A loaded matrix config.
+
+Returns:
+    list: The cells, grouped by model pair (in play order), then game and prompt.
+"""
+def expand_matrix(config):
+    return [Cell(game, prompt, models, seed, repetition)
+            for models in model_pairs(config)
+            for game in config["games"]
+            for prompt in prompts_for(config, game)
+            for seed in config["seeds"]
+            for repetition in range(1, config["repetitions"] + 1)]
+
+class Journal:
+    """
+    Write-ahead journal of a matrix run, one JSON line per event, fsynced as it is written:
+    {"type": "result", "cell": key, "result": {...}} when a game finishes, and
+    {"type": "stored", "cells": [keys]} once those results are in the result store, and
+    {"type": "failed", "cell": key, "error": "..."} when a game raised; failed cells are played again on resume.
+    A torn last line from a crash is ignored on replay.
+
+    Attributes:
+        path (str): The JSONL file.
+        results (dict): Cell key -> result of every finished game.
+        stored (set): Cell keys whose results reached the result store.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.results = {}
+        self.stored = set()
+        if os.path.exists(path):
+            self._replay()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _replay(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if event["type"] == "result":
+                self.results[event["cell"]] = event["result"]
+            elif event["type"] == "stored":
+                self.stored.update(event["cells"])
+        # a torn write at the end of an interrupted run is cut off, so the next event starts on a line of its own
+        if complete < len(data):
+            with open(self.path, "r+b") as f:
+                f.truncate(complete)
+
+    def _write(self, event):
+        self._file.write(json.dumps(event) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record_result(self, cell, result):
+        self.results[cell.key] = result
+        self._write({"type": "result", "cell": cell.key, "result": result})
+
+    def record_failure(self, cell, error):
+        self._write({"type": "failed", "cell": cell.key, "error": f"{type(error).__name__}: {error}"})
+
+    def record_stored(self, keys):
+        self.stored.update(keys)
+        self._write({"type": "stored", "cells": list(keys)})
+
+    def close(self):
+        self._file.close()
+
+# Append finished results of cells in one group to the store, then journal them as stored
+def store_group(store, journal, cells, run_id):
+    pending = [cell for cell in cells if cell.key in journal.results and cell.key not in journal.stored]
+    if not pending:
+        return
+    game, prompt, models = pending[0].group
+    store.append([journal.results[cell.key] for cell in pending], game, prompt, models, run_id)
+    journal.record_stored([cell.key for cell in pending])
+
+"""
+Run (or resume) a benchmark matrix. Games already in the journal are not replayed; results journaled
+but not yet stored (a crash between the two) are stored first.
+
+Args:
+    config (dict): A loaded matrix config.
+    fresh (bool): Discard the journal and start over.
+
+Returns:
+    dict: {"cells": total, "skipped": already finished, "played": games played now, "failed": games that raised}
+"""
+async def arun_matrix(config, fresh=False):
+    from results.store import ResultStore
+    from llm.response_cache import ResponseCache, DEFAULT_CACHE_PATH
+
+    if fresh and os.path.exists(config["journal"]):
+        os.remove(config["journal"])
+    journal = Journal(config["journal"])
+    store = ResultStore(config["store"])
+    cache = ResponseCache(DEFAULT_CACHE_PATH, mode=config["cache_mode"]) if config["cache_mode"] else None
+    run_id = config["name"]
+    traces = None
+    if config["traces"]:
+        from traces.recorder import TraceWriter
+        traces = TraceWriter(config["traces"], run_id)
+
+    cells = expand_matrix(config)
+    groups = {}
+    for cell in cells:
+        groups.setdefault(cell.group, []).append(cell)
+    for group_cells in groups.values():
+        store_group(store, journal, group_cells, run_id)
+
+    remaining = [cell for cell in cells if cell.key not in journal.results]
+    left = {group: sum(1 for cell in group_cells if cell.key not in journal.results)
+            for group, group_cells in groups.items()}
+    print(f"Matrix {config['name']}: {len(cells)} games, {len(cells) - len(remaining)} already done, "
+          f"{len(remaining)} to play")
+
+    semaphore = asyncio.Semaphore(config["concurrency"])
+    failed = []
+
+    # A game that raises is journaled as failed and the rest of the matrix goes on; a resume plays it again
+    async def play(cell):
+        label = f"[{cell.game}/{cell.prompt} {cell.models[0]} vs {cell.models[1]}] Game {cell.repetition}"
+        try:
+            async with semaphore:
+                result = await arun_game(selected_game=cell.game, output=False, prompt=cell.prompt, seed=cell.seed,
+                                         cache=cache, backend=config["backend"], base_url=config["base_url"],
+                                         models=cell.models, traces=traces, **config["options"])
+        except Exception as e:
+            failed.append(cell)
+            journal.record_failure(cell, e)
+            print(f"{label}: failed ({type(e).__name__}: {e})")
+        else:
+            result["game_number"] = cell.repetition
+            journal.record_result(cell, result)
+            print(f"{label}: Winner = {result['winner']}, Turns = {result['turns']}")
+        # the last game of a group stores the whole group
+        left[cell.group] -= 1
+        if left[cell.group] == 0:
+            store_group(store, journal, groups[cell.group], run_id)
+
+    # Matches are played one model pair at a time; under a memory budget the pair's models are loaded
+    # (and models it pushes out unloaded) before its games start, so load and inference time are apart
+    from llm.pool import get_backend
+    from tournament import Residency
+    budget = memory_budget(config)
+    # a replay-only rerun answers from the cache and never loads a model
+    offline = config["cache_mode"] == "replay-only"
+    residency = Residency(config["model_sizes_gb"], budget) if budget is not None and not offline else None
+    keep_alive = config["options"].get("keep_alive")
+    timings = {"load_s": 0.0, "inference_s": 0.0}
+
+    async def prepare(models):
+        loads, evictions = residency.admit(models)
+        for model in evictions:
+            await asyncio.to_thread(get_backend(model, config["backend"], config["base_url"], keep_alive).unload)
+        for model in loads:
+            timings["load_s"] += await asyncio.to_thread(
+                get_backend(model, config["backend"], config["base_url"], keep_alive).warm_up)
+
+    start = time.perf_counter()
+    try:
+        for models in dict.fromkeys(cell.models for cell in remaining):
+            if residency is not None:
+                await prepare(models)
+            pair_start = time.perf_counter()
+            # the task group cancels and awaits every game before the journal, traces and cache are closed
+            async with asyncio.TaskGroup() as group:
+                for cell in remaining:
+                    if cell.models == models:
+                        group.create_task(play(cell))
+            timings["inference_s"] += time.perf_counter() - pair_start
+    finally:
+        journal.close()
+        if traces is not None:
+            traces.close()
+        if cache is not None:
+            cache.close()
+    elapsed = time.perf_counter() - start
+    summary = {"cells": len(cells), "skipped": len(cells) - len(remaining), "played": len(remaining) - len(failed),
+               "failed": len(failed)}
+    if remaining:
+        print(f"{len(remaining)} games in {elapsed:.1f}s ({len(remaining) / elapsed * 60:.1f} games/min)")
+    if failed:
+        print(f"{len(failed)} games failed and will be played again when the matrix is resumed")
+    if residency is not None:
+        summary.update(timings, model_loads=residency.loads, round_robin_loads=round_robin_loads(config, budget))
+        print_schedule_summary(summary)
+    return summary
+
+# Model loads the same matrix would cost played naively: per game and prompt, every pair in turn
+def round_robin_loads(config, budget):
+    from tournament import count_loads, round_robin_pairs
+    pairs = round_robin_pairs(config["models"]) if is_tournament(config) else [tuple(m) for m in config["models"]]
+    groups = sum(len(prompts_for(config, game)) for game in config["games"])
+    return count_loads(pairs * groups, config["model_sizes_gb"], budget)
+
+def print_schedule_summary(summary):
+    loads = summary["model_loads"]
+    print(f"Model loads: {loads} in {summary['load_s']:.1f}s, inference: {summary['inference_s']:.1f}s")
+    if loads and not summary["skipped"]:
+        mean_load = summary["load_s"] / loads
+        saved = summary["round_robin_loads"] - loads
+        print(f"Naive round-robin: {summary['round_robin_loads']} loads; "
+              f"{saved} avoided, ~{saved * mean_load:.1f}s of loading saved")
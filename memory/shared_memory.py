@@ -1,10 +1,86 @@
+from collections import deque
+from functools import lru_cache
+
+# Recent moves kept for the prompts; agents read at most the last few
+DEFAULT_CAPACITY = 32
+
+"""
+Zobrist key of one (piece, place) component of a position: a fixed pseudo-random 64-bit value
+(splitmix64 of the packed arguments), identical in every process.
+
+Args:
+    kind (int): 0 for a Nim heap size, 1 for a Hanoi disk position.
+    piece (int): Nim heap index, or Hanoi disk size.
+    place (int): Nim heap size, or Hanoi peg.
+
+Returns:
+    int: The key.
+"""
+@lru_cache(maxsize=None)
+def zobrist_key(kind, piece, place):
+    z = (kind << 48 | piece << 24 | place) + 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF
+    z = (z ^ z >> 30) * 0xBF58476D1CE4E5B9 & 0xFFFFFFFFFFFFFFFF
+    z = (z ^ z >> 27) * 0x94D049BB133111EB & 0xFFFFFFFFFFFFFFFF
+    return z ^ z >> 31
+
+"""
+Zobrist hash of a whole position, the XOR of its components' keys. O(heaps) or O(disks); moves
+update it in O(1) with move_delta.
+
+Args:
+    state: A NimState, HanoiState or CompactHanoiState.
+
+Returns:
+    int: The hash.
+"""
+def state_hash(state):
+    value = 0
+    if hasattr(state, "heaps"):
+        for heap, count in enumerate(state.heaps):
+            value ^= zobrist_key(0, heap, count)
+    else:
+        for peg, disks in enumerate(state.pegs):
+            for disk in disks:
+                value ^= zobrist_key(1, disk, peg)
+    return value
+
+"""
+Change of the Zobrist hash made by a move, given the state right after it.
+
+Args:
+    move (tuple): (heap_index, num_removed) or (from_peg, to_peg).
+    state: The state after the move.
+
+Returns:
+    int: Value to XOR into the previous position's hash.
+"""
+def move_delta(move, state):
+    if hasattr(state, "heaps"):
+        heap, removed = move
+        count = state.heaps[heap]
+        return zobrist_key(0, heap, count + removed) ^ zobrist_key(0, heap, count)
+    from_peg, to_peg = move
+    disk = state.top(to_peg)  # the disk just moved is now on top of the destination peg
+    return zobrist_key(1, disk, from_peg) ^ zobrist_key(1, disk, to_peg)
+
 class SharedMemory:
     """
     Shared memory for agents to remember past moves and visited states.
+
+    Positions are tracked by an incremental Zobrist hash, updated in O(1) per move, with a visit count
+    per position; recent moves live in a fixed-capacity ring buffer, so memory stays bounded in long games.
+
+    Attributes:
+        moves (deque): The last `capacity` moves, (from_peg, to_peg) or (heap_index, num_removed).
+        visits (dict): Position hash -> times the game has been in that position (the start included).
+        hash (int): Hash of the current position, None before the first move.
+        repeats (int): Moves that led back to a position seen before.
     """
-    def __init__(self):
-        self.moves = []              # List of (from_peg, to_peg) or (heap_index, num_removed)
-        self.visited_states = set()  # Set of game states as strings
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.moves = deque(maxlen=capacity)
+        self.visits = {}
+        self.hash = None
+        self.repeats = 0
 
     """
     Update memory with a new move and resulting state.
@@ -15,7 +91,17 @@ class SharedMemory:
     """
     def update(self, move, state):
         self.moves.append(move)
-        self.visited_states.add(str(state.pegs if hasattr(state, "pegs") else state.heaps))
+        if self.hash is None:
+            # first move: hash the position once, and count the starting position it came from
+            self.hash = state_hash(state)
+            start = self.hash ^ move_delta(move, state)
+            self.visits[start] = 1
+        else:
+            self.hash ^= move_delta(move, state)
+        count = self.visits.get(self.hash, 0) + 1
+        self.visits[self.hash] = count
+        if count > 1:
+            self.repeats += 1
 
     """
     Get the most recent moves.
@@ -27,7 +113,8 @@ class SharedMemory:
         list: A list of recent moves.
     """
     def get_recent(self, n=5):
-        return self.moves[-n:]
+        start = max(0, len(self.moves) - n)
+        return [self.moves[i] for i in range(start, len(self.moves))]
 
     """
     Check if a state has been seen before.
@@ -39,4 +126,25 @@ class SharedMemory:
         bool: True if the state has been visited, False otherwise.
     """
     def has_seen(self, state):
-        return str(state.pegs if hasattr(state, "pegs") else state.heaps) in self.visited_states
\ No newline at end of file
+        return state_hash(state) in self.visits
+
+    """
+    Times the game has been in the current position, counting the present visit.
+
+    Returns:
+        int: The count, 0 before the first move.
+    """
+    def current_visits(self):
+        return self.visits.get(self.hash, 0)
+
+    """
+    Whether the game keeps coming back to the same position.
+
+    Args:
+        limit (int): Visits of one position that count as a cycle.
+
+    Returns:
+        bool: True once the current position has been reached `limit` times.
+    """
+    def is_cycling(self, limit):
+        return self.current_visits() >= limit
\ No newline at end of file
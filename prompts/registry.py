@@ -0,0 +1,169 @@
+from llm.tokens import estimate_tokens
+import os
+import re
+
+# Template files live in prompts/<game>/<prompt_type>.txt; this line separates the static prefix from the dynamic suffix
+PROMPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SUFFIX_MARKER = "---"
+
+"""
+Normalize a template's whitespace: strip every line, collapse runs of spaces and tabs,
+and keep at most one blank line between paragraphs.
+
+Args:
+    text (str): The raw template text.
+
+Returns:
+    str: The normalized text.
+"""
+def normalize_whitespace(text):
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in text.strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+class PromptTemplate:
+    """
+    One prompt type: an immutable static prefix shared by every turn, followed by a small dynamic
+    suffix holding the state. Keeping the prefix first and byte-identical lets the Ollama server
+    reuse its prompt cache across turns.
+
+    Attributes:
+        game (str): "hanoi" or "nim".
+        name (str): The prompt type.
+        prefix (str): The static, already normalized prefix.
+        suffix (str): The suffix template, with {state}, {memory} and {legal_moves} fields; state attributes
+            such as {state.num_disks} can be used too, keeping per-game settings out of the prefix.
+        prefix_tokens (int): Estimated tokens of the prefix.
+        suffix_tokens (int): Estimated tokens of the suffix's fixed text (fields excluded).
+    """
+    def __init__(self, game, name, prefix, suffix):
+        self.game = game
+        self.name = name
+        self.prefix = normalize_whitespace(prefix)
+        self.suffix = normalize_whitespace(suffix)
+        self.prefix_tokens = estimate_tokens(self.prefix)
+        self.suffix_tokens = estimate_tokens(re.sub(r"\{[\w.]+\}", "", self.suffix))
+        self._head = self.prefix + "\n\n"
+
+    """
+    Render the prompt for one turn.
+
+    Args:
+        state: The current game state.
+        memory (list): A list of recent moves.
+        legal_moves: The legal moves, or their compact description.
+
+    Returns:
+        str: The prompt to send to the LLM.
+    """
+    def render(self, state, memory, legal_moves):
+        return self._head + self.suffix.format(state=state, memory=memory, legal_moves=legal_moves)
+
+    def __repr__(self):
+        return f"PromptTemplate({self.game!r}, {self.name!r})"
+
+class PromptRegistry:
+    """
+    Prompt templates by game and prompt type.
+
+    Attributes:
+        templates (dict): game -> {prompt type -> PromptTemplate}.
+    """
+    def __init__(self):
+        self.templates = {}
+
+    """
+    Add a template, replacing any template of the same game and name.
+
+    Args:
+        template (PromptTemplate): The template.
+    """
+    def register(self, template):
+        self.templates.setdefault(template.game, {})[template.name] = template
+
+    """
+    Load every prompts/<game>/<prompt_type>.txt file below a directory.
+
+    Args:
+        directory (str): The directory holding one subdirectory per game.
+
+    Raises:
+        ValueError: If a template has no prefix/suffix separator.
+    """
+    def load_directory(self, directory=PROMPTS_DIR):
+        for game in sorted(os.listdir(directory)):
+            game_dir = os.path.join(directory, game)
+            if not os.path.isdir(game_dir) or game.startswith("__"):
+                continue
+            for filename in sorted(os.listdir(game_dir)):
+                if not filename.endswith(".txt"):
+                    continue
+                with open(os.path.join(game_dir, filename), encoding="utf-8") as f:
+                    text = f.read()
+                prefix, marker, suffix = text.partition(f"\n{SUFFIX_MARKER}\n")
+                if not marker:
+                    raise ValueError(f"{game}/{filename} has no '{SUFFIX_MARKER}' line between prefix and suffix")
+                self.register(PromptTemplate(game, filename[:-len(".txt")], prefix, suffix))
+
+    """
+    Look up a template.
+
+    Args:
+        game (str): "hanoi" or "nim".
+        name (str): The prompt type.
+
+    Returns:
+        PromptTemplate: The template.
+
+    Raises:
+        ValueError: If the game has no such prompt type.
+    """
+    def get(self, game, name):
+        try:
+            return self.templates[game][name]
+        except KeyError:
+            raise ValueError(f"Unknown {game} prompt type: {name}") from None
+
+    """
+    Render one turn's prompt.
+
+    Args:
+        game (str): "hanoi" or "nim".
+        name (str): The prompt type.
+        state: The current game state.
+        memory (list): A list of recent moves.
+        legal_moves: The legal moves, or their compact description.
+
+    Returns:
+        str: The prompt to send to the LLM.
+    """
+    def render(self, game, name, state, memory, legal_moves):
+        return self.get(game, name).render(state, memory, legal_moves)
+
+    """
+    Prompt types registered for a game.
+
+    Args:
+        game (str): "hanoi" or "nim".
+
+    Returns:
+        list: Prompt type names, sorted.
+    """
+    def names(self, game):
+        return sorted(self.templates.get(game, {}))
+
+    """
+    Estimated token counts per template of a game.
+
+    Args:
+        game (str): "hanoi" or "nim".
+
+    Returns:
+        dict: Prompt type -> {"prefix": tokens, "suffix": tokens of the suffix's fixed text}.
+    """
+    def token_counts(self, game):
+        return {name: {"prefix": t.prefix_tokens, "suffix": t.suffix_tokens}
+                for name, t in sorted(self.templates.get(game, {}).items())}
+
+# Loaded once on first import and shared by every agent
+PROMPTS = PromptRegistry()
+PROMPTS.load_directory()
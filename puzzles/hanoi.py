@@ -30,6 +30,18 @@ class HanoiState:
             return True
         return False
     
+    """
+        Size of the top disk on a peg.
+
+        Args:
+            peg (int): Index of the peg (0-2).
+
+        Returns:
+            int: Size of the top disk, or 0 if the peg is empty.
+    """
+    def top(self, peg):
+        return self.pegs[peg][-1] if self.pegs[peg] else 0
+
     """
         Check if the puzzle is solved (all disks moved to the third peg).
 
@@ -0,0 +1,180 @@
+from puzzles.hanoi import HanoiState
+
+# Legal moves depend only on which pegs are empty and how the top disks compare, so they are
+# precomputed for all 2^6 combinations. Key bits: 0-2 peg empty, 3 top0<top1, 4 top0<top2, 5 top1<top2.
+def _build_legal_move_table():
+    table = []
+    for key in range(64):
+        empty = [bool(key >> peg & 1) for peg in range(3)]
+        smaller = {(0, 1): bool(key >> 3 & 1), (0, 2): bool(key >> 4 & 1), (1, 2): bool(key >> 5 & 1)}
+        moves = []
+        for from_peg in range(3):
+            if empty[from_peg]:
+                continue
+            for to_peg in range(3):
+                if from_peg == to_peg:
+                    continue
+                if empty[to_peg]:
+                    moves.append((from_peg, to_peg))
+                elif from_peg < to_peg and smaller[(from_peg, to_peg)]:
+                    moves.append((from_peg, to_peg))
+                elif from_peg > to_peg and not smaller[(to_peg, from_peg)]:
+                    moves.append((from_peg, to_peg))
+        table.append(tuple(moves))
+    return tuple(table)
+
+LEGAL_MOVE_TABLE = _build_legal_move_table()
+
+class CompactHanoiState(HanoiState):
+    """
+    Tower of Hanoi state encoded as integers, a drop-in for HanoiState.
+
+    Disk d (size d + 1) contributes peg * 3^d to `code`, so a position is a single base-3 integer that
+    hashes in O(1). Each peg also keeps a bitmask of its disks; the lowest set bit is the top disk,
+    which makes top-of-peg lookup, legality checks and moves O(1) regardless of the number of disks.
+
+    Attributes:
+        num_disks (int): The number of disks in the puzzle.
+        code (int): Base-3 encoding of the position.
+        masks (list of int): Per-peg bitmask of the disks on it.
+        history (list): Moves made through move() (apply/undo do not record).
+    """
+    def __init__(self, num_disks):
+        self.num_disks = num_disks
+        self.pow3 = [3 ** d for d in range(num_disks)]
+        self.full_mask = (1 << num_disks) - 1
+        # Initialize pegs: all disks start on the first peg
+        self.masks = [self.full_mask, 0, 0]
+        self.code = 0
+        self.history = []
+
+    """
+    Build a state from its base-3 code.
+
+    Args:
+        num_disks (int): The number of disks in the puzzle.
+        code (int): Base-3 encoding of the position.
+
+    Returns:
+        CompactHanoiState: The decoded state.
+    """
+    @classmethod
+    def from_code(cls, num_disks, code):
+        state = cls(num_disks)
+        state.masks = [0, 0, 0]
+        state.code = code
+        for d in range(num_disks):
+            code, peg = divmod(code, 3)
+            state.masks[peg] |= 1 << d
+        return state
+
+    """
+    Size of the top disk on a peg.
+
+    Args:
+        peg (int): Index of the peg (0-2).
+
+    Returns:
+        int: Size of the top disk, or 0 if the peg is empty.
+    """
+    def top(self, peg):
+        mask = self.masks[peg]
+        return (mask & -mask).bit_length()
+
+    """
+    Move the top disk without checking legality or recording history.
+
+    Args:
+        from_peg (int): Index of the source peg (0-2).
+        to_peg (int): Index of the destination peg (0-2).
+    """
+    def apply(self, from_peg, to_peg):
+        masks = self.masks
+        bit = masks[from_peg] & -masks[from_peg]
+        masks[from_peg] ^= bit
+        masks[to_peg] |= bit
+        self.code += (to_peg - from_peg) * self.pow3[bit.bit_length() - 1]
+
+    """
+    Revert a move made with apply(from_peg, to_peg).
+
+    Args:
+        from_peg (int): Source peg of the move being undone.
+        to_peg (int): Destination peg of the move being undone.
+    """
+    def undo(self, from_peg, to_peg):
+        self.apply(to_peg, from_peg)
+
+    """
+    Attempt to move the top disk from one peg to another.
+
+    Args:
+        from_peg (int): Index of the source peg (0-2).
+        to_peg (int): Index of the destination peg (0-2).
+
+    Returns:
+        bool: True if the move was successful, False otherwise.
+    """
+    def move(self, from_peg, to_peg):
+        if not (0 <= from_peg < 3 and 0 <= to_peg < 3) or from_peg == to_peg:
+            return False
+        source = self.masks[from_peg] & -self.masks[from_peg]
+        target = self.masks[to_peg] & -self.masks[to_peg]
+        if source and (not target or source < target):
+            self.apply(from_peg, to_peg)
+            self.history.append((from_peg, to_peg))
+            return True
+        return False
+
+    """
+    Check if the puzzle is solved (all disks moved to the third peg).
+
+    Returns:
+        bool: True if solved, False otherwise.
+    """
+    def is_solved(self):
+        return self.masks[2] == self.full_mask
+
+    """
+    Legal moves from the current state, looked up in the precomputed table.
+
+    Returns:
+        list of tuple: Each tuple is a legal move (from_peg, to_peg).
+    """
+    def get_legal_moves(self):
+        m0, m1, m2 = self.masks
+        t0, t1, t2 = m0 & -m0, m1 & -m1, m2 & -m2
+        key = (not t0) | (not t1) << 1 | (not t2) << 2 | (t0 < t1) << 3 | (t0 < t2) << 4 | (t1 < t2) << 5
+        return list(LEGAL_MOVE_TABLE[key])
+
+    """
+    Pegs as lists of disk sizes, bottom to top, like HanoiState.pegs. Built on demand in O(n).
+
+    Returns:
+        list of list: The contents of each peg.
+    """
+    @property
+    def pegs(self):
+        return [[d + 1 for d in range(self.num_disks - 1, -1, -1) if mask >> d & 1] for mask in self.masks]
+
+    """
+    Integer key identifying the position, for hashing in memory and search tables.
+
+    Returns:
+        int: The base-3 code.
+    """
+    def key(self):
+        return self.code
+
+    def copy(self):
+        state = CompactHanoiState(self.num_disks)
+        state.masks = self.masks[:]
+        state.code = self.code
+        state.history = self.history[:]
+        return state
+
+    def __eq__(self, other):
+        return isinstance(other, CompactHanoiState) and self.num_disks == other.num_disks and self.code == other.code
+
+    def __hash__(self):
+        return hash((self.num_disks, self.code))
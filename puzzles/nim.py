@@ -1,3 +1,75 @@
+from collections.abc import Sequence
+
+class NimLegalMoves(Sequence):
+    """
+    Legal Nim moves stored as one range per heap instead of one tuple per removable object.
+
+    Membership is O(1), iteration is lazy, and len/indexing are O(number of heaps), so it can stand in
+    for the list get_legal_moves used to return (including random.choice) at any heap size.
+
+    Attributes:
+        heaps (tuple of int): Snapshot of the heap sizes the moves were generated from.
+    """
+    def __init__(self, heaps):
+        self.heaps = tuple(heaps)
+
+    """
+    One (heap_index, max_removable) pair per non-empty heap.
+
+    Returns:
+        list of tuple: The ranges, in heap order.
+    """
+    @property
+    def ranges(self):
+        return [(i, count) for i, count in enumerate(self.heaps) if count > 0]
+
+    def __contains__(self, move):
+        try:
+            heap_index, num_removed = move
+        except (TypeError, ValueError):
+            return False
+        return 0 <= heap_index < len(self.heaps) and 1 <= num_removed <= self.heaps[heap_index]
+
+    def __iter__(self):
+        for i, count in enumerate(self.heaps):
+            for remove in range(1, count + 1):
+                yield (i, remove)
+
+    def __len__(self):
+        return sum(self.heaps)
+
+    def __bool__(self):
+        return any(self.heaps)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if index >= 0:
+            for i, count in enumerate(self.heaps):
+                if index < count:
+                    return (i, index + 1)
+                index -= count
+        raise IndexError("legal move index out of range")
+
+    def __eq__(self, other):
+        if isinstance(other, NimLegalMoves):
+            return self.heaps == other.heaps
+        return list(self) == other
+
+    # Renders like the old list so existing prints and f-strings keep their output
+    def __repr__(self):
+        return repr(list(self))
+
+    """
+    Compact text encoding whose size grows with the number of heaps, not their sizes. Each heap's moves are
+    written as a range of tuples, so templates asking for "a Python tuple from the list" still read right.
+
+    Returns:
+        str: e.g. "(0, 1) .. (0, 3); (2, 1) .. (2, 5)"
+    """
+    def describe(self):
+        return "; ".join(f"({i}, 1)" if count == 1 else f"({i}, 1) .. ({i}, {count})" for i, count in self.ranges)
+
 class NimState:
     """
     Initialize the Nim game state.
@@ -20,7 +92,7 @@ class NimState:
         bool: True if the move was successful, False otherwise.
     """
     def move(self, heap_index, num_removed):
-        if 0 <= heap_index < len(self.heaps) and 1 <= num_removed <= self.heaps[heap_index]:
+        if self.is_legal(heap_index, num_removed):
             self.heaps[heap_index] -= num_removed
             self.history.append((heap_index, num_removed))
             return True
@@ -36,17 +108,37 @@ class NimState:
         return all(heap == 0 for heap in self.heaps)
 
     """
-    Generate a list of all legal moves from the current state.
+    Legal moves from the current state, as ranges per heap.
 
     Returns:
-        list of tuple: Each tuple is a legal move (heap_index, num_removed).
+        NimLegalMoves: Sequence of legal moves (heap_index, num_removed) with O(1) membership.
     """
     def get_legal_moves(self):
-        moves = []
+        return NimLegalMoves(self.heaps)
+
+    """
+    Lazily generate the legal moves one tuple at a time.
+
+    Yields:
+        tuple: A legal move (heap_index, num_removed).
+    """
+    def iter_legal_moves(self):
         for i, count in enumerate(self.heaps):
             for remove in range(1, count + 1):
-                moves.append((i, remove))
-        return moves
+                yield (i, remove)
+
+    """
+    Check whether a move is legal in O(1).
+
+    Args:
+        heap_index (int): Index of the heap to remove from.
+        num_removed (int): Number of objects to remove.
+
+    Returns:
+        bool: True if the move is legal.
+    """
+    def is_legal(self, heap_index, num_removed):
+        return 0 <= heap_index < len(self.heaps) and 1 <= num_removed <= self.heaps[heap_index]
 
     """
     Return a string representation of the current heap states.
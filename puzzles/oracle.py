@@ -0,0 +1,210 @@
+from array import array
+from functools import lru_cache, reduce
+from operator import xor
+
+# Largest Hanoi instance given a full distance table (3^12 = 531441 entries); bigger ones use the closed form
+MAX_TABLE_DISKS = 12
+
+"""
+Distance to the goal (all disks on peg 2) for every Hanoi position, indexed by the base-3 code
+used by CompactHanoiState (disk d contributes peg * 3^d).
+
+Built bottom-up from the recursive structure of the puzzle: if the largest disk already sits on the
+target peg only the smaller disks need solving; otherwise the smaller disks must first gather on the
+spare peg, then the largest disk moves, then the n-1 tower follows (2^(n-1) moves in total).
+
+Args:
+    num_disks (int): The number of disks.
+
+Returns:
+    array: Distance to goal per position code.
+"""
+@lru_cache(maxsize=None)
+def hanoi_distance_table(num_disks):
+    if num_disks > MAX_TABLE_DISKS:
+        raise ValueError(f"No distance table above {MAX_TABLE_DISKS} disks, use hanoi_distance_from_code")
+    # tables[target][code] for the disks placed so far; zero disks are solved for every target
+    tables = [array("i", [0]) for _ in range(3)]
+    for n in range(1, num_disks + 1):
+        extra = 1 << (n - 1)
+        next_tables = []
+        for target in range(3):
+            table = array("i")
+            for peg in range(3):
+                if peg == target:
+                    table.extend(tables[target])
+                else:
+                    table.extend(d + extra for d in tables[3 - peg - target])
+            next_tables.append(table)
+        tables = next_tables
+    return tables[2]
+
+"""
+Distance to the goal from a position code without a table, in O(num_disks).
+
+Args:
+    num_disks (int): The number of disks.
+    code (int): Base-3 position code.
+
+Returns:
+    int: Minimum number of moves to solve the puzzle.
+"""
+def hanoi_distance_from_code(num_disks, code):
+    target = 2
+    distance = 0
+    for d in range(num_disks - 1, -1, -1):
+        peg = code // 3 ** d % 3
+        if peg != target:
+            distance += 1 << d
+            target = 3 - peg - target
+    return distance
+
+"""
+Base-3 code of any Hanoi state (HanoiState or CompactHanoiState).
+
+Args:
+    state: The Hanoi state.
+
+Returns:
+    int: The position code.
+"""
+def hanoi_code(state):
+    if hasattr(state, "code"):
+        return state.code
+    return sum(peg * 3 ** (disk - 1) for peg, disks in enumerate(state.pegs) for disk in disks)
+
+"""
+Minimum number of moves left to solve a Hanoi state.
+
+Args:
+    state: The Hanoi state.
+
+Returns:
+    int: Distance to goal.
+"""
+def hanoi_distance(state):
+    if state.num_disks <= MAX_TABLE_DISKS:
+        return hanoi_distance_table(state.num_disks)[hanoi_code(state)]
+    return hanoi_distance_from_code(state.num_disks, hanoi_code(state))
+
+"""
+Nim-sum (XOR of all heap sizes). The player to move wins with perfect play iff it is non-zero.
+
+Args:
+    heaps (list of int): Heap sizes.
+
+Returns:
+    int: The nim-sum.
+"""
+def nim_sum(heaps):
+    return reduce(xor, heaps, 0)
+
+"""
+Moves that leave a nim-sum of zero, i.e. every winning move. Empty in a losing position.
+
+Args:
+    heaps (list of int): Heap sizes.
+
+Returns:
+    list of tuple: Winning moves (heap_index, num_removed).
+"""
+def nim_winning_moves(heaps):
+    total = nim_sum(heaps)
+    if total == 0:
+        return []
+    return [(i, count - (count ^ total)) for i, count in enumerate(heaps) if count ^ total < count]
+
+class HanoiScorer:
+    """
+    Scores accepted Hanoi moves against the distance-to-goal table in O(1) per move,
+    tracking the position code incrementally.
+
+    A move is "optimal" if it brings the puzzle one move closer to solved, "neutral" if the
+    distance is unchanged and a "blunder" if it moves away from the solution.
+
+    Attributes:
+        num_disks (int): The number of disks.
+        code (int): Current position code.
+        distance (int): Current distance to goal.
+    """
+    def __init__(self, state):
+        self.num_disks = state.num_disks
+        self.code = hanoi_code(state)
+        self.pow3 = [3 ** d for d in range(self.num_disks)]
+        self.table = hanoi_distance_table(self.num_disks) if self.num_disks <= MAX_TABLE_DISKS else None
+        self.distance = self._distance(self.code)
+
+    def _distance(self, code):
+        if self.table is not None:
+            return self.table[code]
+        return hanoi_distance_from_code(self.num_disks, code)
+
+    """
+    Score a move that has just been applied to the state.
+
+    Args:
+        move (tuple): The move (from_peg, to_peg).
+        state: The state after the move.
+
+    Returns:
+        tuple: (quality, distance_delta) with quality "optimal", "neutral" or "blunder".
+    """
+    def record(self, move, state):
+        from_peg, to_peg = move
+        disk = state.top(to_peg)
+        self.code += (to_peg - from_peg) * self.pow3[disk - 1]
+        distance = self._distance(self.code)
+        delta = distance - self.distance
+        self.distance = distance
+        if delta < 0:
+            return "optimal", delta
+        return ("neutral" if delta == 0 else "blunder"), delta
+
+class NimScorer:
+    """
+    Scores accepted Nim moves against perfect play using an incrementally maintained nim-sum.
+
+    From a winning position (nim-sum != 0) a move is "optimal" if it leaves a nim-sum of 0 and a
+    "blunder" otherwise. From a losing position no move can do better, so every move is "neutral".
+
+    Attributes:
+        nim_sum (int): Current nim-sum.
+        distance (int): Objects left on the heaps.
+    """
+    def __init__(self, state):
+        self.nim_sum = nim_sum(state.heaps)
+        self.distance = sum(state.heaps)
+
+    """
+    Score a move that has just been applied to the state.
+
+    Args:
+        move (tuple): The move (heap_index, num_removed).
+        state: The state after the move.
+
+    Returns:
+        tuple: (quality, distance_delta) with distance measured in objects left.
+    """
+    def record(self, move, state):
+        heap_index, num_removed = move
+        after = state.heaps[heap_index]
+        before_sum = self.nim_sum
+        self.nim_sum ^= (after + num_removed) ^ after
+        self.distance -= num_removed
+        if before_sum == 0:
+            return "neutral", -num_removed
+        return ("optimal" if self.nim_sum == 0 else "blunder"), -num_removed
+
+"""
+Build the scorer matching a game state.
+
+Args:
+    state: A HanoiState, CompactHanoiState or NimState.
+
+Returns:
+    HanoiScorer or NimScorer: The scorer, positioned at the state.
+"""
+def make_scorer(state):
+    if hasattr(state, "heaps"):
+        return NimScorer(state)
+    return HanoiScorer(state)
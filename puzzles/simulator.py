@@ -0,0 +1,198 @@
+import json
+import os
+import time
+from functools import lru_cache
+import numpy as np
+from puzzles.oracle import hanoi_distance_table, MAX_TABLE_DISKS
+
+# Vectorized baseline players: many games as NumPy arrays in lock-step, one array operation per turn.
+# Same rules as run_game: at most MAX_TURNS moves, the player who makes the finishing move wins,
+# agent A moves on even turn indices.
+
+MAX_TURNS = 20  # run_game's turn cap
+BASELINES_PATH = os.path.join("benchmarks", "baselines.json")
+
+# Hanoi moves as (from_peg, to_peg) pairs, indexed 0-5
+FROM_PEGS = np.array([0, 0, 1, 1, 2, 2])
+TO_PEGS = np.array([1, 2, 0, 2, 0, 1])
+
+"""
+Uniformly random legal Nim moves, like random.choice(state.get_legal_moves()).
+
+Args:
+    heaps (ndarray): (games, heaps) heap sizes, no game finished.
+    rng (Generator): Random generator.
+
+Returns:
+    tuple: (heap index, objects removed) arrays.
+"""
+def random_nim_moves(heaps, rng):
+    cumulative = heaps.cumsum(axis=1)
+    pick = (rng.random(len(heaps)) * cumulative[:, -1]).astype(np.int64)  # one of the legal (heap, remove) tuples
+    heap = (cumulative <= pick[:, None]).sum(axis=1)
+    rows = np.arange(len(heaps))
+    remove = pick - (cumulative[rows, heap] - heaps[rows, heap]) + 1
+    return heap, remove
+
+# XOR-optimal Nim moves: zero the nim-sum when possible (first such heap), otherwise a random legal move
+def optimal_nim_moves(heaps, rng):
+    heap, remove = random_nim_moves(heaps, rng)
+    target = heaps ^ np.bitwise_xor.reduce(heaps, axis=1)[:, None]
+    reducible = target < heaps
+    winning = np.nonzero(reducible.any(axis=1))[0]
+    best = reducible[winning].argmax(axis=1)
+    heap[winning] = best
+    remove[winning] = heaps[winning, best] - target[winning, best]
+    return heap, remove
+
+NIM_POLICIES = {"random": random_nim_moves, "optimal": optimal_nim_moves}
+
+"""
+Play Nim games in lock-step.
+
+Args:
+    heaps (list or ndarray): Starting heaps, shared by every game (1-D) or one row per game (2-D).
+    num_games (int): Games to play (ignored for 2-D heaps).
+    policies (tuple): Agent A's and agent B's policy, keys of NIM_POLICIES.
+    seed (int): Random seed.
+    max_turns (int): Turn cap.
+
+Returns:
+    dict: Per-game arrays "turns", "winner" (0 for agent A, 1 for agent B, -1 for none) and "solved".
+"""
+def simulate_nim(heaps, num_games=1, policies=("random", "random"), seed=None, max_turns=MAX_TURNS):
+    rng = np.random.default_rng(seed)
+    heaps = np.asarray(heaps, dtype=np.int64)
+    heaps = np.array(np.broadcast_to(heaps, (num_games, heaps.size))) if heaps.ndim == 1 else heaps.copy()
+    turns = np.zeros(len(heaps), dtype=np.int64)
+    for turn in range(max_turns):
+        rows = np.nonzero(heaps.any(axis=1))[0]
+        if not rows.size:
+            break
+        heap, remove = NIM_POLICIES[policies[turn % 2]](heaps[rows], rng)
+        heaps[rows, heap] -= remove
+        turns[rows] += 1
+    solved = ~heaps.any(axis=1)
+    return {"turns": turns, "winner": np.where(solved, (turns - 1) % 2, -1), "solved": solved}
+
+"""
+Transition tables over every Hanoi position, indexed by the base-3 code of puzzles.oracle (disk d on peg p
+adds p * 3^d), so a batch of games advances with one gather per turn.
+
+Args:
+    num_disks (int): The number of disks, at most puzzles.oracle.MAX_TABLE_DISKS.
+
+Returns:
+    tuple: (successors, counts, solver): (positions, 3) codes one legal move away, legal ones first; the
+        number of legal moves (2 or 3); and the successor one move closer to the goal.
+"""
+@lru_cache(maxsize=None)
+def hanoi_transitions(num_disks):
+    if num_disks > MAX_TABLE_DISKS:
+        raise ValueError(f"The simulator supports at most {MAX_TABLE_DISKS} disks")
+    codes = np.arange(3 ** num_disks, dtype=np.int64)
+    weights = 3 ** np.arange(num_disks, dtype=np.int64)
+    pegs = codes[:, None] // weights % 3
+    # top disk of each peg: the smallest disk on it, num_disks when it is empty
+    on_peg = pegs[:, :, None] == np.arange(3)
+    top = np.where(on_peg.any(axis=1), on_peg.argmax(axis=1), num_disks)
+    legal = top[:, FROM_PEGS] < top[:, TO_PEGS]
+    moved = codes[:, None] + (TO_PEGS - FROM_PEGS) * np.append(weights, 0)[top[:, FROM_PEGS]]
+
+    order = np.argsort(~legal, axis=1, kind="stable")[:, :3]
+    successors = np.take_along_axis(moved, order, axis=1).astype(np.int32)
+    distance = np.frombuffer(hanoi_distance_table(num_disks), dtype=np.int32)
+    best = np.where(legal, distance[np.where(legal, moved, 0)], np.iinfo(np.int32).max).argmin(axis=1)
+    solver = moved[np.arange(codes.size), best].astype(np.int32)
+    return successors, legal.sum(axis=1), solver
+
+# Hanoi policies map a batch of position codes to the codes after their move
+
+# Uniformly random legal Hanoi moves
+def random_hanoi_moves(codes, num_disks, rng):
+    successors, counts, _ = hanoi_transitions(num_disks)
+    return successors[codes, (rng.random(codes.size) * counts[codes]).astype(np.int64)]
+
+# Optimal Hanoi moves from any position: one move closer to the goal
+def solver_hanoi_moves(codes, num_disks, rng):
+    return hanoi_transitions(num_disks)[2][codes]
+
+HANOI_POLICIES = {"random": random_hanoi_moves, "solver": solver_hanoi_moves}
+
+"""
+Play Hanoi games in lock-step. Both agents move towards the same goal, all disks on peg 2.
+
+Args:
+    num_disks (int): The number of disks, at most puzzles.oracle.MAX_TABLE_DISKS.
+    num_games (int): Games to play.
+    policies (tuple): Agent A's and agent B's policy, keys of HANOI_POLICIES.
+    seed (int): Random seed.
+    max_turns (int): Turn cap.
+
+Returns:
+    dict: Per-game arrays "turns", "winner" (0 for agent A, 1 for agent B, -1 for none) and "solved".
+"""
+def simulate_hanoi(num_disks, num_games=1, policies=("random", "random"), seed=None, max_turns=MAX_TURNS):
+    rng = np.random.default_rng(seed)
+    goal = 3 ** num_disks - 1  # every disk on peg 2
+    codes = np.zeros(num_games, dtype=np.int32)
+    turns = np.zeros(num_games, dtype=np.int64)
+    for turn in range(max_turns):
+        rows = np.nonzero(codes != goal)[0]
+        if not rows.size:
+            break
+        codes[rows] = HANOI_POLICIES[policies[turn % 2]](codes[rows], num_disks, rng)
+        turns[rows] += 1
+    solved = codes == goal
+    return {"turns": turns, "winner": np.where(solved, (turns - 1) % 2, -1), "solved": solved}
+
+"""
+Reduce simulated games to the counts the plots use.
+
+Args:
+    games (dict): Output of simulate_nim or simulate_hanoi.
+
+Returns:
+    dict: {"games", "wins": {"agent_a", "agent_b"}, "solved", "sketches": {"turns": value -> count}}
+"""
+def summarize(games):
+    turn_counts = np.bincount(games["turns"])
+    return {
+        "games": int(games["turns"].size),
+        "wins": {"agent_a": int((games["winner"] == 0).sum()), "agent_b": int((games["winner"] == 1).sum())},
+        "solved": int(games["solved"].sum()),
+        "sketches": {"turns": {str(value): int(count) for value, count in enumerate(turn_counts) if count}},
+    }
+
+"""
+Simulate every baseline pairing for the given Nim heaps and Hanoi sizes.
+
+Args:
+    num_games (int): Games per pairing and configuration.
+    nim_heaps (list): Nim starting heaps, one tuple per configuration.
+    disk_counts (list): Hanoi disk counts.
+    seed (int): Random seed.
+
+Returns:
+    dict: game -> configuration ("3-4-5", "3") -> "<policy A> vs <policy B>" -> summary.
+"""
+def simulate_baselines(num_games, nim_heaps=((3, 4, 5),), disk_counts=(3,), seed=0):
+    baselines = {"nim": {}, "hanoi": {}}
+    runs = [("nim", "-".join(map(str, heaps)), simulate_nim, heaps, NIM_POLICIES) for heaps in nim_heaps]
+    runs += [("hanoi", str(disks), simulate_hanoi, disks, HANOI_POLICIES) for disks in disk_counts]
+    for game, key, simulate, setup, policies in runs:
+        for policy_a in policies:
+            for policy_b in policies:
+                start = time.perf_counter()
+                games = simulate(setup, num_games, (policy_a, policy_b), seed)
+                elapsed = time.perf_counter() - start
+                summary = summarize(games)
+                baselines[game].setdefault(key, {})[f"{policy_a} vs {policy_b}"] = summary
+                print(f"{game} {key} {policy_a} vs {policy_b}: agent A wins {summary['wins']['agent_a'] / num_games:.3f}, "
+                      f"solved {summary['solved'] / num_games:.3f} ({num_games / elapsed / 1e6:.2f}M games/s)")
+    return baselines
+
+def save_baselines(baselines, path=BASELINES_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(baselines, f, indent=1)
@@ -0,0 +1,145 @@
+import math
+
+"""
+Wilson score interval of a binomial proportion.
+
+Args:
+    successes (int): Successes observed.
+    n (int): Trials observed.
+    z (float): Normal quantile of the confidence level (1.96 for 95%).
+
+Returns:
+    tuple: (low, high), or (0.0, 1.0) before any trial.
+"""
+def wilson_interval(successes, n, z=1.96):
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+"""
+Wald's sequential probability ratio test of H0: rate = p0 against H1: rate = p1.
+
+Args:
+    successes (int): Successes observed.
+    n (int): Trials observed.
+    p0 (float): Rate under H0.
+    p1 (float): Rate under H1, above p0.
+    alpha (float): Accepted chance of wrongly accepting H1.
+    beta (float): Accepted chance of wrongly accepting H0.
+
+Returns:
+    str: "H1" or "H0" once one of them is accepted, None while undecided.
+"""
+def sprt(successes, n, p0, p1, alpha=0.05, beta=0.05):
+    log_ratio = successes * math.log(p1 / p0) + (n - successes) * math.log((1 - p1) / (1 - p0))
+    if log_ratio >= math.log((1 - beta) / alpha):
+        return "H1"
+    if log_ratio <= math.log(beta / (1 - alpha)):
+        return "H0"
+    return None
+
+# The rate a benchmark cell is judged on: Nim win rate of agent A (the first mover), Hanoi solve rate
+def is_success(game, result):
+    if game == "hanoi":
+        return bool(result["solved"])
+    return result["winner_seat"] == "a"
+
+class StoppingRule:
+    """
+    Adaptive number of games for one benchmark cell (game and prompt). After each game the rate's
+    Wilson interval and an SPRT are updated; the cell stops once the interval is narrow enough, the
+    SPRT is decisive, or max_games is reached, but never before min_games.
+
+    Attributes:
+        game (str): "hanoi" or "nim".
+        min_games (int): Games always played.
+        max_games (int): Games never exceeded.
+        half_width (float): Target half-width of the confidence interval.
+        p0, p1 (float): Rates the SPRT decides between.
+        alpha, beta (float): SPRT error rates.
+        z (float): Normal quantile of the interval's confidence level.
+        games (int): Games observed.
+        successes (int): Wins of agent A (Nim) or solved games (Hanoi) observed.
+        reason (str): Why the cell stopped, None while it runs.
+        played (int): Games offered to the rule, including those finished past its decision.
+        missing (int): Games that ended without a result (see skip).
+    """
+    def __init__(self, game, min_games=10, max_games=100, half_width=0.1, p0=0.3, p1=0.7,
+                 alpha=0.05, beta=0.05, z=1.96):
+        self.game = game
+        self.min_games = min_games
+        self.max_games = max_games
+        self.half_width = half_width
+        self.p0 = p0
+        self.p1 = p1
+        self.alpha = alpha
+        self.beta = beta
+        self.z = z
+        self.games = 0
+        self.successes = 0
+        self.reason = None
+        self.played = 0
+        self.missing = 0
+        self._next = 1  # game number the rule counts next
+        self._buffer = {}
+
+    @property
+    def decided(self):
+        return self.reason is not None
+
+    @property
+    def interval(self):
+        return wilson_interval(self.successes, self.games, self.z)
+
+    """
+    Count a finished game from a concurrent runner. Games finish out of order, so they are buffered and
+    counted in game order (by "game_number", from 1): where the rule stops does not depend on scheduling.
+
+    Args:
+        result (dict): The game's result.
+    """
+    def offer(self, result):
+        self.played += 1
+        self._buffer[result["game_number"]] = result
+        self._drain()
+
+    # A game that produced no result (e.g. a replay-only cache miss) is passed over so later games still count
+    def skip(self, game_number):
+        self.missing += 1
+        self._buffer[game_number] = None
+        self._drain()
+
+    def _drain(self):
+        while not self.decided and self._next in self._buffer:
+            result = self._buffer.pop(self._next)
+            self._next += 1
+            if result is not None:
+                self.update(result)
+
+    # Whether a finished game is part of the cell: once decided, games past the deciding one are dropped
+    def keeps(self, result):
+        return not self.decided or result["game_number"] < self._next
+
+    # Count one finished game and re-check the stopping conditions
+    def update(self, result):
+        self.games += 1
+        self.successes += is_success(self.game, result)
+        if self.reason is None:
+            self.reason = self._check()
+
+    def _check(self):
+        if self.games >= self.max_games:
+            return "max games"
+        if self.games < self.min_games:
+            return None
+        low, high = self.interval
+        if (high - low) / 2 <= self.half_width:
+            return f"interval within ±{self.half_width:g}"
+        decision = sprt(self.successes, self.games, self.p0, self.p1, self.alpha, self.beta)
+        if decision is not None:
+            favoured, other = (self.p1, self.p0) if decision == "H1" else (self.p0, self.p1)
+            return f"SPRT favours rate {favoured:g} over {other:g}"
+        return None
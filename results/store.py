@@ -0,0 +1,207 @@
+from telemetry.recorder import SUMMARY_FIELDS
+from datetime import datetime, timezone
+import os
+import re
+import uuid
+
+DEFAULT_STORE_PATH = os.path.join("benchmarks", "store")
+
+# Directory levels of the store: <root>/game=<game>/model=<models>/prompt=<prompt>/date=<YYYY-MM-DD>/part-*.parquet
+PARTITION_COLUMNS = [("game", "string"), ("model", "string"), ("prompt", "string"), ("date", "string")]
+
+# Columns stored in every part file, one row per game, as (name, Arrow type alias)
+DATA_COLUMNS = [
+    ("run_id", "string"),
+    ("created_at", "timestamp"),
+    ("model_a", "string"),
+    ("model_b", "string"),
+    ("game_number", "int64"),
+    ("seed", "int64"),
+    ("winner", "string"),
+    ("winner_seat", "string"),
+    ("winner_model", "string"),
+    ("turns", "int64"),
+    ("solved", "bool"),
+    ("cycle_stop", "bool"),
+    ("deadline_stop", "bool"),
+    ("repeated_positions", "int64"),
+    *[(name, "int64") for name in [
+        "illegal_moves_agent_a", "illegal_moves_agent_b",
+        "timeouts", "retries", "hedged_calls", "hedge_wins", "circuit_rejections", "failed_calls",
+        "fallbacks_agent_a", "fallbacks_agent_b",
+        "cache_hits", "cache_misses", "prompt_tokens_saved",
+        "optimal_moves_agent_a", "optimal_moves_agent_b",
+        "neutral_moves_agent_a", "neutral_moves_agent_b",
+        "blunders_agent_a", "blunders_agent_b",
+        "distance_delta_agent_a", "distance_delta_agent_b", "final_distance",
+    ]],
+    ("mean_ttft_ms", "double"), ("mean_time_to_move_ms", "double"), ("early_stops", "int64"), ("cold_start_ms", "double"),
+    *[(name, "int64") for name in [
+        "llm_calls_agent_a", "llm_calls_agent_b",
+        "accepted_moves_agent_a", "accepted_moves_agent_b",
+        "completion_tokens_agent_a", "completion_tokens_agent_b", "schema_failures",
+        "rejected_samples", "cancelled_samples", "deadline_votes",
+        "prompt_tokens", "prompt_eval_tokens",
+    ]],
+    ("duration_s", "double"),
+    ("speculative_calls", "int64"), ("speculative_hits", "int64"), ("speculative_wasted", "int64"),
+    ("speculation_saved_s", "double"),
+    *[(field, "double") for field in SUMMARY_FIELDS],
+]
+
+_schemas = None
+
+"""
+The store's Arrow schemas. pyarrow is imported on first use, so importing this module stays cheap.
+
+Returns:
+    tuple: (partition schema, stored data schema, full schema seen by readers)
+"""
+def schemas():
+    global _schemas
+    if _schemas is None:
+        import pyarrow
+
+        def to_type(alias):
+            return pyarrow.timestamp("ms", tz="UTC") if alias == "timestamp" else pyarrow.type_for_alias(alias)
+
+        partition = pyarrow.schema([(name, to_type(alias)) for name, alias in PARTITION_COLUMNS])
+        data = pyarrow.schema([(name, to_type(alias)) for name, alias in DATA_COLUMNS])
+        _schemas = partition, data, pyarrow.unify_schemas([data, partition])
+    return _schemas
+
+"""
+Partition value for a pair of models, e.g. ("llama3.2:latest", "gemma3:latest") -> "llama3.2-latest_vs_gemma3-latest".
+
+Args:
+    models (list): Agent A's and agent B's models.
+
+Returns:
+    str: A directory-safe name (the exact names are kept in the model_a/model_b columns).
+"""
+def model_key(models):
+    return "_vs_".join(re.sub(r"[^\w.-]", "-", model) for model in models)
+
+class ResultStore:
+    """
+    Append-only columnar store of game results. Every append writes one new Parquet file into its
+    game/model/prompt/date partition, so appends never rewrite existing data, and filtered reads only
+    open the partitions that match.
+
+    Attributes:
+        root (str): The store's directory.
+    """
+    def __init__(self, root=DEFAULT_STORE_PATH):
+        self.root = root
+
+    """
+    Append the results of one batch of games.
+
+    Args:
+        results (list): Result dicts from run_game.
+        game (str): "hanoi" or "nim".
+        prompt (str): The prompt type the games were played with.
+        models (list): Agent A's and agent B's models.
+        run_id (str): Identifier of the benchmark run, shared by its appends.
+
+    Returns:
+        str: Path of the written file, or None if there was nothing to write.
+    """
+    def append(self, results, game, prompt, models, run_id=None):
+        if not results:
+            return None
+        import pyarrow.parquet
+        _, data_schema, _ = schemas()
+        now = datetime.now(timezone.utc)
+        run_id = run_id or now.strftime("%Y%m%d_%H%M%S")
+        defaults = {"run_id": run_id, "created_at": now, "model_a": models[0], "model_b": models[1]}
+        table = pyarrow.Table.from_pylist([{**defaults, **result} for result in results], schema=data_schema)
+
+        directory = os.path.join(self.root, f"game={game}", f"model={model_key(models)}", f"prompt={prompt}",
+                                 f"date={now.strftime('%Y-%m-%d')}")
+        os.makedirs(directory, exist_ok=True)
+        filename = f"part-{run_id}-{uuid.uuid4().hex[:8]}.parquet"
+        path = os.path.join(directory, filename)
+        # written under a hidden temporary name (dataset discovery skips dot files), so readers never see a partial file
+        temporary = os.path.join(directory, f".{filename}.tmp")
+        pyarrow.parquet.write_table(table, temporary)
+        os.replace(temporary, path)
+        return path
+
+    """
+    Open the store as a dataset, for custom scans.
+
+    Returns:
+        pyarrow.dataset.Dataset: The partitioned dataset.
+    """
+    def dataset(self):
+        import pyarrow.dataset
+        partition_schema, _, result_schema = schemas()
+        return pyarrow.dataset.dataset(self.root, schema=result_schema, format="parquet",
+                                       partitioning=pyarrow.dataset.partitioning(partition_schema, flavor="hive"),
+                                       exclude_invalid_files=False)
+
+    """
+    List the store's part files with their partition values, for incremental readers.
+
+    Yields:
+        tuple: (path, {"game": ..., "model": ..., "prompt": ..., "date": ...})
+    """
+    def files(self):
+        for directory, _, filenames in os.walk(self.root):
+            relative = os.path.relpath(directory, self.root)
+            partition = dict(part.split("=", 1) for part in relative.split(os.sep) if "=" in part)
+            if set(partition) != {name for name, _ in PARTITION_COLUMNS}:
+                continue
+            for filename in sorted(filenames):
+                if filename.endswith(".parquet") and not filename.startswith("."):
+                    yield os.path.join(directory, filename), partition
+
+    """
+    Read the given columns of one part file.
+
+    Args:
+        path (str): A path yielded by files().
+        columns (list): Stored columns to read.
+
+    Returns:
+        dict: Column name -> list of values.
+    """
+    def read_file(self, path, columns):
+        import pyarrow.dataset
+        # read against the current schema, so files written before a column existed yield nulls for it
+        return pyarrow.dataset.dataset(path, schema=schemas()[1], format="parquet").to_table(columns=columns).to_pydict()
+
+    """
+    Read results, pruning partitions that do not match the filters.
+
+    Args:
+        game (str): Only this game.
+        prompt (str or list): Only these prompt types.
+        models (list): Only this model pair.
+        since (str): Only results from this date on ("YYYY-MM-DD").
+        columns (list): Columns to read, or None for all.
+
+    Returns:
+        pandas.DataFrame: The matching results (empty if the store is empty).
+    """
+    def read(self, game=None, prompt=None, models=None, since=None, columns=None):
+        result_schema = schemas()[2]
+        if not os.path.isdir(self.root):
+            return result_schema.empty_table().select(columns or result_schema.names).to_pandas()
+        import pyarrow.dataset
+        field = pyarrow.dataset.field
+        conditions = []
+        if game is not None:
+            conditions.append(field("game") == game)
+        if prompt is not None:
+            prompts = [prompt] if isinstance(prompt, str) else list(prompt)
+            conditions.append(field("prompt").isin(prompts))
+        if models is not None:
+            conditions.append(field("model") == model_key(models))
+        if since is not None:
+            conditions.append(field("date") >= since)
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return self.dataset().to_table(columns=columns, filter=expression).to_pandas()
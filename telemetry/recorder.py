@@ -0,0 +1,114 @@
+import math
+import time
+
+# Phases timed for every move; "llm" and "extract_move" are recorded by the agent inside propose_move
+PHASES = ["propose_move", "llm", "extract_move", "state_move", "memory_update"]
+QUANTILES = [50, 95, 99]
+
+"""
+Nearest-rank percentile of a list of numbers.
+
+Args:
+    values (list): The samples.
+    q (float): Percentile between 0 and 100.
+
+Returns:
+    float or None: The percentile, or None for no samples.
+"""
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+class MoveTelemetry:
+    """
+    Per-game move instrumentation. run_game only builds one when instrumentation is enabled, and every
+    hook is guarded by a None check, so a disabled game pays nothing beyond that check.
+
+    Attributes:
+        sinks (list): Where finished move records go (see telemetry.sinks).
+        labels (dict): Fields added to every record (game, prompt, seed, ...).
+        durations (dict): Phase -> list of seconds, over the game's moves.
+        record (dict): The move being recorded, or None between moves.
+    """
+    def __init__(self, sinks=(), **labels):
+        self.sinks = list(sinks)
+        self.labels = labels
+        self.durations = {phase: [] for phase in PHASES}
+        self.record = None
+        self._counters = None
+
+    """
+    Start the record of one move.
+
+    Args:
+        turn (int): The turn number.
+        agent (BaseAgent): The agent to move.
+    """
+    def begin_move(self, turn, agent):
+        self.record = {**self.labels, "turn": turn, "agent": agent.name, "model": agent.model, "phases": {}}
+        self._counters = (agent.llm_calls, agent.prompt_eval_tokens, agent.prompt_tokens, agent.completion_tokens,
+                          agent.cache_hits, self.retries(agent))
+
+    """
+    Add the wall time of one phase to the current move.
+
+    Args:
+        phase (str): One of PHASES.
+        seconds (float): The phase's duration.
+    """
+    def time(self, phase, seconds):
+        self.durations[phase].append(seconds)
+        if self.record is not None:
+            self.record["phases"][phase] = seconds
+
+    # Calls the agent repeated: attempts retried by its resilience policy and re-requests of answers that failed
+    # the JSON schema; self-consistency samples and speculative calls are not retries
+    @staticmethod
+    def retries(agent):
+        return agent.retries + agent.schema_retry_calls
+
+    """
+    Finish the current move: derive its token counts and retries from the agent's counters and emit it.
+
+    Args:
+        agent (BaseAgent): The agent that moved.
+        move (tuple): The move proposed, or None.
+        accepted (bool): Whether the state accepted it.
+    """
+    def end_move(self, agent, move, accepted):
+        calls, reported, estimated, completion, hits, retries = self._counters
+        reported = agent.prompt_eval_tokens - reported
+        record = self.record
+        record.update({
+            "move": list(move) if move is not None else None,
+            "accepted": accepted,
+            "llm_calls": agent.llm_calls - calls,
+            "retries": self.retries(agent) - retries,
+            "cache_hit": agent.cache_hits > hits,
+            # server-reported prompt tokens when available, the estimate otherwise
+            "prompt_tokens": reported if reported else agent.prompt_tokens - estimated,
+            "completion_tokens": agent.completion_tokens - completion,
+            "timestamp": time.time(),
+        })
+        for sink in self.sinks:
+            sink.emit(record)
+        self.record = None
+
+    """
+    p50/p95/p99 of every phase over the game, in milliseconds.
+
+    Returns:
+        dict: "<phase>_p<q>_ms" -> milliseconds (None for phases never timed).
+    """
+    def summary(self):
+        result = {}
+        for phase, values in self.durations.items():
+            for q in QUANTILES:
+                value = percentile(values, q)
+                result[f"{phase}_p{q}_ms"] = round(value * 1000, 3) if value is not None else None
+        return result
+
+# Result columns produced by MoveTelemetry.summary
+SUMMARY_FIELDS = [f"{phase}_p{q}_ms" for phase in PHASES for q in QUANTILES]
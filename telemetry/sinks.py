@@ -0,0 +1,119 @@
+from telemetry.recorder import percentile, QUANTILES
+import json
+import os
+import threading
+
+class MemorySink:
+    """
+    Keeps move records in a list, e.g. for notebooks or tests.
+
+    Attributes:
+        records (list): Every record emitted, in order.
+    """
+    def __init__(self):
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def close(self):
+        pass
+
+class JsonlSink:
+    """
+    Appends one JSON line per move to a file. The file is opened lazily in append mode, so the sink can be
+    handed to process-pool workers and every process appends its own lines.
+
+    Attributes:
+        path (str): The JSONL file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # Open files and locks stay behind when the sink is pickled for a worker process
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+class PrometheusSink:
+    """
+    Aggregates move records in process and renders them in the Prometheus text exposition format:
+    a summary of phase wall times (with p50/p95/p99) and counters for tokens, LLM calls and retries.
+    Aggregates live in the process that emitted them, so use it with the async runner (or JSONL for workers).
+
+    Attributes:
+        path (str): File written by close(), or None to only use render().
+        durations (dict): (phase, model) -> list of seconds.
+        counters (dict): (metric, model) -> total.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.durations = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        model = record.get("model", "")
+        with self._lock:
+            for phase, seconds in record["phases"].items():
+                self.durations.setdefault((phase, model), []).append(seconds)
+            for metric in ("prompt_tokens", "completion_tokens", "llm_calls", "retries"):
+                key = (metric, model)
+                self.counters[key] = self.counters.get(key, 0) + (record.get(metric) or 0)
+            key = ("moves", model)
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    """
+    Render the current aggregates.
+
+    Returns:
+        str: Prometheus text exposition.
+    """
+    def render(self):
+        lines = ["# HELP duel_move_phase_seconds Wall time of each move phase.",
+                 "# TYPE duel_move_phase_seconds summary"]
+        with self._lock:
+            for (phase, model), values in sorted(self.durations.items()):
+                labels = f'phase="{phase}",model="{model}"'
+                for q in QUANTILES:
+                    lines.append(f'duel_move_phase_seconds{{{labels},quantile="{q / 100}"}} {percentile(values, q):.6f}')
+                lines.append(f"duel_move_phase_seconds_sum{{{labels}}} {sum(values):.6f}")
+                lines.append(f"duel_move_phase_seconds_count{{{labels}}} {len(values)}")
+            for metric in ("prompt_tokens", "completion_tokens", "llm_calls", "retries", "moves"):
+                lines.append(f"# TYPE duel_{metric}_total counter")
+                for (name, model), total in sorted(self.counters.items()):
+                    if name == metric:
+                        lines.append(f'duel_{metric}_total{{model="{model}"}} {total}')
+        return "\n".join(lines) + "\n"
+
+    # A copy sent to a worker process aggregates privately and never writes the parent's file
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def close(self):
+        if self.path is not None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(self.render())
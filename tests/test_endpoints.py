@@ -0,0 +1,148 @@
+import asyncio
+import threading
+import time
+import pytest
+from llm.backends import LLMBackendError
+from llm.endpoints import (AFFINITY_QUEUE, EndpointPool, endpoint_specs, merge_counters, parse_endpoint,
+                           split_endpoints, summarize)
+from llm.pool import get_backend
+from llm.stub_server import StubOllamaServer
+
+# Least-outstanding-requests scheduling over several endpoints, their concurrency limits, and the
+# statistics the process runner adds up
+
+def test_parse_endpoint():
+    assert parse_endpoint("http://a:1/") == ("http://a:1", 1, None)
+    assert parse_endpoint("http://a:1=3") == ("http://a:1", 3, None)
+    assert parse_endpoint({"url": "http://b:2", "concurrency": 2, "models": ["m"]}) == ("http://b:2", 2, ("m",))
+    assert parse_endpoint(("http://c:3", 4, None)) == ("http://c:3", 4, None)
+    with pytest.raises(ValueError):
+        parse_endpoint("http://a:1=0")
+    assert endpoint_specs(None) is None and endpoint_specs("http://a:1") is None
+    assert endpoint_specs("http://a:1=2") == (("http://a:1", 2, None),)
+
+# Each new request goes to the endpoint with the fewest outstanding requests relative to its limit
+def test_least_outstanding_requests():
+    pool = EndpointPool([("a", 2, None), ("b", 1, None)])
+    a, b = pool.endpoints
+    assert [pool.acquire("m") for _ in range(3)] == [a, b, a]
+    assert pool.choose("m") is a  # every slot taken: queue where (outstanding + 1) / limit is lowest, 3/2 < 2/1
+    pool.release(b, "m", 0.1, "ok")
+    assert pool.choose("m") is b
+
+def test_model_affinity():
+    pool = EndpointPool([("a", 1, None), ("b", 1, None), ("c", 1, ["other"])])
+    a, b, c = pool.endpoints
+    pool.release(pool.acquire("m"), "m", 0.1, "ok")
+    assert a.resident == {"m"} and c.resident == {"other"}
+    # m is loaded on a: requests queue there rather than loading m on b, up to AFFINITY_QUEUE per slot
+    pool.acquire("m")
+    for _ in range(AFFINITY_QUEUE):
+        pool._enter("m")
+    assert len(a.queue) == AFFINITY_QUEUE and b.outstanding == 0
+    assert pool.choose("m") is b
+    # c serves only its own model
+    assert pool.choose("other") is c
+    assert all(pool.choose("m") is not c for _ in range(3))
+
+def test_unhealthy_endpoints_are_skipped():
+    pool = EndpointPool([("a", 1, None), ("b", 1, ["n"])])
+    a, b = pool.endpoints
+    for _ in range(a.health.threshold):
+        pool.release(pool.acquire("m"), None, 0.0, "error")
+    assert not a.health.healthy
+    with pytest.raises(LLMBackendError):
+        pool.choose("m")
+    assert pool.choose("n") is b
+
+# Many threads and tasks at once never hold more slots of an endpoint than its limit, and every request is served
+def test_limits_hold_under_load():
+    pool = EndpointPool([("a", 2, None), ("b", 3, None)])
+    in_use = {endpoint.url: 0 for endpoint in pool.endpoints}
+    peak = dict(in_use)
+    lock = threading.Lock()
+
+    def hold(endpoint):
+        with lock:
+            in_use[endpoint.url] += 1
+            peak[endpoint.url] = max(peak[endpoint.url], in_use[endpoint.url])
+        time.sleep(0.005)
+        with lock:
+            in_use[endpoint.url] -= 1
+        pool.release(endpoint, "m", 0.005, "ok")
+
+    threads = [threading.Thread(target=lambda: hold(pool.acquire("m"))) for _ in range(40)]
+    for thread in threads:
+        thread.start()
+
+    async def request():
+        hold(await pool.aacquire("m"))
+
+    async def requests():
+        await asyncio.gather(*(request() for _ in range(20)))
+
+    asyncio.run(requests())
+    for thread in threads:
+        thread.join()
+    assert peak["a"] <= 2 and peak["b"] <= 3
+    rows, _ = pool.counters()
+    assert sum(row["completed"] for row in rows) == 60
+    assert all(endpoint.active == 0 and not endpoint.queue for endpoint in pool.endpoints)
+
+# A queued async request that is cancelled gives up its place
+def test_cancelled_waiter_leaves_the_queue():
+    pool = EndpointPool([("a", 1, None)])
+    a = pool.endpoints[0]
+    pool.acquire("m")
+
+    async def cancel_waiting():
+        task = asyncio.ensure_future(pool.aacquire("m"))
+        await asyncio.sleep(0.01)
+        assert len(a.queue) == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_waiting())
+    assert not a.queue and a.active == 1
+
+def test_split_endpoints():
+    assert split_endpoints("http://a:1", 8) == ("http://a:1", 8)
+    specs, workers = split_endpoints(["http://a:1=4", "http://b:2=2"], 8)
+    assert workers == 2 and specs == [("http://a:1", 2, None), ("http://b:2", 1, None)]
+    specs, workers = split_endpoints(["http://a:1=6"], 4)
+    assert workers == 4 and specs == [("http://a:1", 1, None)]
+
+def test_merge_counters():
+    first = EndpointPool([("a", 1, None), ("b", 1, None)])
+    second = EndpointPool([("a", 1, None), ("b", 1, None)])
+    first.release(first.acquire("m"), "m", 0.2, "ok")
+    on_a, on_b = second.acquire("m"), second.acquire("m")
+    second.release(on_a, "n", 0.4, "ok")
+    second.release(on_b, None, 0.0, "error")
+    totals = {}
+    for pool in (first, second):
+        merge_counters(totals, pool.counters(reset=True)[0])
+    a, b = summarize(list(totals.values()), 2.0)
+    assert (a["completed"], a["errors"], a["throughput"]) == (2, 0, 1.0)
+    assert a["mean_busy_ms"] == pytest.approx(300) and a["resident"] == ["m", "n"]
+    assert (b["completed"], b["errors"], b["mean_busy_ms"]) == (0, 1, 0)
+    assert first.counters()[0][0]["completed"] == 0  # reset
+
+# Calls of a pooled backend spread over two stub servers
+def test_pooled_backend_spreads_calls():
+    servers = [StubOllamaServer(latency=0.05).start() for _ in range(2)]
+    try:
+        backend = get_backend("spread", "http", [f"{server.base_url}=1" for server in servers])
+
+        async def calls():
+            return await asyncio.gather(*(backend.ainvoke("Legal moves: [(0, 1)]") for _ in range(6)))
+
+        responses = asyncio.run(calls())
+        assert [response.content for response in responses] == ["(0, 1)"] * 6
+        assert [server.requests for server in servers] == [3, 3]
+        rows = backend.pool.stats(reset=True)
+        assert [row["completed"] for row in rows] == [3, 3] and rows[0]["max_queue"] >= 1
+    finally:
+        for server in servers:
+            server.stop()
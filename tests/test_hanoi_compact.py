@@ -0,0 +1,72 @@
+import random
+import pytest
+from puzzles.hanoi import HanoiState
+from puzzles.hanoi_compact import CompactHanoiState
+
+# Differential tests: CompactHanoiState must behave exactly like the list-based HanoiState it replaces
+
+def assert_same(compact, reference):
+    assert compact.pegs == reference.pegs
+    assert str(compact) == str(reference)
+    assert sorted(compact.get_legal_moves()) == sorted(reference.get_legal_moves())
+    assert compact.is_solved() == reference.is_solved()
+    assert [compact.top(peg) for peg in range(3)] == [reference.top(peg) for peg in range(3)]
+    assert compact.history == reference.history
+
+# Random walks, illegal and same-peg moves included, agree move by move
+@pytest.mark.parametrize("num_disks", range(1, 8))
+def test_random_walks_match_reference(num_disks):
+    rng = random.Random(num_disks)
+    compact, reference = CompactHanoiState(num_disks), HanoiState(num_disks)
+    assert_same(compact, reference)
+    for _ in range(500):
+        move = (rng.randrange(3), rng.randrange(3))
+        assert compact.move(*move) == reference.move(*move)
+        assert_same(compact, reference)
+
+# The optimal solution solves both states in 2^n - 1 moves
+@pytest.mark.parametrize("num_disks", [1, 3, 6])
+def test_optimal_solution_solves_both(num_disks):
+    def solve(n, source, target, spare):
+        if n:
+            yield from solve(n - 1, source, spare, target)
+            yield source, target
+            yield from solve(n - 1, spare, target, source)
+
+    compact, reference = CompactHanoiState(num_disks), HanoiState(num_disks)
+    moves = list(solve(num_disks, 0, 2, 1))
+    for move in moves:
+        assert compact.move(*move) and reference.move(*move)
+    assert len(moves) == 2 ** num_disks - 1
+    assert compact.is_solved() and reference.is_solved()
+    assert_same(compact, reference)
+
+# Every reachable position has its own code, which from_code decodes back to the same pegs
+def test_codes_are_unique_and_round_trip():
+    num_disks = 4
+    seen = {}
+    frontier = [CompactHanoiState(num_disks)]
+    while frontier:
+        state = frontier.pop()
+        if state.key() in seen:
+            assert seen[state.key()] == state.pegs
+            continue
+        seen[state.key()] = state.pegs
+        decoded = CompactHanoiState.from_code(num_disks, state.code)
+        assert decoded == state and decoded.pegs == state.pegs and decoded.masks == state.masks
+        for move in state.get_legal_moves():
+            successor = state.copy()
+            assert successor.move(*move)
+            frontier.append(successor)
+    assert len(seen) == 3 ** num_disks
+
+# apply and undo restore the exact position without touching the history
+def test_apply_undo_restores_state():
+    state = CompactHanoiState(5)
+    for move in [(0, 2), (0, 1), (2, 1)]:
+        state.move(*move)
+    before = (state.code, state.masks[:], state.history[:])
+    for move in state.get_legal_moves():
+        state.apply(*move)
+        state.undo(*move)
+        assert (state.code, state.masks, state.history) == before
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import pytest
+from llm.stub_server import StubOllamaServer
+from matrix import Cell, Journal, MATRIX_DEFAULTS, arun_matrix, expand_matrix
+
+pytest.importorskip("pyarrow")
+
+# Resuming a matrix from its journal: finished games are not replayed, journaled but unstored results are
+# stored, and games that failed are played again
+
+@pytest.fixture
+def stub():
+    server = StubOllamaServer(seed=11).start()
+    yield server
+    server.stop()
+
+def make_config(tmp_path, base_url, **overrides):
+    return {**MATRIX_DEFAULTS, "name": "test", "games": ["nim"], "prompts": ["baseline", "XOR_strat"],
+            "models": [["a", "b"]], "repetitions": 3, "concurrency": 2, "backend": "http", "base_url": base_url,
+            "store": str(tmp_path / "store"), "journal": str(tmp_path / "journal.jsonl"), **overrides}
+
+def events(config):
+    with open(config["journal"], encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_expand_matrix_keys():
+    cells = expand_matrix({**MATRIX_DEFAULTS, "games": ["nim", "hanoi"], "prompts": {"nim": ["baseline"], "hanoi": "all"},
+                           "models": [["a", "b"]], "seeds": [0, 1], "repetitions": 2})
+    assert len(cells) == (1 + 4) * 2 * 2
+    assert len({cell.key for cell in cells}) == len(cells)
+    assert cells[0].key == "nim|baseline|a|b|0|1"
+    assert Cell("nim", "baseline", ["a", "b"], 0, 1).seed == cells[0].seed
+
+def test_resume_skips_finished_games(tmp_path, stub):
+    config = make_config(tmp_path, stub.base_url)
+    assert asyncio.run(arun_matrix(config)) == {"cells": 6, "skipped": 0, "played": 6, "failed": 0}
+    requests = stub.requests
+    assert asyncio.run(arun_matrix(config)) == {"cells": 6, "skipped": 6, "played": 0, "failed": 0}
+    assert stub.requests == requests
+
+    # more repetitions only play the new games
+    config["repetitions"] = 4
+    assert asyncio.run(arun_matrix(config)) == {"cells": 8, "skipped": 6, "played": 2, "failed": 0}
+    from results.store import ResultStore
+    rows = ResultStore(config["store"]).read()
+    assert sorted(zip(rows["prompt"], rows["game_number"])) == sorted(
+        (prompt, n) for prompt in ["baseline", "XOR_strat"] for n in range(1, 5))
+
+# A crash between journaling a result and storing it: the next run stores it without playing again
+def test_unstored_results_are_stored_on_resume(tmp_path, stub):
+    config = make_config(tmp_path, stub.base_url, prompts=["baseline"], repetitions=2)
+    journal = Journal(config["journal"])
+    for cell in expand_matrix(config):
+        journal.record_result(cell, {"game_number": cell.repetition, "winner": "A", "winner_seat": "a", "turns": 3})
+    journal.close()
+    with open(config["journal"], "a", encoding="utf-8") as f:
+        f.write('{"type": "stored", "cel')  # torn last line
+    assert asyncio.run(arun_matrix(config))["played"] == 0
+    assert stub.requests == 0
+    from results.store import ResultStore
+    assert sorted(ResultStore(config["store"]).read()["turns"]) == [3, 3]
+    assert events(config)[-1]["type"] == "stored"
+
+# Games against a failing server are journaled as failed without stopping the others, and played on resume
+def test_failed_games_are_played_again(tmp_path, stub):
+    failing = StubOllamaServer(error_rate=1.0).start()
+    try:
+        config = make_config(tmp_path, failing.base_url)
+        assert asyncio.run(arun_matrix(config)) == {"cells": 6, "skipped": 0, "played": 0, "failed": 6}
+    finally:
+        failing.stop()
+    failures = [event for event in events(config) if event["type"] == "failed"]
+    assert len(failures) == 6 and all("LLMBackendError" in event["error"] for event in failures)
+    assert Journal(config["journal"]).results == {}
+
+    config["base_url"] = stub.base_url
+    assert asyncio.run(arun_matrix(config)) == {"cells": 6, "skipped": 0, "played": 6, "failed": 0}
+    assert len(Journal(config["journal"]).stored) == 6
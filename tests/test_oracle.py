@@ -0,0 +1,104 @@
+import random
+from collections import deque
+from functools import lru_cache
+import pytest
+from puzzles.hanoi import HanoiState
+from puzzles.hanoi_compact import CompactHanoiState
+from puzzles.nim import NimState
+from puzzles.oracle import (MAX_TABLE_DISKS, HanoiScorer, NimScorer, hanoi_distance, hanoi_distance_from_code,
+                            hanoi_distance_table, nim_sum, nim_winning_moves)
+
+# The perfect-play oracle against brute force: breadth-first search over every Hanoi position, and a
+# game-tree search over small Nim positions
+
+# Distance to the goal of every position code, by breadth-first search back from the goal
+def bfs_distances(num_disks):
+    goal = CompactHanoiState.from_code(num_disks, sum(2 * 3 ** d for d in range(num_disks)))
+    distances = {goal.code: 0}
+    queue = deque([goal])
+    while queue:
+        state = queue.popleft()
+        for move in state.get_legal_moves():
+            neighbour = state.copy()
+            neighbour.move(*move)
+            if neighbour.code not in distances:
+                distances[neighbour.code] = distances[state.code] + 1
+                queue.append(neighbour)
+    return distances
+
+@pytest.mark.parametrize("num_disks", range(1, 7))
+def test_hanoi_distances_match_search(num_disks):
+    distances = bfs_distances(num_disks)
+    table = hanoi_distance_table(num_disks)
+    assert len(distances) == len(table) == 3 ** num_disks
+    for code, distance in distances.items():
+        assert table[code] == distance
+        assert hanoi_distance_from_code(num_disks, code) == distance
+    assert table[0] == 2 ** num_disks - 1
+
+def test_large_hanoi_uses_closed_form():
+    with pytest.raises(ValueError):
+        hanoi_distance_table(MAX_TABLE_DISKS + 1)
+    assert hanoi_distance(CompactHanoiState(20)) == 2 ** 20 - 1
+    assert hanoi_distance(HanoiState(MAX_TABLE_DISKS + 2)) == 2 ** (MAX_TABLE_DISKS + 2) - 1
+
+# Both Hanoi representations score a random game the same, and every score follows the distance change
+@pytest.mark.parametrize("num_disks", [3, 5, 14])
+def test_hanoi_scorer(num_disks):
+    rng = random.Random(num_disks)
+    states = [HanoiState(num_disks), CompactHanoiState(num_disks)]
+    scorers = [HanoiScorer(state) for state in states]
+    for _ in range(200):
+        before = hanoi_distance(states[0])
+        move = rng.choice(list(states[0].get_legal_moves()))
+        scores = []
+        for state, scorer in zip(states, scorers):
+            assert state.move(*move)
+            scores.append(scorer.record(move, state))
+        delta = hanoi_distance(states[0]) - before
+        quality = "optimal" if delta < 0 else "neutral" if delta == 0 else "blunder"
+        assert scores == [(quality, delta)] * 2
+        assert [scorer.distance for scorer in scorers] == [before + delta] * 2
+
+# Whether the player to move wins a Nim position with perfect play (the player taking the last object wins)
+@lru_cache(maxsize=None)
+def wins(heaps):
+    return any(not wins(after) for after in successors(heaps))
+
+def successors(heaps):
+    return [tuple(sorted(heaps[:i] + (count - taken,) + heaps[i + 1:]))
+            for i, count in enumerate(heaps) for taken in range(1, count + 1)]
+
+def after_move(heaps, move):
+    heap_index, num_removed = move
+    return tuple(sorted(heaps[:heap_index] + (heaps[heap_index] - num_removed,) + heaps[heap_index + 1:]))
+
+def small_positions():
+    return [(a, b, c) for a in range(6) for b in range(6) for c in range(6)] + [(7, 3), (1, 12, 5, 9), (4,)]
+
+def test_nim_sum_decides_the_winner():
+    for heaps in small_positions():
+        assert (nim_sum(heaps) != 0) == wins(tuple(sorted(heaps)))
+
+def test_nim_winning_moves_are_all_the_winning_moves():
+    for heaps in small_positions():
+        expected = [(i, taken) for i, count in enumerate(heaps) for taken in range(1, count + 1)
+                    if not wins(after_move(heaps, (i, taken)))]
+        assert sorted(nim_winning_moves(list(heaps))) == expected
+
+def test_nim_scorer():
+    rng = random.Random(5)
+    for heaps in [[3, 4, 5], [1, 1], [6, 0, 9, 2]]:
+        state = NimState(heaps)
+        scorer = NimScorer(state)
+        while not state.is_game_over():
+            before = tuple(state.heaps)
+            move = rng.choice(list(state.get_legal_moves()))
+            assert state.move(*move)
+            if not wins(tuple(sorted(before))):
+                quality = "neutral"
+            else:
+                quality = "blunder" if wins(after_move(before, move)) else "optimal"
+            assert scorer.record(move, state) == (quality, -move[1])
+            assert scorer.nim_sum == nim_sum(state.heaps)
+            assert scorer.distance == sum(state.heaps)
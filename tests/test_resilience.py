@@ -0,0 +1,126 @@
+import asyncio
+import time
+import pytest
+from agents.nim_agent import NimAgent
+from llm.backends import LLMBackendError, make_backend
+from llm.resilience import (FAILURE_THRESHOLD, MIN_HEDGE_SAMPLES, CircuitOpenError, LLMTimeoutError,
+                            ResiliencePolicy, health_for)
+from llm.stub_server import StubOllamaServer
+from puzzles.nim import NimState
+
+# Retries, deadlines, hedging and the circuit breaker around agent calls to a stub server that fails or stalls
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(server):
+        started.append(server.start())
+        return server
+
+    yield start
+    for server in started:
+        server.stop()
+
+def make_agent(server, model, **policy):
+    return NimAgent("A", model=model, llm=make_backend(model, "http", server.base_url),
+                    resilience=ResiliencePolicy(backoff=0.0, **policy))
+
+def play_moves(agent, count):
+    return [agent.propose_move(NimState([3, 4, 5]), []) for _ in range(count)]
+
+def test_retries_until_an_attempt_succeeds(servers):
+    server = servers(StubOllamaServer(error_rate=0.5, seed=2))
+    agent = make_agent(server, "retry", retries=8)
+    health_for(agent.llm).threshold = 100  # keep the circuit closed through runs of failures
+    moves = play_moves(agent, 10)
+    assert None not in moves
+    assert agent.retries > 0 and agent.failed_calls == 0
+    assert server.requests == 10 + agent.retries
+
+def test_async_retries(servers):
+    server = servers(StubOllamaServer(error_rate=0.5, seed=3))
+    agent = make_agent(server, "async-retry", retries=8)
+    health_for(agent.llm).threshold = 100
+
+    async def play():
+        return [await agent.apropose_move(NimState([3, 4, 5]), []) for _ in range(10)]
+
+    assert None not in asyncio.run(play())
+    assert server.requests == 10 + agent.retries
+
+# A move whose every attempt fails is skipped; without a policy the error reaches the caller
+def test_failed_move_is_skipped(servers):
+    server = servers(StubOllamaServer(error_rate=1.0))
+    agent = make_agent(server, "give-up", retries=2)
+    assert play_moves(agent, 1) == [None]
+    assert (agent.retries, agent.failed_calls, server.requests) == (2, 1, 3)
+
+    plain = NimAgent("B", model="give-up", llm=make_backend("give-up", "http", server.base_url))
+    with pytest.raises(LLMBackendError):
+        plain.propose_move(NimState([3, 4, 5]), [])
+
+def test_slow_attempts_time_out(servers):
+    server = servers(StubOllamaServer(latency=0.3))
+    agent = make_agent(server, "timeout", call_timeout=0.05, retries=1)
+    start = time.perf_counter()
+    assert play_moves(agent, 1) == [None]
+    assert time.perf_counter() - start < 0.25
+    assert (agent.timeouts, agent.retries, agent.failed_calls) == (2, 1, 1)
+    with pytest.raises(LLMTimeoutError):
+        agent.resilience.call(agent, lambda: time.sleep(1))
+
+# Errors that are not backend failures propagate at once, without retries or a mark on the endpoint's health
+def test_other_errors_are_not_retried(servers):
+    server = servers(StubOllamaServer())
+    agent = make_agent(server, "bug", retries=3)
+    calls = []
+
+    def send():
+        calls.append(1)
+        raise KeyError("bug")
+
+    with pytest.raises(KeyError):
+        agent.resilience.call(agent, send)
+    assert len(calls) == 1 and agent.retries == 0
+    assert health_for(agent.llm).failures == 0
+
+def test_circuit_opens_and_recovers(servers):
+    server = servers(StubOllamaServer(error_rate=1.0))
+    agent = make_agent(server, "circuit")
+    health = health_for(agent.llm)
+    health.cooldown = 0.1
+    play_moves(agent, FAILURE_THRESHOLD)
+    assert not health.healthy and health.trips == 1
+    assert play_moves(agent, 2) == [None, None]
+    assert agent.circuit_rejections == 2 and server.requests == FAILURE_THRESHOLD
+    with pytest.raises(CircuitOpenError):
+        agent.resilience.call(agent, lambda: None)
+
+    # after the cooldown one trial call goes out; it fails, so the circuit opens again
+    time.sleep(0.15)
+    play_moves(agent, 2)
+    assert server.requests == FAILURE_THRESHOLD + 1 and health.trips == 1 and not health.healthy
+
+    # the next trial call succeeds and closes the circuit
+    server.error_rate = 0.0
+    time.sleep(0.15)
+    assert None not in play_moves(agent, 3)
+    assert health.healthy and server.requests == FAILURE_THRESHOLD + 4
+
+# Stalls every other request, so a hedged duplicate of a stalled request answers first
+class StallingStub(StubOllamaServer):
+    def next_answer(self, prompt, format=None):
+        answer, _ = super().next_answer(prompt, format)
+        return answer, 1.0 if self.requests % 2 else 0.0
+
+def test_hedged_duplicate_wins(servers):
+    server = servers(StallingStub())
+    agent = make_agent(server, "hedge", hedge=True)
+    health = health_for(agent.llm)
+    for _ in range(MIN_HEDGE_SAMPLES):
+        health.record_success(0.02)
+    start = time.perf_counter()
+    assert play_moves(agent, 1)[0] is not None
+    assert time.perf_counter() - start < 0.5
+    assert (agent.hedged_calls, agent.hedge_wins, server.requests) == (1, 1, 2)
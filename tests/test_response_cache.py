@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from benchmark import run_games_async
+from llm.response_cache import ResponseCache, CacheMissError
+from llm.stub_server import StubOllamaServer
+from main import run_game
+
+# LRU eviction of the response cache, and offline reruns from it in "replay-only" mode
+
+# Nothing listens here: a replay-only run that reached the server would fail with a connection error
+OFFLINE_URL = "http://127.0.0.1:9"
+
+@pytest.fixture
+def stub():
+    server = StubOllamaServer(seed=3).start()
+    yield server
+    server.stop()
+
+def test_least_recently_used_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=3)
+    for i in range(3):
+        cache.put(f"k{i}", f"answer {i}")
+    assert cache.get("k0") == "answer 0"  # k1 is now the least recently used
+    cache.put("k3", "answer 3")
+    assert len(cache) == 3
+    assert cache.get("k1") is None
+    assert [cache.get(key) for key in ["k0", "k2", "k3"]] == ["answer 0", "answer 2", "answer 3"]
+    cache.put("k3", "new answer")  # replacing an entry evicts nothing
+    assert len(cache) == 3 and cache.get("k3") == "new answer"
+    cache.close()
+
+# The bound holds after every store, also with several connections writing to one file
+def test_bound_is_never_exceeded(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    caches = [ResponseCache(path, max_entries=5) for _ in range(2)]
+    for i in range(40):
+        caches[i % 2].put(f"k{i}", str(i))
+        assert len(caches[0]) == min(i + 1, 5)
+    assert [caches[1].get(f"k{i}") for i in range(35, 40)] == [str(i) for i in range(35, 40)]
+    for cache in caches:
+        cache.close()
+
+def test_replay_only_miss_raises(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), mode="replay-only")
+    with pytest.raises(CacheMissError):
+        run_game("nim", output=False, seed=1, cache=cache, backend="http", base_url=OFFLINE_URL)
+    assert cache.misses == 1
+    cache.close()
+
+def test_unknown_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ResponseCache(str(tmp_path / "cache.sqlite"), mode="write-only")
+
+# A recorded game replays offline to the same outcome; games that need an uncached answer are skipped
+def test_replay_only_rerun(tmp_path, stub):
+    path = str(tmp_path / "cache.sqlite")
+    recorded = asyncio.run(run_games_async("nim", "baseline", 1, cache=ResponseCache(path), backend="http",
+                                           base_url=stub.base_url))
+    requests = stub.requests
+    replayed = asyncio.run(run_games_async("nim", "baseline", 1, cache=ResponseCache(path, mode="replay-only"),
+                                           backend="http", base_url=OFFLINE_URL))
+    assert [(r["winner"], r["turns"]) for r in replayed] == [(r["winner"], r["turns"]) for r in recorded]
+    assert replayed[0]["cache_hits"] == requests and replayed[0]["cache_misses"] == 0
+
+    # no answer was recorded for this prompt type
+    skipped = asyncio.run(run_games_async("nim", "math_genius", 2, cache=ResponseCache(path, mode="replay-only"),
+                                          backend="http", base_url=OFFLINE_URL))
+    assert skipped == []
+    assert stub.requests == requests
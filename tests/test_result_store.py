@@ -0,0 +1,67 @@
+import os
+import pytest
+from results.store import ResultStore, model_key
+
+pytest.importorskip("pyarrow")
+
+# Appends to the partitioned result store read back with their values, and filtered reads keep only the
+# matching partitions
+
+def result(game_number, winner_seat="a", turns=5, **values):
+    return {"game_number": game_number, "seed": 100 + game_number, "winner": f"Agent {winner_seat.upper()}",
+            "winner_seat": winner_seat, "turns": turns, "solved": None, "duration_s": 0.5, **values}
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(str(tmp_path / "store"))
+    store.append([result(1), result(2, "b", 6)], "nim", "baseline", ["llama3.2:latest", "gemma3:latest"], "run1")
+    store.append([result(1, turns=9)], "nim", "XOR_strat", ["llama3.2:latest", "gemma3:latest"], "run1")
+    store.append([result(1, "b", solved=True, final_distance=0)], "hanoi", "baseline", ["qwen3:8b", "gemma3:latest"],
+                 "run2")
+    return store
+
+def test_round_trip(store):
+    rows = store.read(game="nim", prompt="baseline").sort_values("game_number")
+    assert list(rows["game_number"]) == [1, 2]
+    assert list(rows["winner_seat"]) == ["a", "b"]
+    assert list(rows["turns"]) == [5, 6]
+    assert list(rows["seed"]) == [101, 102]
+    assert set(rows["model_a"]) == {"llama3.2:latest"} and set(rows["model_b"]) == {"gemma3:latest"}
+    assert set(rows["model"]) == {model_key(["llama3.2:latest", "gemma3:latest"])}
+    assert set(rows["run_id"]) == {"run1"}
+    # columns a result leaves out are null
+    assert rows["timeouts"].isna().all()
+
+def test_filters(store):
+    assert len(store.read()) == 4
+    assert len(store.read(game="nim")) == 3
+    assert len(store.read(prompt=["baseline", "XOR_strat"])) == 4
+    assert len(store.read(game="nim", prompt="XOR_strat")) == 1
+    hanoi = store.read(models=["qwen3:8b", "gemma3:latest"])
+    assert list(hanoi["game"]) == ["hanoi"] and bool(hanoi["solved"][0]) and hanoi["final_distance"][0] == 0
+    assert len(store.read(models=["gemma3:latest", "qwen3:8b"])) == 0  # seats matter
+    assert len(store.read(since="2000-01-01")) == 4
+    assert len(store.read(since="9999-01-01")) == 0
+    assert list(store.read(game="hanoi", columns=["winner", "turns"]).columns) == ["winner", "turns"]
+
+def test_files_and_incremental_reads(store):
+    files = list(store.files())
+    assert len(files) == 3
+    assert sorted((partition["game"], partition["prompt"]) for _, partition in files) == [
+        ("hanoi", "baseline"), ("nim", "XOR_strat"), ("nim", "baseline")]
+    path = next(path for path, partition in files if partition["prompt"] == "XOR_strat")
+    assert store.read_file(path, ["game_number", "turns", "winner_model"]) == {
+        "game_number": [1], "turns": [9], "winner_model": [None]}
+
+# Unfinished writes (hidden temporary files) are not read, and an empty batch writes nothing
+def test_partial_writes_are_invisible(store):
+    path, _ = next(store.files())
+    with open(os.path.join(os.path.dirname(path), ".part-x.parquet.tmp"), "wb") as f:
+        f.write(b"not parquet yet")
+    assert len(store.read()) == 4
+    assert store.append([], "nim", "baseline", ["a", "b"]) is None
+    assert len(list(store.files())) == 3
+
+def test_empty_store(tmp_path):
+    rows = ResultStore(str(tmp_path / "missing")).read(columns=["winner", "turns"])
+    assert len(rows) == 0 and list(rows.columns) == ["winner", "turns"]
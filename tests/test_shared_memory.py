@@ -0,0 +1,76 @@
+import random
+import pytest
+from memory.shared_memory import SharedMemory, state_hash, DEFAULT_CAPACITY
+from puzzles.hanoi import HanoiState
+from puzzles.hanoi_compact import CompactHanoiState
+from puzzles.nim import NimState
+
+# The incremental Zobrist hash must always equal the hash of the position computed from scratch, and the visit
+# counts must match counting the positions themselves
+
+def position(state):
+    return tuple(state.heaps) if hasattr(state, "heaps") else tuple(map(tuple, state.pegs))
+
+# Plays random legal moves, checking the memory after each one against a plain count of positions
+def check_random_game(state, rng, moves):
+    memory = SharedMemory()
+    counts = {position(state): 1}
+    repeats = 0
+    for _ in range(moves):
+        legal_moves = list(state.get_legal_moves())
+        if not legal_moves:
+            break
+        move = rng.choice(legal_moves)
+        assert state.move(*move)
+        memory.update(move, state)
+        counts[position(state)] = counts.get(position(state), 0) + 1
+        repeats += counts[position(state)] > 1
+        assert memory.hash == state_hash(state)
+        assert memory.current_visits() == counts[position(state)]
+        assert memory.has_seen(state)
+    assert memory.repeats == repeats
+    assert len(memory.visits) == len(counts)
+
+@pytest.mark.parametrize("make_state", [lambda: HanoiState(4), lambda: CompactHanoiState(4), lambda: CompactHanoiState(9)])
+def test_hanoi_incremental_hash(make_state):
+    for seed in range(5):
+        check_random_game(make_state(), random.Random(seed), 300)
+
+@pytest.mark.parametrize("heaps", [[3, 4, 5], [1, 1], [7, 0, 12, 2]])
+def test_nim_incremental_hash(heaps):
+    for seed in range(5):
+        check_random_game(NimState(heaps), random.Random(seed), 100)
+
+# The same position hashes the same in either Hanoi representation; different positions hash differently
+def test_hash_depends_on_position_only():
+    reference, compact = HanoiState(6), CompactHanoiState(6)
+    seen = {}
+    rng = random.Random(1)
+    for _ in range(400):
+        assert state_hash(reference) == state_hash(compact)
+        key = position(reference)
+        assert seen.setdefault(state_hash(reference), key) == key
+        move = rng.choice(reference.get_legal_moves())
+        reference.move(*move)
+        compact.move(*move)
+
+# Moving a disk back and forth revisits the start; the cycle limit counts the visits
+def test_cycle_detection():
+    state, memory = HanoiState(3), SharedMemory()
+    for move in [(0, 1), (1, 0), (0, 1), (1, 0)]:
+        state.move(*move)
+        memory.update(move, state)
+    assert memory.current_visits() == 3
+    assert memory.is_cycling(3) and not memory.is_cycling(4)
+    assert memory.repeats == 3
+
+# Only the last `capacity` moves are kept, oldest first
+def test_move_window_is_bounded():
+    state, memory = HanoiState(3), SharedMemory()
+    moves = [(0, 1), (1, 0)] * DEFAULT_CAPACITY
+    for move in moves:
+        state.move(*move)
+        memory.update(move, state)
+    assert len(memory.moves) == DEFAULT_CAPACITY
+    assert memory.get_recent(3) == moves[-3:]
+    assert memory.get_recent(100) == moves[-DEFAULT_CAPACITY:]
@@ -0,0 +1,84 @@
+import random
+import pytest
+from results.stopping import StoppingRule, is_success, sprt, wilson_interval
+
+# The Wilson interval and SPRT on sequences with known answers, and the adaptive stopping rule fed out of order
+
+@pytest.mark.parametrize("successes, n, expected", [
+    (5, 10, (0.2366, 0.7634)),
+    (0, 10, (0.0, 0.2775)),
+    (10, 10, (0.7225, 1.0)),
+    (81, 263, (0.2553, 0.3662)),
+])
+def test_wilson_interval(successes, n, expected):
+    assert wilson_interval(successes, n) == pytest.approx(expected, abs=1e-4)
+
+def test_wilson_interval_before_any_game():
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+
+# With p0 = 0.3, p1 = 0.7 each success adds log(7/3) to the log-likelihood ratio and each failure takes it
+# away, and the bounds are log(19) and -log(19): four more successes than failures accept H1
+@pytest.mark.parametrize("successes, n, expected", [
+    (3, 3, None), (4, 4, "H1"), (5, 6, "H1"), (6, 9, None), (0, 4, "H0"), (2, 8, "H0"), (5, 10, None),
+])
+def test_sprt(successes, n, expected):
+    assert sprt(successes, n, 0.3, 0.7) == expected
+
+def nim_result(game_number, winner_seat):
+    return {"game_number": game_number, "winner_seat": winner_seat, "turns": 5}
+
+def test_is_success():
+    assert is_success("nim", nim_result(1, "a"))
+    assert not is_success("nim", nim_result(1, "b"))
+    assert not is_success("nim", nim_result(1, None))
+    assert is_success("hanoi", {"solved": True}) and not is_success("hanoi", {"solved": False})
+
+def test_stops_on_sprt():
+    rule = StoppingRule("nim", min_games=2, half_width=0.01)
+    for n in range(1, 4):
+        rule.offer(nim_result(n, "a"))
+        assert not rule.decided
+    rule.offer(nim_result(4, "a"))
+    assert rule.reason == "SPRT favours rate 0.7 over 0.3"
+    assert (rule.games, rule.successes) == (4, 4)
+
+def test_stops_on_interval_and_cap():
+    rule = StoppingRule("hanoi", min_games=5, max_games=1000, half_width=0.2, p0=0.45, p1=0.55)
+    for n in range(1, 100):
+        rule.offer({"game_number": n, "solved": n % 2 == 0})
+        if rule.decided:
+            break
+    # the interval of a 50% rate first gets within ±0.2 after 21 games
+    assert rule.games == 21 and rule.reason == "interval within ±0.2"
+    capped = StoppingRule("hanoi", min_games=1, max_games=3, half_width=0.0, p0=0.45, p1=0.55)
+    for n in range(1, 4):
+        capped.offer({"game_number": n, "solved": True})
+    assert capped.reason == "max games"
+
+# Games finishing out of order reach the same decision as in order; games past the deciding one are dropped
+def test_offers_are_counted_in_game_order():
+    outcomes = ["a", "b", "a", "a", "a", "b", "a", "a", "a", "a", "a", "a"]
+    in_order = StoppingRule("nim", min_games=2, half_width=0.01)
+    for n, seat in enumerate(outcomes, 1):
+        in_order.offer(nim_result(n, seat))
+    shuffled = StoppingRule("nim", min_games=2, half_width=0.01)
+    results = [nim_result(n, seat) for n, seat in enumerate(outcomes, 1)]
+    random.Random(4).shuffle(results)
+    for result in results:
+        shuffled.offer(result)
+    assert (shuffled.games, shuffled.successes, shuffled.reason) == (in_order.games, in_order.successes, in_order.reason)
+    assert shuffled.played == len(outcomes)
+    kept = [result["game_number"] for result in results if shuffled.keeps(result)]
+    assert sorted(kept) == list(range(1, in_order.games + 1))
+
+# A game without a result does not hold back the games after it
+def test_skipped_games():
+    rule = StoppingRule("nim", min_games=2, half_width=0.01)
+    rule.offer(nim_result(3, "a"))
+    rule.offer(nim_result(1, "a"))
+    assert rule.games == 1
+    rule.skip(2)
+    assert (rule.games, rule.missing, rule.played) == (2, 1, 2)
+    for n in range(4, 6):
+        rule.offer(nim_result(n, "a"))
+    assert rule.decided and rule.games == 4 and rule.keeps(nim_result(5, "a"))
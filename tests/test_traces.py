@@ -0,0 +1,114 @@
+import os
+import pytest
+from puzzles.hanoi_compact import CompactHanoiState
+from puzzles.nim import NimState
+from traces.recorder import GameTrace, TraceReader, TraceWriter, read_varint, write_varint
+from traces.replay import replay, is_done, verify
+
+# Round trips of the binary trace format, its index, and replays of traced games
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 255, 300, 16383, 16384, 2 ** 32 - 1, 2 ** 63 + 5])
+def test_varint_round_trip(value):
+    buffer = bytearray(b"\xff")
+    write_varint(buffer, value)
+    assert read_varint(buffer, 1) == (value, len(buffer))
+    assert len(buffer) - 1 == max(1, -(-value.bit_length() // 7))
+
+# A Nim game played to the end: agent A and B alternate, with one rejected move and one unparsable answer
+def nim_trace(game_id="run|nim|baseline|a:1|b:2|7"):
+    state = NimState([3, 4, 5])
+    trace = GameTrace.start(game_id, "nim", state, prompt="baseline", models=["a:1", "b:2"], seed=7)
+    trace.add_turn(0, "(9, 9)", (9, 9), False, 0.0125)
+    trace.add_turn(1, "no idea ✗", None, False, 0.5)
+    turn = 0
+    for move in [(0, 3), (1, 4), (2, 5)]:
+        assert state.move(*move)
+        trace.add_turn(turn % 2, f"{move}", move, True, 0.001)
+        turn += 1
+    trace.metadata.update(winner="A:1 Agent", turns=len(trace.turns), solved=True)
+    return trace
+
+def hanoi_trace(game_id):
+    state = CompactHanoiState(2)
+    trace = GameTrace.start(game_id, "hanoi", state, prompt="baseline", models=["a", "b"], seed=1)
+    for agent, move in enumerate([(0, 1), (0, 2), (1, 2)]):
+        assert state.move(*move)
+        trace.add_turn(agent % 2, str(move), move, True, 0.002)
+    trace.metadata.update(turns=3, solved=True)
+    return trace
+
+def test_record_round_trip():
+    trace = nim_trace()
+    data = b"xx" + trace.encode()
+    decoded, end = GameTrace.decode(data, 2)
+    assert end == len(data)
+    assert (decoded.game_id, decoded.game, decoded.initial, decoded.metadata) == \
+           (trace.game_id, trace.game, trace.initial, trace.metadata)
+    for original, turn in zip(trace.turns, decoded.turns):
+        assert (turn.agent, turn.response, turn.move, turn.accepted, turn.time_to_move_us) == \
+               (original.agent, original.response, original.move, original.accepted, original.time_to_move_us)
+    # skipping the responses decodes everything else
+    quick, quick_end = GameTrace.decode(data, 2, responses=False)
+    assert quick_end == end and [turn.move for turn in quick.turns] == [turn.move for turn in decoded.turns]
+    assert all(turn.response is None for turn in quick.turns)
+
+def test_hanoi_initial_state_round_trip():
+    decoded, _ = GameTrace.decode(hanoi_trace("h").encode(), 0)
+    assert decoded.initial == {"num_disks": 2, "compact": True}
+
+# Moves that are not pairs of non-negative ints stay in the response only
+def test_unencodable_move_is_dropped():
+    trace = GameTrace("g", "nim", {"heaps": [1]})
+    trace.add_turn(0, "(-1, 2)", (-1, 2), False, 0.0)
+    decoded, _ = GameTrace.decode(trace.encode(), 0)
+    assert decoded.turns[0].move is None and decoded.turns[0].response == "(-1, 2)"
+
+def test_writer_and_reader(tmp_path):
+    writer = TraceWriter(str(tmp_path), "run")
+    traces = [nim_trace("run|nim|baseline|a:1|b:2|7"), hanoi_trace("run|hanoi|baseline|a|b|1")]
+    for trace in traces:
+        writer.write(trace)
+    writer.close()
+    reader = TraceReader(str(tmp_path))
+    assert len(reader) == 2 and reader.duplicates == 0
+    assert [trace.game_id for trace in reader.games()] == [trace.game_id for trace in traces]
+    assert reader.get(traces[1].game_id).turns[2].move == (1, 2)
+    reader.close()
+
+# Without its index, or with records written after it, a trace file is scanned; a torn last record is ignored
+def test_reader_rebuilds_index(tmp_path):
+    writer = TraceWriter(str(tmp_path), "run")
+    writer.write(nim_trace("one"))
+    writer.close()
+    stem = os.path.join(str(tmp_path), f"run-{os.getpid()}")
+    with open(stem + ".trace", "ab") as f:
+        f.write(nim_trace("two").encode())
+        f.write(nim_trace("torn").encode()[:-5])
+    assert sorted(TraceReader(str(tmp_path)).index) == ["one", "two"]
+    os.remove(stem + ".idx")
+    assert sorted(TraceReader(str(tmp_path)).index) == ["one", "two"]
+
+# A game id written twice is kept under a suffix instead of hiding the first record
+def test_duplicate_ids_are_kept(tmp_path):
+    for run in range(2):
+        writer = TraceWriter(str(tmp_path), f"run{run}")
+        writer.write(nim_trace("same"))
+        writer.close()
+    reader = TraceReader(str(tmp_path))
+    assert sorted(reader.index) == ["same", "same#2"] and reader.duplicates == 1
+    assert len(list(reader.games())) == 2
+
+def test_game_ids_distinguish_models_and_runs():
+    ids = {TraceWriter("d", run).game_id("nim", "baseline", models, 5)
+           for run in ("r1", "r2") for models in (("qwen3:4b", "qwen3:8b"), ("qwen3:8b", "qwen3:4b"))}
+    assert len(ids) == 4
+
+def test_replay_matches_recorded_result(tmp_path):
+    state, memory = replay(nim_trace())
+    assert state.heaps == [0, 0, 0] and is_done(nim_trace(), state)
+    assert list(memory.moves) == [(0, 3), (1, 4), (2, 5)]
+    writer = TraceWriter(str(tmp_path), "run")
+    writer.write(nim_trace("a"))
+    writer.write(hanoi_trace("b"))
+    writer.close()
+    assert verify(TraceReader(str(tmp_path))) == {"games": 2, "turns": 8, "mismatches": []}
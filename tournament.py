@@ -0,0 +1,101 @@
+from itertools import combinations, permutations
+
+# Assumed resident size of a model the config gives no size for
+DEFAULT_MODEL_SIZE_GB = 4.0
+
+class Residency:
+    """
+    Models held in the server's memory under a budget, evicting the least recently used model first.
+    Used both to plan a schedule (counting loads) and, while a tournament runs, to decide which models
+    to unload and load before each match.
+
+    Attributes:
+        sizes (dict): Model -> resident size in GB.
+        budget (float): GB the resident models may use together.
+        resident (list): Resident models, least recently used first.
+        loads (int): Model loads so far.
+    """
+    def __init__(self, sizes, budget):
+        self.sizes = sizes
+        self.budget = budget
+        self.resident = []
+        self.loads = 0
+
+    def size(self, model):
+        return self.sizes.get(model, DEFAULT_MODEL_SIZE_GB)
+
+    # GB that would have to be loaded to play these models
+    def missing_size(self, models):
+        return sum(self.size(model) for model in set(models) if model not in self.resident)
+
+    """
+    Make models resident, evicting least recently used models that are not needed.
+
+    Args:
+        models (tuple): The models of the next match.
+
+    Returns:
+        tuple: (models to load, models to evict), in order.
+
+    Raises:
+        ValueError: If the models do not fit the budget together.
+    """
+    def admit(self, models):
+        models = list(dict.fromkeys(models))
+        if sum(self.size(model) for model in models) > self.budget:
+            raise ValueError(f"{' + '.join(models)} do not fit the {self.budget} GB memory budget")
+        for model in models:
+            if model in self.resident:
+                self.resident.remove(model)
+                self.resident.append(model)
+        loads, evictions = [], []
+        for model in models:
+            if model in self.resident:
+                continue
+            while sum(map(self.size, self.resident)) + self.size(model) > self.budget:
+                victim = next(m for m in self.resident if m not in models)
+                self.resident.remove(victim)
+                evictions.append(victim)
+            self.resident.append(model)
+            loads.append(model)
+        self.loads += len(loads)
+        return loads, evictions
+
+# Default budget: room for the largest pair, so one match's models are resident at a time
+def default_budget(models, sizes):
+    largest = sorted((sizes.get(model, DEFAULT_MODEL_SIZE_GB) for model in models), reverse=True)
+    return sum(largest[:2])
+
+# Naive round-robin: every ordered pair, in model order
+def round_robin_pairs(models):
+    return list(permutations(models, 2))
+
+"""
+Order every model pair to keep model loads down: greedily play next the pair whose missing models
+are smallest, and play both seatings of a pair back to back.
+
+Args:
+    models (list): Model names.
+    sizes (dict): Model -> resident size in GB.
+    budget (float): GB the resident models may use together.
+
+Returns:
+    list: Ordered (model_a, model_b) pairs, each pair in both seatings.
+"""
+def schedule_pairs(models, sizes, budget):
+    residency = Residency(sizes, budget)
+    left = list(combinations(dict.fromkeys(models), 2))
+    order = []
+    while left:
+        pair = min(left, key=residency.missing_size)  # ties keep the round-robin order
+        left.remove(pair)
+        residency.admit(pair)
+        order += [pair, pair[::-1]]
+    return order
+
+# Model loads a sequence of matches costs under the budget
+def count_loads(pairs, sizes, budget):
+    residency = Residency(sizes, budget)
+    for pair in pairs:
+        residency.admit(pair)
+    return residency.loads
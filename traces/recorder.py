@@ -0,0 +1,348 @@
+import json
+import mmap
+import os
+import uuid
+
+# Binary move traces: one record per game, appended to <directory>/<run>-<pid>.trace, with a sidecar
+# <run>-<pid>.idx of (game id, offset) entries for random access. Every integer is an unsigned LEB128
+# varint and every string is a varint length followed by UTF-8 bytes.
+#
+# record:  length, game id, game (0 nim, 1 hanoi), initial state, metadata JSON, turn count, turns
+# state:   nim: heap count, heaps; hanoi: disk count, compact flag
+# turn:    flags (bit 0 agent B, bit 1 accepted, bit 2 move present), [move a, move b], time to move in µs, raw response
+MAGIC = b"DUELTRC1"
+GAMES = ["nim", "hanoi"]
+AGENT_B, ACCEPTED, HAS_MOVE = 1, 2, 4
+
+def write_varint(buffer, value):
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+"""
+Read an unsigned varint.
+
+Args:
+    data (bytes-like): The encoded bytes.
+    position (int): Offset of the varint.
+
+Returns:
+    tuple: (value, offset after the varint)
+"""
+def read_varint(data, position):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+def write_text(buffer, text):
+    encoded = (text or "").encode()
+    write_varint(buffer, len(encoded))
+    buffer += encoded
+
+def read_text(data, position):
+    length, position = read_varint(data, position)
+    return bytes(data[position:position + length]).decode(), position + length
+
+class TurnTrace:
+    """
+    One turn of a traced game.
+
+    Attributes:
+        agent (int): 0 for agent A, 1 for agent B.
+        response (str): The raw LLM answer ("" when no call was made).
+        move (tuple): The parsed move, or None.
+        accepted (bool): Whether the move was legal and applied.
+        time_to_move_us (int): Microseconds propose_move took.
+    """
+    __slots__ = ("agent", "response", "move", "accepted", "time_to_move_us")
+
+    def __init__(self, agent, response, move, accepted, time_to_move_us):
+        self.agent = agent
+        self.response = response
+        self.move = move
+        self.accepted = accepted
+        self.time_to_move_us = time_to_move_us
+
+class GameTrace:
+    """
+    Everything needed to replay a game without an LLM.
+
+    Attributes:
+        game_id (str): Key of the game in the trace index.
+        game (str): "hanoi" or "nim".
+        initial (dict): Starting position: {"heaps": [...]} or {"num_disks": n, "compact": bool}.
+        metadata (dict): Prompt, models, seed and the game's result fields.
+        turns (list): TurnTrace per turn.
+    """
+    def __init__(self, game_id, game, initial, metadata=None, turns=None):
+        self.game_id = game_id
+        self.game = game
+        self.initial = initial
+        self.metadata = metadata or {}
+        self.turns = turns or []
+
+    """
+    Start a trace from a game's initial state.
+
+    Args:
+        game_id (str): Key of the game.
+        game (str): "hanoi" or "nim".
+        state: The initial NimState, HanoiState or CompactHanoiState.
+        **metadata: Prompt, models, seed, ...
+
+    Returns:
+        GameTrace: The empty trace.
+    """
+    @classmethod
+    def start(cls, game_id, game, state, **metadata):
+        if game == "nim":
+            initial = {"heaps": list(state.heaps)}
+        else:
+            initial = {"num_disks": state.num_disks, "compact": hasattr(state, "code")}
+        return cls(game_id, game, initial, metadata)
+
+    def add_turn(self, agent, response, move, accepted, seconds):
+        self.turns.append(TurnTrace(agent, response, move, accepted, round(seconds * 1e6)))
+
+    def encode(self):
+        body = bytearray()
+        write_text(body, self.game_id)
+        body.append(GAMES.index(self.game))
+        if self.game == "nim":
+            write_varint(body, len(self.initial["heaps"]))
+            for heap in self.initial["heaps"]:
+                write_varint(body, heap)
+        else:
+            write_varint(body, self.initial["num_disks"])
+            body.append(1 if self.initial["compact"] else 0)
+        write_text(body, json.dumps(self.metadata, separators=(",", ":")))
+        write_varint(body, len(self.turns))
+        for turn in self.turns:
+            # a move the parser produced is a pair of small non-negative ints; anything else is kept in the response only
+            move = turn.move if turn.move is not None and all(isinstance(v, int) and v >= 0 for v in turn.move) else None
+            body.append(turn.agent * AGENT_B | (ACCEPTED if turn.accepted else 0) | (HAS_MOVE if move else 0))
+            if move:
+                write_varint(body, move[0])
+                write_varint(body, move[1])
+            write_varint(body, max(0, turn.time_to_move_us))
+            write_text(body, turn.response)
+        record = bytearray()
+        write_varint(record, len(body))
+        return bytes(record + body)
+
+    """
+    Decode one record.
+
+    Args:
+        data (bytes-like): Trace file contents.
+        position (int): Offset of the record.
+        responses (bool): Decode the raw responses; skipping them makes replay faster.
+
+    Returns:
+        tuple: (GameTrace, offset of the next record)
+    """
+    @classmethod
+    def decode(cls, data, position, responses=True):
+        length, position = read_varint(data, position)
+        end = position + length
+        game_id, position = read_text(data, position)
+        game = GAMES[data[position]]
+        position += 1
+        if game == "nim":
+            count, position = read_varint(data, position)
+            heaps = []
+            for _ in range(count):
+                heap, position = read_varint(data, position)
+                heaps.append(heap)
+            initial = {"heaps": heaps}
+        else:
+            num_disks, position = read_varint(data, position)
+            initial = {"num_disks": num_disks, "compact": bool(data[position])}
+            position += 1
+        metadata, position = read_text(data, position)
+        count, position = read_varint(data, position)
+        turns = []
+        for _ in range(count):
+            flags = data[position]
+            position += 1
+            move = None
+            if flags & HAS_MOVE:
+                a, position = read_varint(data, position)
+                b, position = read_varint(data, position)
+                move = (a, b)
+            micros, position = read_varint(data, position)
+            if responses:
+                response, position = read_text(data, position)
+            else:
+                size, position = read_varint(data, position)
+                response, position = None, position + size
+            turns.append(TurnTrace(flags & AGENT_B, response, move, bool(flags & ACCEPTED), micros))
+        return cls(game_id, game, initial, json.loads(metadata), turns), end
+
+class TraceWriter:
+    """
+    Appends game traces to a directory. Each process writes its own file pair, opened on first use, so
+    the process runner's workers never interleave records; pickling hands a worker a fresh writer.
+
+    Attributes:
+        directory (str): Where the trace files go.
+        run_id (str): Prefix of this run's files.
+    """
+    def __init__(self, directory, run_id=None):
+        self.directory = directory
+        self.run_id = run_id or uuid.uuid4().hex[:8]
+        self._files = None
+        self._pid = None
+
+    def __getstate__(self):
+        return {"directory": self.directory, "run_id": self.run_id, "_files": None, "_pid": None}
+
+    # Key of a game in the index: the run, game, prompt, both models and the seed, so a seeded game can be found
+    # from the benchmark's seed; model names may contain ":", hence the "|" separator
+    def game_id(self, game, prompt, models, seed):
+        return "|".join([self.run_id, game, prompt, *models, str(seed) if seed is not None else uuid.uuid4().hex])
+
+    def _open(self):
+        if self._pid != os.getpid():
+            os.makedirs(self.directory, exist_ok=True)
+            stem = os.path.join(self.directory, f"{self.run_id}-{os.getpid()}")
+            data = open(stem + ".trace", "ab")
+            if data.tell() == 0:
+                data.write(MAGIC)
+            self._files = (data, open(stem + ".idx", "ab"))
+            self._pid = os.getpid()
+        return self._files
+
+    """
+    Append a finished game.
+
+    Args:
+        trace (GameTrace): The game.
+    """
+    def write(self, trace):
+        data, index = self._open()
+        offset = data.tell()
+        data.write(trace.encode())
+        data.flush()
+        entry = bytearray()
+        write_text(entry, trace.game_id)
+        write_varint(entry, offset)
+        index.write(entry)
+        index.flush()
+
+    def close(self):
+        if self._files is not None and self._pid == os.getpid():
+            for file in self._files:
+                file.close()
+        self._files = None
+
+class TraceReader:
+    """
+    Random and sequential access to every trace file in a directory. The files are memory-mapped; the
+    index is read from the .idx files, or rebuilt by scanning a trace file whose index is missing or short.
+
+    Attributes:
+        directory (str): The trace directory.
+        index (dict): Game id -> (trace file, offset). A game id recorded again (a run id reused for the
+            same directory) is kept under "<id>#2", "<id>#3", ... in write order rather than replacing it.
+        duplicates (int): Records indexed under such a suffixed id.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.index = {}
+        self.duplicates = 0
+        self._maps = {}
+        for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+            if name.endswith(".trace"):
+                self._load(os.path.join(directory, name))
+
+    def _load(self, path):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size <= len(MAGIC):
+                return
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a move trace file")
+        self._maps[path] = data
+        entries = {}  # offset -> game id; offsets are unique within the file, ids need not be
+        index_path = path[:-len(".trace")] + ".idx"
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as f:
+                raw = f.read()
+            position = 0
+            try:
+                while position < len(raw):
+                    game_id, position = read_text(raw, position)
+                    offset, position = read_varint(raw, position)
+                    entries[offset] = game_id
+            except (IndexError, UnicodeDecodeError):
+                pass  # torn index entry at the end of an interrupted run
+        # records written after the last index entry (or without an index) are found by scanning
+        position = max(entries, default=len(MAGIC))
+        try:
+            while position < len(data):
+                trace, end = GameTrace.decode(data, position, responses=False)
+                if end > len(data):
+                    break
+                entries[position] = trace.game_id
+                position = end
+        except (IndexError, ValueError):
+            pass  # torn record at the end of an interrupted run
+        for offset in sorted(entries):
+            self._add(entries[offset], path, offset)
+
+    def _add(self, game_id, path, offset):
+        key, copy = game_id, 1
+        while key in self.index:
+            copy += 1
+            key = f"{game_id}#{copy}"
+        if copy > 1:
+            self.duplicates += 1
+        self.index[key] = (path, offset)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, game_id):
+        return game_id in self.index
+
+    """
+    Look up one game.
+
+    Args:
+        game_id (str): The game's id.
+        responses (bool): Decode the raw responses.
+
+    Returns:
+        GameTrace: The game.
+
+    Raises:
+        KeyError: If no trace has that id.
+    """
+    def get(self, game_id, responses=True):
+        path, offset = self.index[game_id]
+        return GameTrace.decode(self._maps[path], offset, responses)[0]
+
+    """
+    Iterate over every game.
+
+    Args:
+        responses (bool): Decode the raw responses.
+
+    Yields:
+        GameTrace: The games, file by file in write order.
+    """
+    def games(self, responses=True):
+        for path, offset in sorted(self.index.values()):
+            yield GameTrace.decode(self._maps[path], offset, responses)[0]
+
+    def close(self):
+        for data in self._maps.values():
+            data.close()
+        self._maps = {}
@@ -0,0 +1,75 @@
+from memory.shared_memory import SharedMemory
+
+# Replays rebuild a game's states and shared memory from its trace alone: no agents, prompts or LLM calls
+
+# Fresh initial state of a traced game
+def initial_state(trace):
+    if trace.game == "nim":
+        from puzzles.nim import NimState
+        return NimState(trace.initial["heaps"])
+    if trace.initial["compact"]:
+        from puzzles.hanoi_compact import CompactHanoiState
+        return CompactHanoiState(trace.initial["num_disks"])
+    from puzzles.hanoi import HanoiState
+    return HanoiState(num_disks=trace.initial["num_disks"])
+
+"""
+Step through a traced game, applying each accepted move the way run_game's apply_move did.
+
+Args:
+    trace (GameTrace): The game.
+
+Yields:
+    tuple: (turn number, TurnTrace, state, memory) after each turn; state and memory are updated in place.
+
+Raises:
+    ValueError: If an accepted move does not apply, i.e. the trace does not match the game rules.
+"""
+def iter_replay(trace):
+    state = initial_state(trace)
+    memory = SharedMemory()
+    for number, turn in enumerate(trace.turns):
+        if turn.accepted:
+            if not state.move(*turn.move):
+                raise ValueError(f"{trace.game_id}: recorded move {turn.move} on turn {number} is illegal")
+            memory.update(turn.move, state)
+        yield number, turn, state, memory
+
+"""
+Replay a traced game to its end.
+
+Args:
+    trace (GameTrace): The game.
+
+Returns:
+    tuple: (final state, SharedMemory)
+"""
+def replay(trace):
+    state, memory = initial_state(trace), SharedMemory()
+    for _, _, state, memory in iter_replay(trace):
+        pass
+    return state, memory
+
+# Whether the replayed game reached the goal, like run_game's is_done
+def is_done(trace, state):
+    return state.is_game_over() if trace.game == "nim" else state.is_solved()
+
+"""
+Replay every game of a trace directory and check each against the result recorded with it.
+
+Args:
+    reader (TraceReader): The traces.
+
+Returns:
+    dict: {"games": replayed, "turns": turns replayed, "mismatches": ids whose replayed outcome differs}
+"""
+def verify(reader):
+    games = turns = 0
+    mismatches = []
+    for trace in reader.games(responses=False):
+        state, _ = replay(trace)
+        games += 1
+        turns += len(trace.turns)
+        if "solved" in trace.metadata and is_done(trace, state) != trace.metadata["solved"]:
+            mismatches.append(trace.game_id)
+    return {"games": games, "turns": turns, "mismatches": mismatches}
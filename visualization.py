@@ -1,128 +1,323 @@
-import pandas
-import matplotlib.pyplot
-import seaborn
+import csv
+import hashlib
+import json
 import os
+import re
 from pathlib import Path
+from results.store import ResultStore, DEFAULT_STORE_PATH
+from main import DEFAULT_MODELS
 
 # Set up directories
-NIM_DIR = "benchmarks/nim"
-HANOI_DIR = "benchmarks/hanoi"
+STORE_PATH = DEFAULT_STORE_PATH
+LEGACY_CSV_DIR = "benchmarks"  # CSVs written before the result store, in benchmarks/ or benchmarks/<game>/
 OUTPUT_DIR = "plots"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# Function to load CSVs from a folder
-def load_csvs(directory):
-    dataframes = []
-    if not os.path.exists(directory):
-        print(f"Warning: Directory {directory} not found. Creating it.")
-        os.makedirs(directory)
-        return pandas.DataFrame()  # Return empty DataFrame if no files
-    for file in Path(directory).glob("*.csv"):
+CACHE_FILE = ".aggregates.json"  # in OUTPUT_DIR: manifest of ingested files and their partial aggregates
+CACHE_VERSION = 2
+BASELINES_PATH = os.path.join("benchmarks", "baselines.json")  # written by python main.py baseline (puzzles/simulator.py)
+BASELINE_CONFIGS = {"nim": "3-4-5", "hanoi": "3"}  # the run_game default heaps and disks the LLM games use
+BASELINE_SAMPLE = 1000  # values per baseline box plot, scaled down from the simulated histogram
+
+# Legacy file names: <game>_benchmark_<prompt>[_<YYYYMMDD>_<HHMMSS>].csv
+LEGACY_CSV_NAME = re.compile(r"^(?P<game>nim|hanoi)_benchmark_(?P<prompt>.+?)(?:_\d{8}_\d{6})?$")
+
+# Columns the plots are built from; the integer ones are kept as exact value -> count histograms
+SKETCH_COLUMNS = ["turns", "illegal_moves_agent_a", "illegal_moves_agent_b"]
+SEAT_COLUMNS = {"a": "illegal_moves_agent_a", "b": "illegal_moves_agent_b"}
+RESULT_COLUMNS = ["winner", "winner_seat", "model_a", "model_b"] + SKETCH_COLUMNS
+
+# Function to list every results file with its size and mtime: store part files and legacy CSVs
+def list_sources(store_path=STORE_PATH):
+    sources = {}
+    for path, partition in ResultStore(store_path).files():
+        sources[path] = ("store", partition["game"], partition["prompt"])
+    for game in ("nim", "hanoi"):
+        for file in list(Path(LEGACY_CSV_DIR).glob("*.csv")) + list(Path(LEGACY_CSV_DIR, game).glob("*.csv")):
+            match = LEGACY_CSV_NAME.match(file.stem)
+            if match and match.group("game") == game:
+                sources[str(file)] = ("csv", game, match.group("prompt"))
+    return sources
+
+# Function to read one file's columns as lists
+def read_source(path, kind):
+    if kind == "store":
+        return ResultStore().read_file(path, RESULT_COLUMNS)
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    return {column: [row.get(column) or None for row in rows] for column in RESULT_COLUMNS}
+
+# Function to find the seat ("a" or "b") that won; results stored before winner_seat only have the agent name,
+# which started with the model family's name, and legacy CSVs were all played by the default models
+def winner_seat(winner, seat, models):
+    if seat or not winner:
+        return seat
+    for seat, model in zip("ab", models):
+        if winner.startswith(model.split(":")[0].capitalize()):
+            return seat
+    return None
+
+# Function to reduce one file to its partial aggregate: its model pair, game count, win counts per seat and
+# per-column histograms and sums (a store part file holds one model pair)
+def aggregate_source(path, kind, game, prompt):
+    columns = read_source(path, kind)
+    models = next(((a, b) for a, b in zip(columns["model_a"], columns["model_b"]) if a and b), DEFAULT_MODELS)
+    partial = {"game": game, "prompt": prompt, "models": list(models), "games": len(columns["winner"]), "wins": {},
+               "sketches": {}, "sums": {}}
+    for winner, seat in zip(columns["winner"], columns["winner_seat"]):
+        seat = winner_seat(winner, seat, models)
+        if seat:
+            partial["wins"][seat] = partial["wins"].get(seat, 0) + 1
+    for column in SKETCH_COLUMNS:
+        histogram = {}
+        for value in columns.get(column) or []:
+            if value is not None:
+                key = str(int(float(value)))
+                histogram[key] = histogram.get(key, 0) + 1
+        partial["sketches"][column] = histogram
+        partial["sums"][column] = sum(int(value) * count for value, count in histogram.items())
+    return partial
+
+# Function to add counts of one nested dict into another
+def merge_counts(total, counts):
+    for key, value in counts.items():
+        if isinstance(value, dict):
+            merge_counts(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0) + value
+
+# Function to load the cache, starting over if it is missing or from another version
+def load_cache(cache_path):
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+        if cache.get("version") == CACHE_VERSION:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {"version": CACHE_VERSION, "manifest": {}, "plots": {}}
+
+def save_cache(cache, cache_path):
+    temporary = cache_path + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump(cache, f)
+    os.replace(temporary, cache_path)
+
+# Function to bring the manifest up to date: only new or changed files are read, vanished files are dropped
+def update_manifest(cache, store_path=STORE_PATH):
+    manifest = cache["manifest"]
+    sources = list_sources(store_path)
+    ingested = 0
+    for path in list(manifest):
+        if path not in sources:
+            del manifest[path]
+    for path, (kind, game, prompt) in sources.items():
+        stat = os.stat(path)
+        entry = manifest.get(path)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            continue
         try:
-            df = pandas.read_csv(file)
-            # Extract prompt name from filename (e.g., nim_benchmark_baseline.csv -> baseline)
-            prompt_name = file.stem.replace("nim_benchmark_", "").replace("hanoi_benchmark_", "")
-            df["prompt"] = prompt_name
-            dataframes.append(df)
+            partial = aggregate_source(path, kind, game, prompt)
         except Exception as e:
-            print(f"Error reading {file}: {e}")
-    if not dataframes:
-        print(f"No CSV files found in {directory}")
-        return pandas.DataFrame()
-    return pandas.concat(dataframes, ignore_index=True)
+            print(f"Error reading {path}: {e}")
+            continue
+        manifest[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "partial": partial}
+        ingested += 1
+    return ingested
+
+# Function to merge the per-file partial aggregates into game -> group -> totals, one group per prompt and model
+# pair; the group is labelled by the prompt alone while a game has results of a single model pair
+def combine(manifest):
+    pairs = {"nim": set(), "hanoi": set()}
+    for entry in manifest.values():
+        pairs.setdefault(entry["partial"]["game"], set()).add(tuple(entry["partial"]["models"]))
+    totals = {game: {} for game in pairs}
+    for entry in manifest.values():
+        partial = entry["partial"]
+        label = partial["prompt"] if len(pairs[partial["game"]]) == 1 else "{}\n{} vs {}".format(partial["prompt"], *partial["models"])
+        group_totals = totals[partial["game"]].setdefault(label, {"models": partial["models"]})
+        merge_counts(group_totals, {key: partial[key] for key in ("games", "wins", "sketches", "sums")})
+    return totals
+
+# Function to list the model pairs a game's results were played by
+def model_pairs(game_totals):
+    return sorted({tuple(totals["models"]) for totals in game_totals.values()})
+
+# Function to name the seats of a game's plots: the models when every result has the same pair, else "Agent A/B"
+def seat_labels(game_totals):
+    pairs = model_pairs(game_totals)
+    if len(pairs) != 1:
+        return {"a": "Agent A", "b": "Agent B"}
+    model_a, model_b = pairs[0]
+    return {"a": model_a, "b": model_b} if model_a != model_b else {"a": f"{model_a} (A)", "b": f"{model_b} (B)"}
+
+# Function to expand a histogram back into its values (exact, since the sketched columns are integers)
+def expand(histogram):
+    return [int(value) for value, count in sorted(histogram.items(), key=lambda item: int(item[0])) for _ in range(count)]
+
+# Function to load the simulated baselines of the default configurations: game -> pairing -> summary
+def load_baselines(path=BASELINES_PATH):
+    try:
+        with open(path) as f:
+            baselines = json.load(f)
+    except (OSError, ValueError):
+        baselines = {}
+    return {game: baselines.get(game, {}).get(config, {}) for game, config in BASELINE_CONFIGS.items()}
 
-# Load data
-nim_data = load_csvs(NIM_DIR)
-hanoi_data = load_csvs(HANOI_DIR)
+# Function to scale a histogram of millions of simulated games down to about `size` values, keeping its shape
+def scale_histogram(histogram, size=BASELINE_SAMPLE):
+    total = sum(histogram.values())
+    return {value: round(count * size / total) for value, count in histogram.items()} if total else {}
 
-# Function to calculate win rates (for Nim only)
-def calculate_win_rates(df):
-    if df.empty:
+# Function to build the turns table of the baseline pairings, labelled "[<pairing>]" next to the prompts
+def baseline_frame(game_baselines):
+    import pandas
+    rows = [(f"[{pairing}]", value) for pairing, summary in game_baselines.items()
+            for value in expand(scale_histogram(summary["sketches"]["turns"]))]
+    return pandas.DataFrame(rows, columns=["prompt", "turns"])
+
+# Function to calculate win rates per seat (for Nim only)
+def calculate_win_rates(game_totals):
+    import pandas
+    labels = seat_labels(game_totals)
+    win_counts = pandas.DataFrame({group: {labels[seat]: wins for seat, wins in totals["wins"].items()}
+                                   for group, totals in game_totals.items() if totals["wins"]})
+    if win_counts.empty:
         return pandas.DataFrame()
-    win_counts = df.groupby(["prompt", "winner"]).size().unstack(fill_value=0)
-    win_rates = win_counts.div(win_counts.sum(axis=1), axis=0)
-    return win_rates
+    win_counts = win_counts.T.fillna(0).sort_index()
+    win_counts.index.name = "prompt"
+    return win_counts.div(win_counts.sum(axis=1), axis=0)
+
+# Function to build a long table of one sketched column per prompt, for the box plots
+def sketch_frame(game_totals, column):
+    import pandas
+    rows = [(prompt, value) for prompt in sorted(game_totals)
+            for value in expand(game_totals[prompt]["sketches"].get(column, {}))]
+    return pandas.DataFrame(rows, columns=["prompt", column])
+
+# Function to build the illegal-moves table of both agents
+def illegal_moves_frame(game_totals):
+    import pandas
+    frames = []
+    for seat, agent in seat_labels(game_totals).items():
+        column = SEAT_COLUMNS[seat]
+        frame = sketch_frame(game_totals, column).rename(columns={column: "illegal_moves"})
+        frame["agent"] = agent
+        frames.append(frame)
+    return pandas.concat(frames, ignore_index=True)
 
 # Plot 1: Win Rates for Nim (Bar Chart)
-if not nim_data.empty:
-    nim_win_rates = calculate_win_rates(nim_data)
-    if not nim_win_rates.empty:
-        fig = matplotlib.pyplot.figure(figsize=(10, 6))
-        nim_win_rates.plot(kind="bar", stacked=False)
-        matplotlib.pyplot.title("Nim Game Win Rates for Llama3.2 and Gemma3 by Prompt")
-        matplotlib.pyplot.xlabel("Prompt")
-        matplotlib.pyplot.ylabel("Win Rate")
-        matplotlib.pyplot.legend(title="Agent", bbox_to_anchor=(0, 0), loc='lower left', bbox_transform=fig.transFigure)
-        matplotlib.pyplot.tight_layout()
-        matplotlib.pyplot.savefig(os.path.join(OUTPUT_DIR, "nim_win_rates.png"))
-        matplotlib.pyplot.close()
-    else:
+def plot_win_rates(totals, path):
+    nim_win_rates = calculate_win_rates(totals["nim"])
+    if nim_win_rates.empty:
         print("No win rate data to plot for Nim")
-else:
-    print("No Nim data to plot")
-
-# Plot 2: Turns per Prompt (Box Plot)
-matplotlib.pyplot.figure(figsize=(12, 6))
-matplotlib.pyplot.subplot(1, 2, 1)
-if not nim_data.empty:
-    seaborn.boxplot(x="prompt", y="turns", data=nim_data)
-    matplotlib.pyplot.title("Turns per Prompt in Nim Game")
-else:
-    print("No Nim data to plot")
-    matplotlib.pyplot.title("No Nim Data Available")
-matplotlib.pyplot.xlabel("Prompt")
-matplotlib.pyplot.ylabel("Number of Turns")
-matplotlib.pyplot.xticks(rotation=45)
-
-matplotlib.pyplot.subplot(1, 2, 2)
-if not hanoi_data.empty:
-    seaborn.boxplot(x="prompt", y="turns", data=hanoi_data)
-    matplotlib.pyplot.title("Turns per Prompt in Towers of Hanoi")
-else:
-    print("No Hanoi data to plot")
-    matplotlib.pyplot.title("No Hanoi Data Available")
-matplotlib.pyplot.xlabel("Prompt")
-matplotlib.pyplot.ylabel("Number of Turns")
-matplotlib.pyplot.xticks(rotation=45)
-matplotlib.pyplot.tight_layout()
-matplotlib.pyplot.savefig(os.path.join(OUTPUT_DIR, "turns_boxplot.png"))
-matplotlib.pyplot.close()
+        return
+    import matplotlib.pyplot
+    fig = matplotlib.pyplot.figure(figsize=(10, 6))
+    axes = nim_win_rates.plot(kind="bar", stacked=False)
+    # simulated baselines: agent A's win rate per pairing of random and XOR-optimal players
+    for (pairing, summary), style in zip(sorted(totals["baselines"]["nim"].items()), ["--", ":", "-.", (0, (1, 4))]):
+        axes.axhline(summary["wins"]["agent_a"] / summary["games"], color="gray", linestyle=style,
+                     label=f"Agent A, {pairing}")
+    pairs = model_pairs(totals["nim"])
+    if len(pairs) == 1:
+        matplotlib.pyplot.title("Nim Game Win Rates for {} and {} by Prompt".format(*pairs[0]))
+    else:
+        matplotlib.pyplot.title("Nim Game Win Rates by Prompt and Model Pair")
+    matplotlib.pyplot.xlabel("Prompt")
+    matplotlib.pyplot.ylabel("Win Rate")
+    matplotlib.pyplot.legend(title="Agent", bbox_to_anchor=(0, 0), loc='lower left', bbox_transform=fig.transFigure)
+    matplotlib.pyplot.tight_layout()
+    matplotlib.pyplot.savefig(path)
+    matplotlib.pyplot.close("all")
+
+# Plot 2: Turns per Prompt (Box Plot), next to the simulated baselines
+def plot_turns(totals, path):
+    import pandas
+    import matplotlib.pyplot
+    import seaborn
+    matplotlib.pyplot.figure(figsize=(12, 6))
+    for position, (game, title) in enumerate([("nim", "Nim Game"), ("hanoi", "Towers of Hanoi")], start=1):
+        matplotlib.pyplot.subplot(1, 2, position)
+        data = pandas.concat([sketch_frame(totals[game], "turns"), baseline_frame(totals["baselines"][game])],
+                             ignore_index=True)
+        if not data.empty:
+            seaborn.boxplot(x="prompt", y="turns", data=data)
+            matplotlib.pyplot.title(f"Turns per Prompt in {title}")
+        else:
+            print(f"No {title} data to plot")
+            matplotlib.pyplot.title(f"No {title} Data Available")
+        matplotlib.pyplot.xlabel("Prompt")
+        matplotlib.pyplot.ylabel("Number of Turns")
+        matplotlib.pyplot.xticks(rotation=45)
+    matplotlib.pyplot.tight_layout()
+    matplotlib.pyplot.savefig(path)
+    matplotlib.pyplot.close()
 
 # Plot 3: Illegal Moves per Prompt (Box Plot)
-matplotlib.pyplot.figure(figsize=(12, 6))
-matplotlib.pyplot.subplot(1, 2, 1)
-if not nim_data.empty:
-    nim_data_melted = nim_data.melt(id_vars=["prompt"], value_vars=["illegal_moves_agent_a", "illegal_moves_agent_b"],
-                                    var_name="agent", value_name="illegal_moves")
-    nim_data_melted["agent"] = nim_data_melted["agent"].replace({
-        "illegal_moves_agent_a": "Llama3.2", "illegal_moves_agent_b": "Gemma3"
-    })
-    seaborn.boxplot(x="prompt", y="illegal_moves", hue="agent", data=nim_data_melted)
-    matplotlib.pyplot.title("Illegal Moves per Prompt in Nim Game")
-else:
-    print("No Nim data to plot")
-    matplotlib.pyplot.title("No Nim Data Available")
-matplotlib.pyplot.xlabel("Prompt")
-matplotlib.pyplot.ylabel("Illegal Moves")
-matplotlib.pyplot.xticks(rotation=45)
-
-matplotlib.pyplot.subplot(1, 2, 2)
-if not hanoi_data.empty:
-    hanoi_data_melted = hanoi_data.melt(id_vars=["prompt"], value_vars=["illegal_moves_agent_a", "illegal_moves_agent_b"],
-                                        var_name="agent", value_name="illegal_moves")
-    hanoi_data_melted["agent"] = hanoi_data_melted["agent"].replace({
-        "illegal_moves_agent_a": "Llama3.2", "illegal_moves_agent_b": "Gemma3"
-    })
-    seaborn.boxplot(x="prompt", y="illegal_moves", hue="agent", data=hanoi_data_melted)
-    matplotlib.pyplot.title("Illegal Moves per Prompt in Towers of Hanoi")
-else:
-    print("No Hanoi data to plot")
-    matplotlib.pyplot.title("No Hanoi Data Available")
-matplotlib.pyplot.xlabel("Prompt")
-matplotlib.pyplot.ylabel("Illegal Moves")
-matplotlib.pyplot.xticks(rotation=45)
-matplotlib.pyplot.tight_layout()
-matplotlib.pyplot.savefig(os.path.join(OUTPUT_DIR, "illegal_moves_boxplot.png"))
-matplotlib.pyplot.close()
-
-print("\nVisualizations have been saved to the 'plots' directory!\n")
\ No newline at end of file
+def plot_illegal_moves(totals, path):
+    import matplotlib.pyplot
+    import seaborn
+    matplotlib.pyplot.figure(figsize=(12, 6))
+    for position, (game, title) in enumerate([("nim", "Nim Game"), ("hanoi", "Towers of Hanoi")], start=1):
+        matplotlib.pyplot.subplot(1, 2, position)
+        data = illegal_moves_frame(totals[game])
+        if not data.empty:
+            seaborn.boxplot(x="prompt", y="illegal_moves", hue="agent", data=data)
+            matplotlib.pyplot.title(f"Illegal Moves per Prompt in {title}")
+        else:
+            print(f"No {title} data to plot")
+            matplotlib.pyplot.title(f"No {title} Data Available")
+        matplotlib.pyplot.xlabel("Prompt")
+        matplotlib.pyplot.ylabel("Illegal Moves")
+        matplotlib.pyplot.xticks(rotation=45)
+    matplotlib.pyplot.tight_layout()
+    matplotlib.pyplot.savefig(path)
+    matplotlib.pyplot.close()
+
+# Each plot: output file, render function, and the slice of the totals it is drawn from
+PLOTS = {
+    "nim_win_rates.png": (plot_win_rates, lambda totals: {
+        "prompts": {p: [t["models"], t["wins"]] for p, t in totals["nim"].items()},
+        "baselines": {pairing: b["wins"] for pairing, b in totals["baselines"]["nim"].items()}}),
+    "turns_boxplot.png": (plot_turns, lambda totals: {
+        g: {p: t["sketches"].get("turns") for p, t in [*totals[g].items(), *totals["baselines"][g].items()]}
+        for g in ("nim", "hanoi")}),
+    "illegal_moves_boxplot.png": (plot_illegal_moves, lambda totals: {
+        g: {p: [t["models"], {c: t["sketches"].get(c) for c in SEAT_COLUMNS.values()}] for p, t in totals[g].items()}
+        for g in ("nim", "hanoi")}),
+}
+
+# Function to hash a plot's inputs, so it is only re-rendered when they change
+def digest(inputs):
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+# Function to ingest new results and re-render the plots whose inputs changed; returns the re-rendered files
+def render(force=False, store_path=STORE_PATH, output_dir=OUTPUT_DIR, baselines_path=BASELINES_PATH):
+    os.makedirs(output_dir, exist_ok=True)
+    cache_path = os.path.join(output_dir, CACHE_FILE)
+    cache = load_cache(cache_path)
+    ingested = update_manifest(cache, store_path)
+    totals = combine(cache["manifest"])
+    totals["baselines"] = load_baselines(baselines_path)
+    print(f"Ingested {ingested} new or changed file(s), {len(cache['manifest'])} in total")
+
+    rendered = []
+    for filename, (plot, inputs) in PLOTS.items():
+        path = os.path.join(output_dir, filename)
+        key = digest(inputs(totals))
+        if not force and cache["plots"].get(filename) == key and os.path.exists(path):
+            continue
+        plot(totals, path)
+        cache["plots"][filename] = key
+        rendered.append(filename)
+    save_cache(cache, cache_path)
+    return rendered
+
+def main(force=False, store_path=STORE_PATH, output_dir=OUTPUT_DIR):
+    rendered = render(force, store_path, output_dir)
+    if rendered:
+        print(f"\nRe-rendered {', '.join(rendered)} in the '{output_dir}' directory!\n")
+    else:
+        print(f"\nNo new results; plots in the '{output_dir}' directory are up to date.\n")
+
+if __name__ == "__main__":
+    main()